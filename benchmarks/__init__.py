@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试：合成线路工作簿生成（synth）、分阶段 / 端到端计时（bench）与跨引擎等价性对照（equivalence）。
+在仓库根目录以 python -m benchmarks.synth / python -m benchmarks.bench / python -m benchmarks.equivalence 运行。
+"""
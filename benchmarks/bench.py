@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试：对合成线路工作簿（benchmarks.synth）按分段数逐档计时，结果写为机器可读的 JSON 基线，可与上一版本基线对比。
+
+每档分段数的用例：
+- stages：compute_feeder 分阶段计时（reliability.instrument，读取 / 字段映射 / 清洗 / 敷设方式解析 / 分段内核 / 汇总），不含写出；
+- run_xlsx / run_csv：run() 端到端（读取、计算、写出），不读写缓存；
+- run_lite_csv：run(lite=True) 端到端，文件超过 lite.max_file_mb 会回退到完整路径时跳过；
+另记录一次 `python main.py --help` 的进程启动耗时（startup）。
+各用例先不计时执行 --warmup 次（模块导入、文件系统缓存等一次性开销不计入），再重复 --repeat 次，记录最小值与中位数；
+对比时以中位数计算比值。
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synth import SYNTH_VERSION, ensure_feeder
+from main import compute_feeder, default_config_path, load_config, run
+from reliability.instrument import Probe, STAGES
+from reliability.lite import lite_fallback
+
+BENCH_FORMAT = "reliability-benchmark"
+BENCH_VERSION = 1
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+CASES = ("stages", "run_xlsx", "run_csv", "run_lite_csv")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def machine_info():
+    info = {"hostname": socket.gethostname(), "platform": platform.platform(), "python": platform.python_version(),
+            "cpu_count": os.cpu_count(), "processor": platform.processor()}
+    for name in ("numpy", "pandas", "openpyxl"):
+        try:
+            info[name] = __import__(name).__version__
+        except ImportError:
+            info[name] = None
+    return info
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _stats(runs):
+    return {"min_s": min(runs), "median_s": statistics.median(runs), "runs": runs}
+
+
+def time_stages(excel_path, config, repeat, warmup=1):
+    """compute_feeder 分阶段计时：各阶段取各次合计的中位数。"""
+    for _ in range(warmup):
+        compute_feeder(excel_path, config)
+    runs = []
+    per_stage = {}
+    for _ in range(repeat):
+        probe = Probe()
+        t0 = time.perf_counter()
+        compute_feeder(excel_path, config, None, probe)
+        runs.append(time.perf_counter() - t0)
+        totals = {}
+        for r in probe.records:
+            totals[r["stage"]] = totals.get(r["stage"], 0.0) + r["wall_s"]
+        for stage, seconds in totals.items():
+            per_stage.setdefault(stage, []).append(seconds)
+    result = _stats(runs)
+    result["stages"] = {stage: statistics.median(per_stage[stage]) for stage in STAGES if stage in per_stage}
+    return result
+
+
+def time_run(excel_path, config_path, output_path, repeat, lite=False, warmup=1):
+    runs = []
+    stem, ext = os.path.splitext(output_path)
+    for k in range(warmup + repeat):
+        t0 = time.perf_counter()
+        # 每次写新文件（不计覆盖已有文件的开销）；run() 的保存提示等输出不计入终端
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(config_path=config_path, input_path=excel_path, output_path=f"{stem}_{k}{ext}", use_cache=False, lite=lite, verbose=0)
+        if k >= warmup:
+            runs.append(time.perf_counter() - t0)
+    return _stats(runs)
+
+
+def time_startup(repeat):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), "--help"], capture_output=True, check=True)
+        runs.append(time.perf_counter() - t0)
+    return _stats(runs)
+
+
+def run_suite(sizes, repeat=3, data_dir="benchmarks/data", config_path=None, cases=CASES, seed=0, devices=2, warmup=1):
+    config_path = config_path or default_config_path()
+    config = load_config(config_path)
+    config["verbose"] = 0
+    results = [{"segments": None, "case": "startup", **time_startup(repeat)}]
+    print(f"startup: {results[0]['median_s'] * 1000:.0f} ms")
+    with tempfile.TemporaryDirectory(prefix="reliability-bench-") as tmp:
+        for n in sizes:
+            t0 = time.perf_counter()
+            path = ensure_feeder(data_dir, n, seed, devices)
+            file_mb = os.path.getsize(path) / (1 << 20)
+            print(f"\n{n} 个分段（{file_mb:.2f} MB，准备 {time.perf_counter() - t0:.1f} s）")
+            for case in cases:
+                if case == "stages":
+                    res = time_stages(path, config, repeat, warmup)
+                elif case == "run_lite_csv":
+                    out = os.path.join(tmp, f"{n}_lite.csv")
+                    reason = lite_fallback(path, out, config)
+                    if reason is not None:
+                        print(f"  {case:<13} 跳过（{reason}）")
+                        continue
+                    res = time_run(path, config_path, out, repeat, lite=True, warmup=warmup)
+                else:
+                    res = time_run(path, config_path, os.path.join(tmp, f"{n}.{case.split('_')[1]}"), repeat, warmup=warmup)
+                results.append({"segments": n, "case": case, "file_mb": file_mb, **res})
+                stages = "，".join(f"{STAGES[s]} {v * 1000:.1f}" for s, v in res.get("stages", {}).items())
+                print(f"  {case:<13} 中位数 {res['median_s'] * 1000:9.1f} ms  最小 {res['min_s'] * 1000:9.1f} ms"
+                      + (f"（{stages} ms）" if stages else ""))
+    return {
+        "format": BENCH_FORMAT,
+        "version": BENCH_VERSION,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "git_commit": git_commit(),
+        "machine": machine_info(),
+        "synth_version": SYNTH_VERSION,
+        "seed": seed,
+        "devices_per_segment": devices,
+        "repeat": repeat,
+        "warmup": warmup,
+        "results": results,
+    }
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("format") != BENCH_FORMAT:
+        raise ValueError(f"不是基准测试结果文件: {path}")
+    return data
+
+
+def _entries(data):
+    """(分段数, 用例) → 中位数；stages 用例的各阶段另以 stage:<阶段> 为用例名。"""
+    entries = {}
+    for r in data["results"]:
+        entries[(r["segments"], r["case"])] = r["median_s"]
+        for stage, seconds in r.get("stages", {}).items():
+            entries[(r["segments"], f"stage:{stage}")] = seconds
+    return entries
+
+
+def compare(current, baseline, threshold=1.2):
+    """逐项对比中位数；返回比值超过 threshold 的项 [(分段数, 用例, 基线秒, 当前秒, 比值)]。"""
+    if (current["synth_version"], current["seed"], current["devices_per_segment"]) != \
+            (baseline["synth_version"], baseline["seed"], baseline["devices_per_segment"]):
+        print("注意：合成工作簿参数与基线不同，对比仅供参考")
+    base = _entries(baseline)
+    slower = []
+    print(f"\n与基线对比（{baseline.get('git_commit')} @ {baseline['created_at']}，{baseline['machine'].get('hostname')}）:")
+    for key, seconds in _entries(current).items():
+        if key not in base or base[key] <= 0:
+            continue
+        ratio = seconds / base[key]
+        mark = " 变慢" if ratio > threshold else (" 变快" if ratio < 1 / threshold else "")
+        n, case = key
+        print(f"  {str(n or '-'):>7} {case:<16} {base[key] * 1000:9.1f} → {seconds * 1000:9.1f} ms  ×{ratio:.2f}{mark}")
+        if ratio > threshold:
+            slower.append((n, case, base[key], seconds, ratio))
+    return slower
+
+
+def default_result_path():
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join("benchmarks", "results", f"bench-{socket.gethostname()}-{stamp}.json")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="可靠性计算基准测试（合成线路工作簿）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help=f"分段数档位；默认 {DEFAULT_SIZES}")
+    parser.add_argument("--repeat", type=int, default=3, help="每个用例重复次数；默认 3")
+    parser.add_argument("--warmup", type=int, default=1, help="每个用例计时前不计时执行的次数；默认 1")
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=CASES, help="用例；默认全部")
+    parser.add_argument("--data-dir", default="benchmarks/data", help="合成工作簿目录（已存在同参数文件时复用）")
+    parser.add_argument("--seed", type=int, default=0, help="合成工作簿随机种子")
+    parser.add_argument("--devices", type=int, default=2, help="设备级 Sheet 每个分段的设备数")
+    parser.add_argument("-c", "--config", default=None, help="参数配置文件路径；默认 config/reliability_params.json")
+    parser.add_argument("-o", "--output", default=None, help="结果 JSON 路径；默认 benchmarks/results/bench-<主机名>-<时间>.json")
+    parser.add_argument("--compare", default=None, metavar="BASELINE", help="与基线结果 JSON 对比（按中位数）")
+    parser.add_argument("--threshold", type=float, default=1.2, help="对比时判定变慢 / 变快的比值；默认 1.2")
+    parser.add_argument("--fail-on-regression", action="store_true", help="有用例变慢超过 --threshold 时以非零状态退出")
+    args = parser.parse_args()
+
+    data = run_suite(args.sizes, args.repeat, args.data_dir, args.config, args.cases, args.seed, args.devices, args.warmup)
+    output = args.output or default_result_path()
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存: {output}")
+    if args.compare:
+        slower = compare(data, load_baseline(args.compare), args.threshold)
+        if slower and args.fail_on_regression:
+            sys.exit(1)
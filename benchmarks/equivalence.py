@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+"""
+跨引擎等价性与性能对照：在同一批线路工作簿上运行仓库中的各个计算实现，经统一适配层得到同口径的
+分段明细与指标汇总，按容差逐项对比参考引擎（默认 main），并并列计时。新引擎接入生产前，
+先在此证明其复现参考数值。
+
+引擎（ENGINES）：
+- main：main.compute_feeder（参考实现；按主线 / 分支各自总用户数作分母，带 JK→架空、None 忽略、其余→电缆，按权重加权）；
+- main_lite：reliability.lite.compute_feeder_lite（纯 Python 轻量路径，口径同 main）；
+- framework：workspace/reliability_framework.py 的 run()（口径同 main，逐行 apply，含写出 Excel）；
+- jingshuixian：workspace/reliability_calc_jingshuixian.py 脚本（口径同 main，常量写死在脚本中，含写出 Excel）；
+- algorithm：document/reliability_algorithm.py（分母为全线路总用户数；型号含 YJV/YJLV 为电缆、其余按架空，
+  预安排停电率按电缆 / 架空区分；不清洗；只返回汇总，无分段明细）；
+- calculation：document/reliability_calculation.py（分组分母同 main；型号含 YJV/YJLV 为电缆、其余按“混合”故障率 0.108；
+  清洗未生效；分段指标与 ASAI 先舍入，含写出 Excel）。
+脚本式引擎的输入 / 输出路径写死在源码中：适配层解析源码，替换路径赋值（jingshuixian）或只保留导入、常量与函数定义
+（algorithm）后执行。只有 main / main_lite / framework 读取参数文件，其余引擎使用各自写死的常量。
+
+对比：分段按 (线路类型, 分段编号, 同编号出现序号) 对齐，汇总按线路类型（主线 / 分支 / 全线路）对齐；
+|引擎值 - 参考值| <= atol + rtol × |参考值| 视为一致，引擎未提供的列不参与对比。
+计时：各引擎先不计时执行 --warmup 次，再重复 --repeat 次，记录最小值与中位数；含写出的引擎每次写入新目录，计时包含写出。
+新增引擎：实现一个适配函数 (excel_path, config) → (run, collect) 并加入 ENGINES；run(workdir) 为计时部分，
+collect(run 的返回值) 返回 (分段明细 DataFrame 或 None, 指标汇总 DataFrame)，列取 SEGMENT_COLS / SUMMARY_COLS 的子集。
+"""
+
+import argparse
+import ast
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench import git_commit, machine_info
+from benchmarks.synth import SYNTH_VERSION, ensure_feeder
+from main import compute_feeder, default_config_path, load_config
+from reliability.lite import compute_feeder_lite
+
+EQUIVALENCE_FORMAT = "reliability-equivalence"
+EQUIVALENCE_VERSION = 1
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DOCUMENT_FEEDERS = [
+    os.path.join(ROOT, "document", "10kV安54新窑线.xlsx"),
+    os.path.join(ROOT, "document", "10kV景704景水线.xlsx"),
+    os.path.join(ROOT, "document", "10kV景704景水线_all.xlsx"),
+]
+
+SEGMENT_KEYS = ["线路类型", "分段编号"]
+SEGMENT_COLS = SEGMENT_KEYS + [
+    "长度(km)", "用户数(台)", "故障率", "隔离时间", "故障次数(次/年)", "预安排次数(次/年)",
+    "SAIDI-F", "SAIDI-S", "SAIDI合计", "SAIFI-F", "SAIFI-S", "SAIFI合计",
+]
+SUMMARY_KEYS = ["线路类型"]
+SUMMARY_COLS = SUMMARY_KEYS + [
+    "总长度(km)", "总用户数(台)", "总故障次数(次/年)", "总预安排次数(次/年)",
+    "SAIDI-F", "SAIDI-S", "SAIDI合计", "SAIFI-F", "SAIFI-S", "SAIFI合计", "ASAI(%)",
+]
+
+# 各引擎对线路类型 / 列名的不同写法 → 统一口径
+LINE_TYPE_NAMES = {"支线": "分支", "主线路汇总": "主线", "分支线路汇总": "分支", "全线路汇总": "全线路"}
+COLUMN_NAMES = {
+    "分类": "线路类型",
+    "总用户数": "总用户数(台)",
+    "SAIDI (h/户·年)": "SAIDI合计",
+    "SAIFI (次/户·年)": "SAIFI合计",
+    "ASAI (%)": "ASAI(%)",
+    "SAIDI-F(小时/(户·年))": "SAIDI-F",
+    "SAIDI-S(小时/(户·年))": "SAIDI-S",
+    "SAIDI合计(小时/(户·年))": "SAIDI合计",
+    "SAIFI-F(次/(户·年))": "SAIFI-F",
+    "SAIFI-S(次/(户·年))": "SAIFI-S",
+    "SAIFI合计(次/(户·年))": "SAIFI合计",
+}
+
+MAX_SAMPLES = 5
+
+
+def normalize(df, columns):
+    """统一列名与线路类型，只保留 columns 中引擎提供的列（缺失列为空）。"""
+    df = df.rename(columns=COLUMN_NAMES)
+    out = pd.DataFrame({col: df[col] if col in df else np.nan for col in columns})
+    out["线路类型"] = out["线路类型"].replace(LINE_TYPE_NAMES)
+    if "分段编号" in out:
+        out["分段编号"] = out["分段编号"].astype(str)
+    return out.reset_index(drop=True)
+
+
+def _segments(frames):
+    """{线路类型: 分段结果} → 统一口径的分段明细。"""
+    return normalize(pd.concat([df.assign(线路类型=line_type) for line_type, df in frames.items()], ignore_index=True),
+                     SEGMENT_COLS)
+
+
+def _read_result_workbook(path, main_sheet, branch_sheet):
+    """读取引擎写出的结果工作簿（主线 / 分支分段明细 + 指标汇总）。"""
+    with pd.ExcelFile(path) as xls:
+        frames = {"主线": pd.read_excel(xls, main_sheet), "分支": pd.read_excel(xls, branch_sheet)}
+        summary = pd.read_excel(xls, "指标汇总")
+    return _segments(frames), normalize(summary, SUMMARY_COLS)
+
+
+def _load_module(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _load_script(path, overrides=None, definitions_only=False):
+    """
+    编译脚本式引擎：overrides 中各模块级变量的赋值改为取执行时命名空间 __overrides__[变量名]；
+    definitions_only 时只保留导入、函数 / 类定义与不含调用的赋值（去掉脚本末尾的示例调用）。
+    返回编译后的代码对象。
+    """
+    overrides = set(overrides or ())
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    body = []
+    for node in tree.body:
+        target = node.targets[0].id if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name) else None
+        if target in overrides:
+            value = ast.Subscript(value=ast.Name(id="__overrides__", ctx=ast.Load()), slice=ast.Constant(target), ctx=ast.Load())
+            node = ast.copy_location(ast.Assign(targets=node.targets, value=value), node)
+        elif definitions_only:
+            is_definition = isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef))
+            is_constant = target is not None and not any(isinstance(n, ast.Call) for n in ast.walk(node.value))
+            if not (is_definition or is_constant):
+                continue
+        body.append(node)
+    tree.body = body
+    return compile(ast.fix_missing_locations(tree), path, "exec")
+
+
+def engine_main(excel_path, config):
+    def run(workdir):
+        return compute_feeder(excel_path, config)
+
+    def collect(result):
+        df_main_result, df_branch_result, summary_df = result
+        return _segments({"主线": df_main_result, "分支": df_branch_result}), normalize(summary_df, SUMMARY_COLS)
+
+    return run, collect
+
+
+def engine_main_lite(excel_path, config):
+    def run(workdir):
+        return compute_feeder_lite(excel_path, config)
+
+    def collect(result):
+        main_rows, branch_rows, summaries = result
+        frames = {"主线": pd.DataFrame(main_rows, columns=SEGMENT_COLS[1:]),
+                  "分支": pd.DataFrame(branch_rows, columns=SEGMENT_COLS[1:])}
+        return _segments(frames), normalize(pd.DataFrame(summaries), SUMMARY_COLS)
+
+    return run, collect
+
+
+def engine_framework(excel_path, config):
+    module = _load_module(os.path.join(ROOT, "workspace", "reliability_framework.py"), "_engine_reliability_framework")
+    inp = config["input"]
+
+    def run(workdir):
+        output_path = os.path.join(workdir, "framework.xlsx")
+        cfg = dict(config, verbose=False, output={"excel_path": output_path},
+                   input={"excel_path": excel_path, "main_sheet": inp["main_sheet"], "branch_sheet": inp["branch_sheet"]})
+        config_path = os.path.join(workdir, "framework.json")
+        with open(config_path, "w", encoding="utf-8") as f:
+            json.dump(cfg, f, ensure_ascii=False)
+        return module.run(config_path)[1]
+
+    def collect(output_path):
+        return _read_result_workbook(output_path, "主线分段明细", "分支分段明细")
+
+    return run, collect
+
+
+def engine_jingshuixian(excel_path, config):
+    path = os.path.join(ROOT, "workspace", "reliability_calc_jingshuixian.py")
+    code = _load_script(path, ["excel_path", "output_path"])
+
+    def run(workdir):
+        overrides = {"excel_path": excel_path, "output_path": os.path.join(workdir, "jingshuixian.xlsx")}
+        namespace = {"__name__": "_engine_jingshuixian", "__file__": path, "__overrides__": overrides}
+        exec(code, namespace)
+        return namespace
+
+    def collect(namespace):
+        frames = {"主线": namespace["df_main_result"], "分支": namespace["df_branch_result"]}
+        return _segments(frames), normalize(namespace["summary_df"], SUMMARY_COLS)
+
+    return run, collect
+
+
+def engine_algorithm(excel_path, config):
+    path = os.path.join(ROOT, "document", "reliability_algorithm.py")
+    namespace = {"__name__": "_engine_reliability_algorithm", "__file__": path}
+    exec(_load_script(path, definitions_only=True), namespace)
+
+    def run(workdir):
+        return namespace["customized_reliability_algorithm"](excel_path)
+
+    def collect(summary_df):
+        return None, normalize(summary_df, SUMMARY_COLS)
+
+    return run, collect
+
+
+def engine_calculation(excel_path, config):
+    module = _load_module(os.path.join(ROOT, "document", "reliability_calculation.py"), "_engine_reliability_calculation")
+
+    def run(workdir):
+        output_path = os.path.join(workdir, "calculation.xlsx")
+        module.reliability_calculation(excel_path, "主线", "分支", output_path)
+        if not os.path.exists(output_path):
+            raise RuntimeError("reliability_calculation 未写出结果（见其输出的 ❌ 提示）")
+        return output_path
+
+    def collect(output_path):
+        return _read_result_workbook(output_path, "主线分段明细", "支线分段明细")
+
+    return run, collect
+
+
+# 名称 → (适配函数, 是否含写出)
+ENGINES = {
+    "main": (engine_main, False),
+    "main_lite": (engine_main_lite, False),
+    "framework": (engine_framework, True),
+    "jingshuixian": (engine_jingshuixian, True),
+    "algorithm": (engine_algorithm, False),
+    "calculation": (engine_calculation, True),
+}
+
+
+def diff_table(ref, other, keys, atol, rtol):
+    """
+    按 keys（同键多行按出现序号）对齐后逐列对比。
+    返回: {"rows_ref", "rows", "only_ref", "only_engine", "columns": {列: {"max_abs", "mismatches"}}, "skipped", "samples"}
+    """
+    ref = ref.assign(序号=ref.groupby(keys, sort=False).cumcount())
+    other = other.assign(序号=other.groupby(keys, sort=False).cumcount())
+    merged = ref.merge(other, on=keys + ["序号"], how="outer", suffixes=("_ref", ""), indicator=True)
+    both = merged[merged["_merge"] == "both"]
+    columns, skipped = {}, []
+    bad = np.zeros(len(both), dtype=bool)
+    for col in ref.columns:
+        if col in keys or col == "序号":
+            continue
+        b = pd.to_numeric(both[col], errors="coerce").to_numpy(dtype=np.float64)
+        if other[col].isna().all():
+            skipped.append(col)
+            continue
+        a = pd.to_numeric(both[col + "_ref"], errors="coerce").to_numpy(dtype=np.float64)
+        diff = np.abs(a - b)
+        mismatch = (np.isnan(a) != np.isnan(b)) | (diff > atol + rtol * np.abs(a))
+        bad |= mismatch
+        columns[col] = {
+            "max_abs": float(np.nanmax(diff)) if np.isfinite(diff).any() else None,
+            "mismatches": int(mismatch.sum()),
+        }
+    samples = []
+    for _, row in both[bad].head(MAX_SAMPLES).iterrows():
+        sample = {k: row[k] for k in keys}
+        for col in columns:
+            sample[col] = [_jsonable(row[col + "_ref"]), _jsonable(row[col])]
+        samples.append(sample)
+    return {
+        "rows_ref": len(ref),
+        "rows": len(other),
+        "only_ref": int((merged["_merge"] == "left_only").sum()),
+        "only_engine": int((merged["_merge"] == "right_only").sum()),
+        "columns": columns,
+        "skipped": skipped,
+        "samples": samples,
+    }
+
+
+def _jsonable(v):
+    if isinstance(v, (np.integer, np.floating)):
+        v = v.item()
+    return None if isinstance(v, float) and np.isnan(v) else v
+
+
+def _consistent(diff):
+    return diff["only_ref"] == 0 and diff["only_engine"] == 0 and all(c["mismatches"] == 0 for c in diff["columns"].values())
+
+
+@contextlib.contextmanager
+def _quiet_openpyxl():
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="Workbook contains no default style")
+        yield
+
+
+def time_engine(name, excel_path, config, workdir, repeat, warmup=1):
+    """运行一个引擎 warmup + repeat 次；返回 (最后一次的统一口径结果, 计时)。"""
+    adapter, _ = ENGINES[name]
+    run, collect = adapter(excel_path, config)
+    runs = []
+    for k in range(warmup + repeat):
+        outdir = os.path.join(workdir, f"{name}_{k}")
+        os.makedirs(outdir)
+        t0 = time.perf_counter()
+        # 各引擎的逐步打印与 openpyxl 的样式告警不计入终端
+        with contextlib.redirect_stdout(io.StringIO()), _quiet_openpyxl():
+            raw = run(outdir)
+        if k >= warmup:
+            runs.append(time.perf_counter() - t0)
+    with _quiet_openpyxl():
+        return collect(raw), {"min_s": min(runs), "median_s": statistics.median(runs), "runs": runs}
+
+
+def compare_engines(excel_path, config, engines, reference="main", repeat=3, warmup=1, atol=1e-6, rtol=1e-9):
+    """在一个工作簿上运行参考引擎与各引擎并对比；返回各引擎结果记录列表（参考引擎在首位）。"""
+    records = []
+    outputs = {}
+    with tempfile.TemporaryDirectory(prefix="reliability-equivalence-") as tmp:
+        for name in [reference] + [e for e in engines if e != reference]:
+            record = {"input": excel_path, "engine": name, "writes_output": ENGINES[name][1]}
+            try:
+                outputs[name], record["timing"] = time_engine(name, excel_path, config, tmp, repeat, warmup)
+            except Exception as e:
+                record.update(status="失败", error=f"{type(e).__name__}: {e}")
+                records.append(record)
+                continue
+            if name == reference:
+                record["status"] = "参考"
+            elif reference not in outputs:
+                record["status"] = "无参考"
+            else:
+                (ref_segments, ref_summary), (segments, summary) = outputs[reference], outputs[name]
+                record["summary"] = diff_table(ref_summary, summary, SUMMARY_KEYS, atol, rtol)
+                record["segments"] = None if segments is None else diff_table(ref_segments, segments, SEGMENT_KEYS, atol, rtol)
+                ok = _consistent(record["summary"]) and (record["segments"] is None or _consistent(record["segments"]))
+                record["status"] = "一致" if ok else "不一致"
+            records.append(record)
+    ref_median = records[0].get("timing", {}).get("median_s")
+    for record in records:
+        if ref_median and "timing" in record:
+            record["timing"]["vs_reference"] = record["timing"]["median_s"] / ref_median
+    return records
+
+
+def _max_abs(diff):
+    if diff is None:
+        return "-"
+    values = [c["max_abs"] for c in diff["columns"].values() if c["max_abs"] is not None]
+    return f"{max(values):.2e}" if values else "-"
+
+
+def print_records(records):
+    print(f"\n{os.path.basename(records[0]['input'])}")
+    print(f"  {'引擎':<13}{'中位数 ms':>11}{'×参考':>8}  {'分段最大差':>10}  {'汇总最大差':>10}  结论")
+    for r in records:
+        t = r.get("timing")
+        timing = f"{t['median_s'] * 1000:11.1f}{t.get('vs_reference', float('nan')):8.2f}" if t else f"{'-':>11}{'-':>8}"
+        seg = "无分段输出" if "segments" in r and r["segments"] is None else _max_abs(r.get("segments"))
+        print(f"  {r['engine']:<13}{timing}  {seg:>10}  {_max_abs(r.get('summary')):>10}  {r['status']}"
+              + ("（含写出）" if r["writes_output"] and t else "")
+              + (f"：{r['error']}" if "error" in r else ""))
+        for part in ("segments", "summary"):
+            diff = r.get(part)
+            if not diff or r["status"] != "不一致":
+                continue
+            label = "分段" if part == "segments" else "汇总"
+            if diff["only_ref"] or diff["only_engine"]:
+                print(f"      {label}行数 参考 {diff['rows_ref']} / 引擎 {diff['rows']}（仅参考 {diff['only_ref']}，仅引擎 {diff['only_engine']}）")
+            cols = "，".join(f"{col} {c['mismatches']} 处（最大差 {c['max_abs']:.3g}）"
+                            for col, c in diff["columns"].items() if c["mismatches"])
+            if cols:
+                print(f"      {label}超出容差: {cols}")
+
+
+def run_suite(workbooks, engines, reference="main", config_path=None, repeat=3, warmup=1, atol=1e-6, rtol=1e-9):
+    config_path = config_path or default_config_path()
+    config = load_config(config_path)
+    config["verbose"] = 0
+    results = []
+    for path in workbooks:
+        records = compare_engines(path, config, engines, reference, repeat, warmup, atol, rtol)
+        print_records(records)
+        results.extend(records)
+    return {
+        "format": EQUIVALENCE_FORMAT,
+        "version": EQUIVALENCE_VERSION,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "git_commit": git_commit(),
+        "machine": machine_info(),
+        "reference": reference,
+        "atol": atol,
+        "rtol": rtol,
+        "repeat": repeat,
+        "warmup": warmup,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="跨引擎等价性与性能对照（同一批工作簿，按容差对比参考引擎并计时）")
+    parser.add_argument("workbooks", nargs="*", help="线路工作簿；未指定且无 --sizes 时使用 document/ 下的三条线路")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[], help="另加合成线路工作簿的分段数档位（benchmarks.synth）")
+    parser.add_argument("--data-dir", default="benchmarks/data", help="合成工作簿目录（已存在同参数文件时复用）")
+    parser.add_argument("--seed", type=int, default=0, help="合成工作簿随机种子")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES), help="参与对比的引擎；默认全部")
+    parser.add_argument("--reference", default="main", choices=list(ENGINES), help="参考引擎；默认 main")
+    parser.add_argument("--atol", type=float, default=1e-6, help="绝对容差；默认 1e-6（各引擎汇总保留 6 位小数）")
+    parser.add_argument("--rtol", type=float, default=1e-9, help="相对容差；默认 1e-9")
+    parser.add_argument("--repeat", type=int, default=3, help="每个引擎重复次数；默认 3")
+    parser.add_argument("--warmup", type=int, default=1, help="每个引擎计时前不计时执行的次数；默认 1")
+    parser.add_argument("-c", "--config", default=None, help="参数配置文件路径；默认 config/reliability_params.json")
+    parser.add_argument("-o", "--output", default=None, help="结果 JSON 路径；未指定时不保存")
+    parser.add_argument("--fail-on-diff", action="store_true", help="有引擎不一致或失败时以非零状态退出")
+    args = parser.parse_args()
+
+    workbooks = list(args.workbooks) or ([] if args.sizes else DOCUMENT_FEEDERS)
+    workbooks += [ensure_feeder(args.data_dir, n, args.seed, 0) for n in args.sizes]
+    data = run_suite(workbooks, args.engines, args.reference, args.config, args.repeat, args.warmup, args.atol, args.rtol)
+    data["synth_version"] = SYNTH_VERSION if args.sizes else None
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=_jsonable)
+        print(f"\n结果已保存: {args.output}")
+    if args.fail_on_diff and any(r["status"] in ("不一致", "失败", "无参考") for r in data["results"]):
+        sys.exit(1)
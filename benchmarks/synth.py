@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+合成线路工作簿：按 主线 / 分支 Sheet 结构与 field_mappings 表头生成 10～100k 分段的线路，供基准测试使用。
+
+- 主线、分支列与真实工作簿一致（含装机容量、联络开关、分支类型等附带列），长度以文本保存（同真实导出）；
+- 线路型号按比例混合：纯电缆、纯架空（JK）、电缆+架空、含 None 段的多行混合、整段 None 与空值；
+- 自动化状态为 TRUE / FALSE 文本，约两成分段用户数为 0（无效分段）；
+- 设备级 主线（2）/ 分支（2）：每个分段一行表头加若干设备行，首设备的设备父节点指向所挂分段的末设备，
+  大分支按出现顺序对应 分支 Sheet 各行，另插入小分支，可由拓扑 FMEA 建树。
+同一 (分段数, 种子) 生成的内容相同。
+"""
+
+import argparse
+import math
+import os
+import random
+
+from openpyxl import Workbook
+
+SYNTH_VERSION = 1
+
+MAIN_COLUMNS = [
+    "线路分段", "起点", "起点是否自动化", "终点", "终点是否自动化", "长度(km)", "用户数量(台)", "装机容量(kVA)",
+    "公变用户数量(台)", "公用装机容量(kVA)", "专变用户数量(台)", "专变容量(kVA)", "段内联络开关数量", "段内联络开关",
+    "线路型号", "备用间隔数",
+]
+BRANCH_COLUMNS = [
+    "分支分段", "起点", "起点开关", "是否自动化", "终点", "分支类型", "长度(km)", "用户数量(台)", "装机容量(kVA)",
+    "公变用户数量(台)", "公用装机容量(kVA)", "专变用户数量(台)", "专用装机容量(kVA)", "末端联络开关", "线路型号",
+]
+MAIN_DEVICE_COLUMNS = [
+    "线路分段", "起点", "起点是否自动化", "终点", "设备编号", "设备类型", "设备名称", "设备父节点", "设备所在场地",
+    "设备所属分段", "设备所属线路", "设备描述", "用户数",
+]
+BRANCH_DEVICE_COLUMNS = [
+    "线路分段", "起点", "终点", "分支类型", "装机容量(kVA)", "设备编号", "设备类型", "设备名称", "设备父节点",
+    "设备所在场地", "设备所属分段", "设备所属线路", "设备描述", "用户数", "是否自环",
+]
+
+CABLES = ["PD_VLY-8.7/10-3×300", "PD_YJV22-8.7/15-3×240", "PD_YJLV22-8.7/15-3×400"]
+OVERHEADS = ["PD_JKLYJ-240", "PD_JKLYJ-300", "PD_JKLGYJ-150"]
+
+# 线路型号构成 → 权重（合计 1）
+LINE_MODEL_MIX = {
+    "cable": 0.40,
+    "overhead": 0.25,
+    "cable_overhead": 0.20,
+    "with_none": 0.10,
+    "none": 0.03,
+    "empty": 0.02,
+}
+
+DEVICE_TYPES = ["柱上负荷开关", "杆", "站外-电缆终端头", "箱式变电站", "环网柜"]
+
+
+def _percent_parts(rng, names):
+    """若干段按随机比例拆分，百分数两位小数、合计 100%（同真实导出格式）。"""
+    weights = [rng.random() + 0.1 for _ in names]
+    total = sum(weights)
+    parts = [round(w / total * 100, 2) for w in weights]
+    parts[-1] = round(100 - sum(parts[:-1]), 2)
+    return "\n".join(f"{name}: {p:.2f}%" for name, p in zip(names, parts))
+
+
+def line_model(rng):
+    kind = rng.choices(list(LINE_MODEL_MIX), weights=list(LINE_MODEL_MIX.values()))[0]
+    if kind == "cable":
+        return f"{rng.choice(CABLES)}: 100.00%"
+    if kind == "overhead":
+        return f"{rng.choice(OVERHEADS)}: 100.00%"
+    if kind == "cable_overhead":
+        return _percent_parts(rng, [rng.choice(OVERHEADS), rng.choice(CABLES)])
+    if kind == "with_none":
+        return _percent_parts(rng, [rng.choice(OVERHEADS), "None", rng.choice(CABLES)])
+    if kind == "none":
+        return "None: 100.00%"
+    return ""
+
+
+def _segment_values(rng, automation_rate, zero_user_rate):
+    length = rng.lognormvariate(math.log(0.25), 0.9)
+    users = 0 if rng.random() < zero_user_rate else rng.randint(1, 30)
+    public = rng.randint(0, users)
+    capacity = users * rng.choice([200, 315, 400, 630])
+    auto = "TRUE" if rng.random() < automation_rate else "FALSE"
+    return f"{min(length, 8.0):.3f}", float(users), float(public), float(capacity), auto
+
+
+def generate_feeder(path, segments, seed=0, branch_ratio=0.4, automation_rate=0.3, zero_user_rate=0.2,
+                    devices_per_segment=2, small_branch_ratio=0.2, tie_rate=0.05, feeder="10kV合成线"):
+    """
+    生成一条合成线路工作簿。
+    segments: 主线 + 分支分段总数（分支约占 branch_ratio，至少各 1 个）
+    devices_per_segment: 设备级 Sheet 每个分段的设备数；为 0 时不生成设备级 Sheet
+    返回: {"主线": 行数, "分支": 行数, "设备": 行数}
+    """
+    rng = random.Random(f"{SYNTH_VERSION}-{segments}-{seed}")
+    n_branch = max(1, int(round(segments * branch_ratio))) if segments > 1 else 0
+    n_main = max(1, segments - n_branch)
+
+    wb = Workbook(write_only=True)
+    ws_main = wb.create_sheet("主线")
+    ws_branch = wb.create_sheet("分支")
+    ws_main.append(MAIN_COLUMNS)
+    ws_branch.append(BRANCH_COLUMNS)
+
+    main_last = []
+    for k in range(n_main):
+        length, users, public, capacity, auto = _segment_values(rng, automation_rate, zero_user_rate)
+        tie = f"联络开关M{k}" if rng.random() < tie_rate else ""
+        ws_main.append([
+            f"分段{k}", f"{feeder}主线{k}开关" if k else f"{feeder}出线断路器", auto, f"{feeder}主线{k + 1}开关", "FALSE",
+            length, users, capacity, public, str(int(capacity / 2)), users - public, str(int(capacity / 2)),
+            float(bool(tie)), tie, line_model(rng), float(rng.randint(0, 4)),
+        ])
+        main_last.append(f"{feeder}主线{k}末设备")
+
+    # 大分支挂在随机主线分段末设备上，或（约三成）挂在前一个大分支末设备上
+    branch_parent = []
+    for b in range(n_branch):
+        length, users, public, capacity, auto = _segment_values(rng, automation_rate, zero_user_rate)
+        tie = f"联络开关B{b}" if rng.random() < tie_rate else ""
+        ws_branch.append([
+            f"分段{b}", f"{feeder}分支{b}起点", f"{feeder}分支{b}开关", auto, "线路末端", "大分支",
+            length, users, capacity, public, str(int(capacity / 2)), users - public, str(int(capacity / 2)),
+            tie, line_model(rng),
+        ])
+        if b and rng.random() < 0.3:
+            branch_parent.append(f"{feeder}分支{b - 1}末设备")
+        else:
+            branch_parent.append(main_last[rng.randrange(n_main)])
+
+    device_rows = 0
+    if devices_per_segment > 0:
+        ws = wb.create_sheet("主线（2）")
+        ws.append(MAIN_DEVICE_COLUMNS)
+        for k in range(n_main):
+            ws.append([f"分段{k}", f"{feeder}主线{k}开关", "FALSE", f"{feeder}主线{k + 1}开关"] + [None] * 9)
+            parent = main_last[k - 1] if k else f"{feeder}母线"
+            for d in range(devices_per_segment):
+                name = main_last[k] if d == devices_per_segment - 1 else f"{feeder}主线{k}设备{d}"
+                ws.append([None] * 4 + [float(d + 1), rng.choice(DEVICE_TYPES), name, parent, None, f"主环分段{k}", feeder, None, None])
+                parent = name
+                device_rows += 1
+
+        ws = wb.create_sheet("分支（2）")
+        ws.append(BRANCH_DEVICE_COLUMNS)
+        small = 0
+        for b in range(n_branch):
+            # 小分支：不在 分支 Sheet 中，挂在主线分段上，建树时并入所挂节点
+            while rng.random() < small_branch_ratio:
+                ws.append([f"小分支{small}", None, None, "小分支", 0.0] + [None] * 10)
+                ws.append([None] * 5 + [1.0, "箱式变电站", f"{feeder}小分支{small}配变", main_last[rng.randrange(n_main)],
+                                        None, f"分支小分支{small}", feeder, None, 1.0, "否"])
+                small += 1
+                device_rows += 1
+            ws.append([f"分段{b}", f"{feeder}分支{b}起点", "线路末端", "大分支", 0.0] + [None] * 10)
+            parent = branch_parent[b]
+            for d in range(devices_per_segment):
+                name = f"{feeder}分支{b}末设备" if d == devices_per_segment - 1 else f"{feeder}分支{b}设备{d}"
+                ws.append([None] * 5 + [float(d + 1), rng.choice(DEVICE_TYPES), name, parent, None, f"分支分段{b}", feeder, None, None, "否"])
+                parent = name
+                device_rows += 1
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    wb.save(path)
+    return {"主线": n_main, "分支": n_branch, "设备": device_rows}
+
+
+def synth_path(directory, segments, seed=0, devices_per_segment=2):
+    return os.path.join(directory, f"synth_v{SYNTH_VERSION}_{segments}seg_s{seed}_d{devices_per_segment}.xlsx")
+
+
+def ensure_feeder(directory, segments, seed=0, devices_per_segment=2):
+    """已生成过同参数的工作簿时直接复用。"""
+    path = synth_path(directory, segments, seed, devices_per_segment)
+    if not os.path.exists(path):
+        tmp = path + ".tmp.xlsx"
+        generate_feeder(tmp, segments, seed, devices_per_segment=devices_per_segment)
+        os.replace(tmp, path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="生成合成线路工作簿（主线 / 分支 / 主线（2）/ 分支（2））")
+    parser.add_argument("segments", type=int, nargs="+", help="分段数（主线 + 分支），可指定多个")
+    parser.add_argument("-o", "--output-dir", default="benchmarks/data", help="输出目录；默认 benchmarks/data")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--devices", type=int, default=2, help="设备级 Sheet 每个分段的设备数；0 不生成设备级 Sheet")
+    args = parser.parse_args()
+    for n in args.segments:
+        path = synth_path(args.output_dir, n, args.seed, args.devices)
+        counts = generate_feeder(path, n, args.seed, devices_per_segment=args.devices)
+        print(f"{path}: 主线 {counts['主线']} 行，分支 {counts['分支']} 行，设备 {counts['设备']} 行")
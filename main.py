@@ -7,14 +7,17 @@
 未指定 -o 时，默认保存到 /mnt/d/pwkkx/workspace/result/<输入文件名>_可靠性计算结果.xlsx
 """
 
+import time
+
+_T0 = time.perf_counter()
+
 import argparse
 import json
 import os
 import sys
-import pandas as pd
-import numpy as np
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
+from functools import lru_cache
+
+# pandas / numpy / openpyxl 等重模块在各阶段函数内按需导入：--help、参数错误与 --lite 单线路路径不加载 pandas
 
 
 def load_config(config_path):
@@ -24,6 +27,18 @@ def load_config(config_path):
     return cfg
 
 
+# 输出级别（参数文件 verbose / --verbose）：0 不输出；1 步骤与汇总；2 另逐分段输出敷设方式与分段指标
+VERBOSE_QUIET, VERBOSE_STEPS, VERBOSE_SEGMENTS = 0, 1, 2
+
+
+def verbosity(config):
+    """参数文件 verbose 取值：false / true 等同 0 / 2（原有的逐分段输出，缺省同 true），也可直接写 0 / 1 / 2。"""
+    value = config.get("verbose", True)
+    if isinstance(value, bool):
+        return VERBOSE_SEGMENTS if value else VERBOSE_QUIET
+    return int(value)
+
+
 def _log(msg, verbose):
     if verbose:
         print(msg)
@@ -63,13 +78,47 @@ def parse_laying_weights_and_fault_rate(line_model, constants):
     return cable_w / total, overhead_w / total, rate, desc
 
 
-def get_isolation_time(auto_status, constants):
+LAYING_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=LAYING_CACHE_SIZE)
+def _parse_laying_cached(line_model, cable_rate, overhead_rate):
+    return parse_laying_weights_and_fault_rate(line_model, {"Cable_Fault_Rate": cable_rate, "Overhead_Fault_Rate": overhead_rate})
+
+
+def parse_laying_column(values, constants):
+    """
+    整列敷设方式解析：先对原始线路型号去重，每个不同取值只解析一次（进程内 LRU 缓存，批量模式下跨线路共享），
+    再按编码广播回数组。
+    返回: (电缆权重, 架空权重, 加权故障率, 描述) 四个 NumPy 数组
+    """
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    cable_rate = constants["Cable_Fault_Rate"]
+    overhead_rate = constants["Overhead_Fault_Rate"]
+    records = [_parse_laying_cached(str(u), cable_rate, overhead_rate) for u in uniques]
+    cable_w = np.fromiter((r[0] for r in records), dtype=np.float64, count=len(records))
+    overhead_w = np.fromiter((r[1] for r in records), dtype=np.float64, count=len(records))
+    rate = np.fromiter((r[2] for r in records), dtype=np.float64, count=len(records))
+    desc = np.array([r[3] for r in records], dtype=object)
+    return cable_w[codes], overhead_w[codes], rate[codes], desc[codes]
+
+
+def is_automated(auto_status):
     if isinstance(auto_status, bool):
-        return constants["Auto_Isolation_Time"] if auto_status else constants["Manual_Isolation_Time"]
-    return constants["Auto_Isolation_Time"] if str(auto_status).upper() == "TRUE" else constants["Manual_Isolation_Time"]
+        return auto_status
+    return str(auto_status).upper() == "TRUE"
+
+
+def get_isolation_time(auto_status, constants):
+    return constants["Auto_Isolation_Time"] if is_automated(auto_status) else constants["Manual_Isolation_Time"]
 
 
 def clean_data(df, line_type, verbose):
+    import pandas as pd
+
     original_count = len(df)
     df["长度(km)"] = pd.to_numeric(df["长度(km)"], errors="coerce")
     df["用户数(台)"] = pd.to_numeric(df["用户数(台)"], errors="coerce")
@@ -78,55 +127,46 @@ def clean_data(df, line_type, verbose):
     return df
 
 
-def calculate_segment_indicators(df, line_total_users, line_type, constants, verbose):
-    df = df.copy()
-    df["有效分段"] = df["用户数(台)"] > 0
-    df["故障次数(次/年)"] = np.where(df["有效分段"], df["长度(km)"] * df["故障率"], 0)
-    df["故障总时间(小时/次)"] = df["隔离时间"] + constants["Cable_Repair_Time"]
-    df["SAIDI-F"] = np.where(
-        df["有效分段"] & (line_total_users > 0),
-        (df["故障次数(次/年)"] * df["故障总时间(小时/次)"] * df["用户数(台)"]) / line_total_users,
-        0,
-    )
-    df["SAIFI-F"] = np.where(
-        df["有效分段"] & (line_total_users > 0),
-        (df["故障次数(次/年)"] * df["用户数(台)"]) / line_total_users,
-        0,
-    )
-    df["预安排次数(次/年)"] = np.where(
-        df["有效分段"],
-        df["长度(km)"] * constants["Scheduled_Outage_Rate"],
-        0,
-    )
-    df["SAIDI-S"] = np.where(
-        df["有效分段"] & (line_total_users > 0),
-        (df["预安排次数(次/年)"] * constants["Scheduled_Total_Time"] * df["用户数(台)"]) / line_total_users,
-        0,
-    )
-    df["SAIFI-S"] = np.where(
-        df["有效分段"] & (line_total_users > 0),
-        (df["预安排次数(次/年)"] * df["用户数(台)"]) / line_total_users,
-        0,
-    )
-    df["SAIDI合计"] = df["SAIDI-F"] + df["SAIDI-S"]
-    df["SAIFI合计"] = df["SAIFI-F"] + df["SAIFI-S"]
-
-    if verbose:
+def _log_segments(df, line_total_users, line_type, verbose):
+    if verbose >= VERBOSE_SEGMENTS:
         _log(f"\n--- {line_type}分段级计算（分母={line_total_users}） ---", verbose)
         for idx, row in df.iterrows():
             _log(f"  【{row['分段编号']}】 长度={row['长度(km)']}km 用户={row['用户数(台)']} 有效={row['有效分段']} 故障率={row['故障率']:.6f} SAIDI合计={row['SAIDI合计']:.6f} SAIFI合计={row['SAIFI合计']:.6f}", verbose)
+
+
+def attach_segment_results(df, table, result, g):
+    """将内核结果中第 g 个分组的分段指标写回 DataFrame（仅输出端使用）。"""
+    from reliability.kernel import RESULT_FIELDS
+
+    sl = table.slice(g)
+    df["有效分段"] = table.users[sl] > 0
+    for k, name in enumerate(RESULT_FIELDS):
+        df[name] = result[k, sl]
     return df
 
 
-def calculate_summary(df, line_total_users, line_type, constants, verbose):
-    total_length = df["长度(km)"].sum()
-    total_fault_count = df["故障次数(次/年)"].sum()
-    total_scheduled_count = df["预安排次数(次/年)"].sum()
-    saidi_f = df["SAIDI-F"].sum()
-    saidi_s = df["SAIDI-S"].sum()
+def calculate_segment_indicators(df, line_total_users, line_type, constants, verbose):
+    from reliability.kernel import SegmentTable, segment_kernel
+
+    df = df.copy()
+    table = SegmentTable.from_frames([df])
+    result = segment_kernel(table, constants, [line_total_users])
+    attach_segment_results(df, table, result, 0)
+    _log_segments(df, line_total_users, line_type, verbose)
+    return df
+
+
+def summary_record(line_type, line_total_users, sums, constants, verbose):
+    """
+    由汇总量构建指标汇总行。
+    sums: 总长度(km) / 总故障次数(次/年) / 总预安排次数(次/年) / SAIDI-F / SAIDI-S / SAIFI-F / SAIFI-S
+    """
+    total_length = sums["总长度(km)"]
+    saidi_f = sums["SAIDI-F"]
+    saidi_s = sums["SAIDI-S"]
     saidi_total = saidi_f + saidi_s
-    saifi_f = df["SAIFI-F"].sum()
-    saifi_s = df["SAIFI-S"].sum()
+    saifi_f = sums["SAIFI-F"]
+    saifi_s = sums["SAIFI-S"]
     saifi_total = saifi_f + saifi_s
     if line_total_users > 0:
         theory_hours = line_total_users * constants["Annual_Power_Hours"]
@@ -140,8 +180,8 @@ def calculate_summary(df, line_total_users, line_type, constants, verbose):
         "线路类型": line_type,
         "总长度(km)": round(total_length, 4),
         "总用户数(台)": line_total_users,
-        "总故障次数(次/年)": round(total_fault_count, 6),
-        "总预安排次数(次/年)": round(total_scheduled_count, 6),
+        "总故障次数(次/年)": round(sums["总故障次数(次/年)"], 6),
+        "总预安排次数(次/年)": round(sums["总预安排次数(次/年)"], 6),
         "SAIDI-F": round(saidi_f, 6),
         "SAIDI-S": round(saidi_s, 6),
         "SAIDI合计": round(saidi_total, 6),
@@ -152,172 +192,992 @@ def calculate_summary(df, line_total_users, line_type, constants, verbose):
     }
 
 
+def calculate_summary(df, line_total_users, line_type, constants, verbose):
+    sums = {
+        "总长度(km)": df["长度(km)"].sum(),
+        "总故障次数(次/年)": df["故障次数(次/年)"].sum(),
+        "总预安排次数(次/年)": df["预安排次数(次/年)"].sum(),
+        "SAIDI-F": df["SAIDI-F"].sum(),
+        "SAIDI-S": df["SAIDI-S"].sum(),
+        "SAIFI-F": df["SAIFI-F"].sum(),
+        "SAIFI-S": df["SAIFI-S"].sum(),
+    }
+    return summary_record(line_type, line_total_users, sums, constants, verbose)
+
+
+def combine_summaries(main_summary, branch_summary, constants):
+    """主线、分支汇总按用户数加权合成全线路汇总。"""
+    main_total_users = main_summary["总用户数(台)"]
+    branch_total_users = branch_summary["总用户数(台)"]
+    all_total_users = main_total_users + branch_total_users
+    all_saidi_f = (main_summary["SAIDI-F"] * main_total_users + branch_summary["SAIDI-F"] * branch_total_users) / all_total_users
+    all_saidi_s = (main_summary["SAIDI-S"] * main_total_users + branch_summary["SAIDI-S"] * branch_total_users) / all_total_users
+    all_saidi_total = all_saidi_f + all_saidi_s
+    all_saifi_f = (main_summary["SAIFI-F"] * main_total_users + branch_summary["SAIFI-F"] * branch_total_users) / all_total_users
+    all_saifi_s = (main_summary["SAIFI-S"] * main_total_users + branch_summary["SAIFI-S"] * branch_total_users) / all_total_users
+    all_saifi_total = all_saifi_f + all_saifi_s
+    all_theory = all_total_users * constants["Annual_Power_Hours"]
+    all_asai = ((all_theory - all_saidi_total * all_total_users) / all_theory) * 100
+    return {
+        "线路类型": "全线路",
+        "总长度(km)": round(main_summary["总长度(km)"] + branch_summary["总长度(km)"], 4),
+        "总用户数(台)": all_total_users,
+        "总故障次数(次/年)": round(main_summary["总故障次数(次/年)"] + branch_summary["总故障次数(次/年)"], 6),
+        "总预安排次数(次/年)": round(main_summary["总预安排次数(次/年)"] + branch_summary["总预安排次数(次/年)"], 6),
+        "SAIDI-F": round(all_saidi_f, 6),
+        "SAIDI-S": round(all_saidi_s, 6),
+        "SAIDI合计": round(all_saidi_total, 6),
+        "SAIFI-F": round(all_saifi_f, 6),
+        "SAIFI-S": round(all_saifi_s, 6),
+        "SAIFI合计": round(all_saifi_total, 6),
+        "ASAI(%)": round(all_asai, 6),
+    }
+
+
 DEFAULT_OUTPUT_DIR = "/mnt/d/pwkkx/workspace/result"
 
+OUTPUT_COLS = [
+    "分段编号", "长度(km)", "用户数(台)", "电缆权重", "架空权重", "敷设方式描述", "自动化状态", "故障率", "隔离时间",
+    "故障次数(次/年)", "故障总时间(小时/次)", "预安排次数(次/年)",
+    "SAIDI-F", "SAIDI-S", "SAIDI合计", "SAIFI-F", "SAIFI-S", "SAIFI合计",
+]
+
+
+def _banner(title, verbose):
+    if verbose:
+        print("=" * 80)
+        print(title)
+        print("=" * 80)
+
+
+def input_mappings(config):
+    """分段表读取的全部列映射（字段映射 + 网架指标附带列），同时作为输入层缓存键的一部分。"""
+    from reliability.metrics import metric_mappings
+
+    extra_main, extra_branch = metric_mappings(config)
+    mappings = dict(config["field_mappings"])
+    if extra_main or extra_branch:
+        mappings["extra"] = {"main": extra_main, "branch": extra_branch}
+    return mappings
+
+
+def _attach_extra(df, mapped, extra):
+    """附带列：工作簿中存在时随分段表带出，缺失时为空。"""
+    for src, dst in extra.items():
+        if dst not in mapped:
+            mapped[dst] = df[src] if src in df else None
+    return mapped
+
+
+def load_segments(excel_path, config, probe=None):
+    """
+    第二步～第四步：读取 Excel、字段映射、数据清洗。
+    probe: 可选阶段计量（reliability.instrument.Probe），记录 读取 / 字段映射 / 清洗 三个阶段
+    返回: (主线清洗后, 分支清洗后)
+    """
+    import pandas as pd
+    from reliability.instrument import NULL_PROBE
+    from reliability.metrics import metric_mappings
 
-def run(config_path=None, input_path=None, output_path=None):
-    if config_path is None:
-        base = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(base, "config", "reliability_params.json")
-    config = load_config(config_path)
-    constants = config["constants"]
     inp = config["input"]
     field_mappings = config["field_mappings"]
-    verbose = config.get("verbose", True)
+    verbose = verbosity(config)
 
     main_sheet = inp["main_sheet"]
     branch_sheet = inp["branch_sheet"]
-    excel_path = input_path
-    if output_path is None:
-        out_dir = DEFAULT_OUTPUT_DIR
-        os.makedirs(out_dir, exist_ok=True)
-        base_name = os.path.splitext(os.path.basename(excel_path))[0]
-        output_path = os.path.join(out_dir, f"{base_name}_可靠性计算结果.xlsx")
-
     main_map = field_mappings["main"]
     branch_map = field_mappings["branch"]
+    extra_main, extra_branch = metric_mappings(config)
+    probe = probe or NULL_PROBE
 
-    def step(title, fn):
-        if verbose:
-            print("=" * 80)
-            print(title)
-            print("=" * 80)
-        return fn()
-
-    # 1) 常量
-    step("【第一步】核心常量", lambda: [_log(f"  {k}: {v}", verbose) for k, v in constants.items()] or None)
+    def step(title, stage, fn):
+        _banner(title, verbose)
+        with probe.stage(stage) as s:
+            result = fn()
+            s.rows = sum(len(df) for df in result)
+        return result
 
-    # 2) 读取 Excel
+    # 2) 读取 Excel（网架指标附带列在同一次读取中带出）
     def read_excel():
-        xls = pd.ExcelFile(excel_path)
+        if inp.get("reader", "stream") == "stream":
+            from reliability.xlsx_reader import read_projected_sheets
+
+            main_cols = list(main_map) + [c for c in extra_main if c not in main_map]
+            branch_cols = list(branch_map) + [c for c in extra_branch if c not in branch_map]
+            sheet_names, frames = read_projected_sheets(
+                excel_path, {main_sheet: main_cols, branch_sheet: branch_cols},
+                optional={main_sheet: list(extra_main), branch_sheet: list(extra_branch)})
+            df_main, df_branch = frames[main_sheet], frames[branch_sheet]
+        else:
+            xls = pd.ExcelFile(excel_path)
+            sheet_names = xls.sheet_names
+            df_main = pd.read_excel(xls, main_sheet)
+            df_branch = pd.read_excel(xls, branch_sheet)
         _log(f"Excel: {excel_path}", verbose)
-        _log(f"Sheet: {xls.sheet_names}", verbose)
-        df_main = pd.read_excel(xls, main_sheet)
-        df_branch = pd.read_excel(xls, branch_sheet)
+        _log(f"Sheet: {sheet_names}", verbose)
         _log(f"主线行数: {len(df_main)}  分支行数: {len(df_branch)}", verbose)
         return df_main, df_branch
 
-    df_main, df_branch = step("【第二步】读取Excel", read_excel)
+    df_main, df_branch = step("【第二步】读取Excel", "read", read_excel)
 
     # 3) 字段映射
     def do_mapping():
-        df_m = df_main.rename(columns=main_map)[list(main_map.values())]
-        df_b = df_branch.rename(columns=branch_map)[list(branch_map.values())]
+        df_m = _attach_extra(df_main, df_main.rename(columns=main_map)[list(main_map.values())], extra_main)
+        df_b = _attach_extra(df_branch, df_branch.rename(columns=branch_map)[list(branch_map.values())], extra_branch)
         _log("主线列: " + str(list(main_map.values())), verbose)
         _log("分支列: " + str(list(branch_map.values())), verbose)
         return df_m, df_b
 
-    df_main_mapped, df_branch_mapped = step("【第三步】字段映射", do_mapping)
+    df_main_mapped, df_branch_mapped = step("【第三步】字段映射", "mapping", do_mapping)
 
     # 4) 数据清洗
-    df_main_clean = clean_data(df_main_mapped.copy(), "主线", verbose)
-    df_branch_clean = clean_data(df_branch_mapped.copy(), "分支", verbose)
+    with probe.stage("clean") as s:
+        df_main_clean = clean_data(df_main_mapped, "主线", verbose)
+        df_branch_clean = clean_data(df_branch_mapped, "分支", verbose)
+        s.rows = len(df_main_clean) + len(df_branch_clean)
 
-    if verbose:
-        print("=" * 80)
-        print("【第四步】数据清洗")
-        print("=" * 80)
+    _banner("【第四步】数据清洗", verbose)
+    return df_main_clean, df_branch_clean
+
+
+def get_segments(excel_path, config, cache=None, cache_key=None, probe=None):
+    """清洗后的主线/分支分段表，优先使用输入层缓存。"""
+    if cache is not None:
+        if cache_key is None:
+            cache_key = cache.input_key(excel_path, config["input"], input_mappings(config))
+        cleaned = cache.load_input(cache_key)
+        if cleaned is not None:
+            _log(f"输入缓存命中，跳过读取与清洗: {excel_path}", verbosity(config))
+            return cleaned
+    cleaned = load_segments(excel_path, config, probe)
+    if cache is not None:
+        cache.store_input(cache_key, *cleaned)
+    return cleaned
+
+
+def prepare_segments(df, constants):
+    """第五步：敷设方式解析 + 故障率、隔离时间（就地写入 df）。"""
+    cable_w, overhead_w, rate, desc = parse_laying_column(df["敷设方式_原始"], constants)
+    df["电缆权重"] = cable_w
+    df["架空权重"] = overhead_w
+    df["故障率"] = rate
+    df["敷设方式描述"] = desc
+    df["隔离时间"] = df["自动化状态"].apply(lambda x: get_isolation_time(x, constants))
+    return df
+
+
+def compute_feeder(excel_path, config, cache=None, probe=None):
+    """
+    单条线路完整计算流程（第一步～第九步）。
+    cache: 可选 ResultCache；命中结果层时直接返回，命中输入层时跳过读取与清洗。
+    probe: 可选阶段计量（reliability.instrument.Probe）；为 None 时不计量
+    返回: (主线分段结果, 分支分段结果, 指标汇总DataFrame)
+    """
+    import pandas as pd
+    from reliability.instrument import NULL_PROBE
+    from reliability.kernel import LINE_TYPES, SegmentTable, group_sums, group_total_users, segment_kernel
+
+    constants = config["constants"]
+    verbose = verbosity(config)
+    probe = probe or NULL_PROBE
+
+    # 1) 常量
+    _banner("【第一步】核心常量", verbose)
+    for k, v in constants.items():
+        _log(f"  {k}: {v}", verbose)
+
+    cache_key = None
+    if cache is not None:
+        with probe.stage("cache") as s:
+            cache_key = cache.input_key(excel_path, config["input"], input_mappings(config))
+            hit = cache.load_result(cache_key, constants)
+            if hit is not None:
+                s.rows = sum(len(df) for df in hit)
+        if hit is not None:
+            _log(f"结果缓存命中: {excel_path}", verbose)
+            if verbose:
+                print(hit[2].to_string(index=False))
+            return hit
+    df_main_clean, df_branch_clean = get_segments(excel_path, config, cache, cache_key, probe)
 
     # 5) 敷设方式解析 + 故障率、隔离时间
-    if verbose:
-        print("=" * 80)
-        print("【第五步】敷设方式解析（带JK→架空，None→忽略，不带JK→电缆）")
-        print("=" * 80)
+    _banner("【第五步】敷设方式解析（带JK→架空，None→忽略，不带JK→电缆）", verbose)
 
     for df, name in [(df_main_clean, "主线"), (df_branch_clean, "分支")]:
-        parsed = df["敷设方式_原始"].apply(lambda x: parse_laying_weights_and_fault_rate(x, constants))
-        df["电缆权重"] = [x[0] for x in parsed]
-        df["架空权重"] = [x[1] for x in parsed]
-        df["故障率"] = [x[2] for x in parsed]
-        df["敷设方式描述"] = [x[3] for x in parsed]
-        df["隔离时间"] = df["自动化状态"].apply(lambda x: get_isolation_time(x, constants))
-        if verbose:
+        with probe.stage("laying", len(df)):
+            prepare_segments(df, constants)
+        if verbose >= VERBOSE_SEGMENTS:
             for idx, row in df.iterrows():
                 _log(f"  {row['分段编号']}: {row['敷设方式描述']} 故障率={row['故障率']:.6f}", verbose)
 
     # 6) 线路总用户数
-    if verbose:
-        print("=" * 80)
-        print("【第六步】线路总用户数")
-        print("=" * 80)
-    main_total_users = int(df_main_clean["用户数(台)"].sum())
-    branch_total_users = int(df_branch_clean["用户数(台)"].sum())
+    _banner("【第六步】线路总用户数", verbose)
+    frames = [df_main_clean, df_branch_clean]
+    # 分段表构建计入分段内核阶段（行数记在第七步）
+    with probe.stage("kernel"):
+        table = SegmentTable.from_frames(frames)
+        total_users = group_total_users(table)
+    main_total_users, branch_total_users = int(total_users[0]), int(total_users[1])
     all_total_users = main_total_users + branch_total_users
     _log(f"主线={main_total_users} 分支={branch_total_users} 全线路={all_total_users}", verbose)
 
-    # 7) 分段级指标
-    if verbose:
-        print("=" * 80)
-        print("【第七步】分段级可靠性指标计算")
-        print("=" * 80)
-    df_main_result = calculate_segment_indicators(df_main_clean, main_total_users, "主线", constants, verbose)
-    df_branch_result = calculate_segment_indicators(df_branch_clean, branch_total_users, "分支", constants, verbose)
+    # 7) 分段级指标：主线、分支一次内核计算
+    _banner("【第七步】分段级可靠性指标计算", verbose)
+    with probe.stage("kernel", len(table)):
+        result = segment_kernel(table, constants, total_users)
+        for g, df in enumerate(frames):
+            attach_segment_results(df, table, result, g)
+    for g, df in enumerate(frames):
+        _log_segments(df, int(total_users[g]), LINE_TYPES[g], verbose)
+    df_main_result, df_branch_result = frames
 
     # 8) 汇总级指标
-    if verbose:
-        print("=" * 80)
-        print("【第八步】汇总级指标")
-        print("=" * 80)
-    main_summary = calculate_summary(df_main_result, main_total_users, "主线", constants, verbose)
-    branch_summary = calculate_summary(df_branch_result, branch_total_users, "分支", constants, verbose)
+    _banner("【第八步】汇总级指标", verbose)
+    with probe.stage("summary", 3):
+        sums = group_sums(table, result)
+        main_summary, branch_summary = [
+            summary_record(LINE_TYPES[g], int(total_users[g]), {k: v[g] for k, v in sums.items()}, constants, verbose)
+            for g in range(2)
+        ]
 
-    # 9) 全线路加权汇总
-    all_saidi_f = (main_summary["SAIDI-F"] * main_total_users + branch_summary["SAIDI-F"] * branch_total_users) / all_total_users
-    all_saidi_s = (main_summary["SAIDI-S"] * main_total_users + branch_summary["SAIDI-S"] * branch_total_users) / all_total_users
-    all_saidi_total = all_saidi_f + all_saidi_s
-    all_saifi_f = (main_summary["SAIFI-F"] * main_total_users + branch_summary["SAIFI-F"] * branch_total_users) / all_total_users
-    all_saifi_s = (main_summary["SAIFI-S"] * main_total_users + branch_summary["SAIFI-S"] * branch_total_users) / all_total_users
-    all_saifi_total = all_saifi_f + all_saifi_s
-    all_theory = all_total_users * constants["Annual_Power_Hours"]
-    all_asai = ((all_theory - all_saidi_total * all_total_users) / all_theory) * 100
-    all_summary = {
-        "线路类型": "全线路",
-        "总长度(km)": round(main_summary["总长度(km)"] + branch_summary["总长度(km)"], 4),
-        "总用户数(台)": all_total_users,
-        "总故障次数(次/年)": round(main_summary["总故障次数(次/年)"] + branch_summary["总故障次数(次/年)"], 6),
-        "总预安排次数(次/年)": round(main_summary["总预安排次数(次/年)"] + branch_summary["总预安排次数(次/年)"], 6),
-        "SAIDI-F": round(all_saidi_f, 6),
-        "SAIDI-S": round(all_saidi_s, 6),
-        "SAIDI合计": round(all_saidi_total, 6),
-        "SAIFI-F": round(all_saifi_f, 6),
-        "SAIFI-S": round(all_saifi_s, 6),
-        "SAIFI合计": round(all_saifi_total, 6),
-        "ASAI(%)": round(all_asai, 6),
-    }
+        # 9) 全线路加权汇总
+        all_summary = combine_summaries(main_summary, branch_summary, constants)
 
-    summary_df = pd.DataFrame([main_summary, branch_summary, all_summary])
+        summary_df = pd.DataFrame([main_summary, branch_summary, all_summary])
+    _banner("【第九步】最终汇总", verbose)
     if verbose:
-        print("=" * 80)
-        print("【第九步】最终汇总")
-        print("=" * 80)
         print(summary_df.to_string(index=False))
+    if cache is not None:
+        cache.store_result(cache_key, constants, df_main_result, df_branch_result, summary_df)
+    return df_main_result, df_branch_result, summary_df
+
+
+def default_output_path(excel_path):
+    base_name = os.path.splitext(os.path.basename(excel_path))[0]
+    return os.path.join(DEFAULT_OUTPUT_DIR, f"{base_name}_可靠性计算结果.xlsx")
+
+
+def make_cache(config, use_cache=True):
+    """按参数文件 cache 段创建结果缓存；use_cache=False（--no-cache）时不使用缓存。"""
+    if not use_cache:
+        return None
+    from reliability.cache import cache_from_config
+
+    return cache_from_config(config, os.path.dirname(os.path.abspath(__file__)))
+
+
+def open_warehouse(config, store=""):
+    """按参数文件 warehouse 段打开结果仓库；store 为 --store 指定的数据库路径，空串时取参数文件 warehouse.path。"""
+    from reliability.warehouse import Warehouse, warehouse_config, warehouse_path
+
+    wc = warehouse_config(config)
+    return Warehouse(store or warehouse_path(wc, os.path.dirname(os.path.abspath(__file__))), wc["batch_rows"])
+
+
+def run(config_path=None, input_path=None, output_path=None, use_cache=True, fmt=None, store=None, lite=False,
+        profile_path=None, prometheus_path=None, verbose=None, trace_path=None):
+    """
+    单线路模式；lite=True 时小文件走不导入 pandas 的轻量路径（见 reliability.lite），不满足条件时回退到完整路径。
+    profile_path / prometheus_path: 分阶段计量报告（JSON / Prometheus 文本）的保存路径，均为 None 时不计量。
+    verbose: 输出级别，覆盖参数文件 verbose；trace_path: 分段追踪文件（见 reliability.trace），为 None 时不生成。
+    """
+    from reliability.instrument import NULL_PROBE, Probe, StageReport
+    from reliability.output import with_format
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    if verbose is not None:
+        config["verbose"] = verbose
+
+    excel_path = input_path
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        output_path = default_output_path(excel_path)
+    output_path = with_format(output_path, fmt)
+    report = None
+    probe = NULL_PROBE
+    if profile_path or prometheus_path:
+        report = StageReport("single", excel_path)
+        probe = Probe()
+
+    if lite:
+        from reliability.lite import compute_feeder_lite, lite_fallback, write_feeder_result_lite
 
-    # 10) 输出 Excel
-    output_cols = [
-        "分段编号", "长度(km)", "用户数(台)", "电缆权重", "架空权重", "敷设方式描述", "自动化状态", "故障率", "隔离时间",
-        "故障次数(次/年)", "故障总时间(小时/次)", "预安排次数(次/年)",
-        "SAIDI-F", "SAIDI-S", "SAIDI合计", "SAIFI-F", "SAIFI-S", "SAIFI合计",
-    ]
-    wb = Workbook()
-    wb.remove(wb.active)
-    ws1 = wb.create_sheet(title="主线分段明细")
-    for r in dataframe_to_rows(df_main_result[output_cols], index=False, header=True):
-        ws1.append(r)
-    ws2 = wb.create_sheet(title="分支分段明细")
-    for r in dataframe_to_rows(df_branch_result[output_cols], index=False, header=True):
-        ws2.append(r)
-    ws3 = wb.create_sheet(title="指标汇总")
-    for r in dataframe_to_rows(summary_df, index=False, header=True):
-        ws3.append(r)
-    wb.save(output_path)
+        reason = lite_fallback(excel_path, output_path, config, fmt, store, trace_path)
+        if reason is None:
+            main_rows, branch_rows, summaries = compute_feeder_lite(excel_path, config, probe)
+            with probe.stage("write", len(main_rows) + len(branch_rows) + len(summaries)):
+                write_feeder_result_lite(output_path, main_rows, branch_rows, summaries, fmt=fmt)
+            print(f"\n结果已保存: {output_path}")
+            if report is not None:
+                report.add(excel_path, probe.records)
+                save_stage_report(report, profile_path, prometheus_path)
+            return summaries, output_path
+        print(f"轻量路径不适用（{reason}），使用完整计算")
+
+    df_main_result, df_branch_result, summary_df = compute_feeder(excel_path, config, make_cache(config, use_cache), probe)
+    with probe.stage("write", len(df_main_result) + len(df_branch_result) + len(summary_df)):
+        write_result(output_path, df_main_result, df_branch_result, summary_df, fmt)
     print(f"\n结果已保存: {output_path}")
+    if trace_path:
+        from reliability.trace import write_trace
+
+        n = write_trace(trace_path, df_main_result, df_branch_result, config["constants"])
+        print(f"分段追踪已保存: {trace_path}（{n} 个分段）")
+    if store is not None:
+        from reliability.output import segment_detail
+
+        keys = {"线路名称": os.path.splitext(os.path.basename(excel_path))[0], "输入文件": excel_path}
+        with probe.stage("write", len(df_main_result) + len(df_branch_result) + len(summary_df)), open_warehouse(config, store) as wh:
+            wh.begin_run("single", excel_path, config["constants"])
+            wh.write("分段明细", segment_detail(df_main_result, df_branch_result, OUTPUT_COLS, **keys))
+            wh.write("指标汇总", summary_df.assign(**keys))
+            run_id = wh.finish_run(1, 0)
+        print(f"已写入结果仓库: {wh.path}（运行编号 {run_id}）")
+    if report is not None:
+        report.add(excel_path, probe.records)
+        save_stage_report(report, profile_path, prometheus_path)
     return summary_df, output_path
 
 
+def save_stage_report(report, profile_path=None, prometheus_path=None):
+    """打印分阶段计量摘要，并保存 JSON 报告 / Prometheus 文本。"""
+    for line in report.summary_lines():
+        print(line)
+    if profile_path:
+        report.save_json(profile_path)
+        print(f"阶段计量报告已保存: {profile_path}")
+    if prometheus_path:
+        report.save_prometheus(prometheus_path)
+        print(f"Prometheus 指标已保存: {prometheus_path}")
+
+
+def write_result(output_path, df_main_result, df_branch_result, summary_df, fmt=None):
+    """10) 输出结果：xlsx 为 主线分段明细 / 分支分段明细 / 指标汇总；parquet / csv / jsonl 见 reliability.output。"""
+    from reliability.output import write_feeder_result
+
+    write_feeder_result(output_path, df_main_result, df_branch_result, summary_df, OUTPUT_COLS, fmt)
+
+
+def report_timing(t_ready):
+    """启动耗时自模块开始执行（解释器启动之后）计起；同时报告是否加载了 pandas。"""
+    t_done = time.perf_counter()
+    print(f"耗时: 启动 {(t_ready - _T0) * 1000:.0f} ms，计算与输出 {(t_done - t_ready) * 1000:.0f} ms，"
+          f"合计 {(t_done - _T0) * 1000:.0f} ms；已加载 pandas: {'是' if 'pandas' in sys.modules else '否'}")
+
+
+def default_config_path():
+    base = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base, "config", "reliability_params.json")
+
+
+def run_batch(config_path=None, batch_spec=None, output_path=None, workers=None, use_cache=True, fmt=None, store=None,
+              profile_path=None, prometheus_path=None):
+    """
+    批量模式：并行计算多条线路，输出合并汇总表。
+    输出为 parquet / csv / jsonl 时另将全部线路的分段明细边算边写为一个列式数据集（分段明细 + 指标汇总 等表）；
+    store 不为 None 时同时写入结果仓库（一次运行一个事务）。
+    profile_path / prometheus_path: 同 run，各工作进程逐条线路计量，主进程的写出另计。
+    """
+    from contextlib import nullcontext
+
+    from reliability.batch import collect_inputs, run_batch as _run_batch, write_batch_result
+    from reliability.instrument import StageReport
+    from reliability.output import DETAIL_TABLE, open_writer, with_format
+
+    if config_path is None:
+        config_path = default_config_path()
+    inputs = collect_inputs(batch_spec)
+    if not inputs:
+        print(f"未找到输入文件: {batch_spec}")
+        return None, None
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        output_path = os.path.join(DEFAULT_OUTPUT_DIR, "批量可靠性计算汇总.xlsx")
+    output_path = with_format(output_path, fmt)
+    print(f"批量计算: {len(inputs)} 个文件，进程数={workers or os.cpu_count()}")
+    config = load_config(config_path)
+    report = StageReport("batch", batch_spec) if profile_path or prometheus_path else None
+    with open_writer(output_path, fmt, primary=DETAIL_TABLE) as out, \
+            (open_warehouse(config, store) if store is not None else nullcontext()) as wh:
+        detail = [w for w in (out if out.fmt != "xlsx" else None, wh) if w is not None]
+        if wh is not None:
+            wh.begin_run("batch", batch_spec, config["constants"])
+        summary_df, failure_df, metrics_df = _run_batch(inputs, config_path, workers, use_cache, detail, report)
+        with (report.main.stage("write", len(summary_df)) if report is not None else nullcontext()):
+            write_batch_result(summary_df, failure_df, out, metrics_df)
+            if wh is not None:
+                wh.write("指标汇总", summary_df)
+                run_id = wh.finish_run(len(inputs) - len(failure_df), len(failure_df))
+    print(f"\n成功 {len(inputs) - len(failure_df)} 条，失败 {len(failure_df)} 条")
+    print(f"结果已保存: {output_path}")
+    if wh is not None:
+        print(f"已写入结果仓库: {wh.path}（运行编号 {run_id}）")
+    if report is not None:
+        save_stage_report(report, profile_path, prometheus_path)
+    return summary_df, output_path
+
+
+def run_sweep(config_path=None, input_path=None, spec_path=None, output_path=None, use_cache=True):
+    """参数扫描模式：对一条线路评估多组常量，输出 场景 × 指标 表（.xlsx 或 .csv）。"""
+    from reliability.sweep import load_sweep_spec, run_sweep as _run_sweep
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    config["verbose"] = False
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        base_name = os.path.splitext(os.path.basename(input_path))[0]
+        output_path = os.path.join(DEFAULT_OUTPUT_DIR, f"{base_name}_参数扫描结果.xlsx")
+    frames = get_segments(input_path, config, make_cache(config, use_cache))
+    result = _run_sweep(frames, config["constants"], load_sweep_spec(spec_path))
+    if output_path.lower().endswith(".csv"):
+        result.to_csv(output_path, encoding="utf-8-sig")
+    else:
+        result.to_excel(output_path, sheet_name="参数扫描")
+    print(f"参数扫描: {len(result)} 个场景")
+    print(f"结果已保存: {output_path}")
+    return result, output_path
+
+
+def run_monte_carlo(config_path=None, input_path=None, output_path=None, trials=None, seed=None, workers=None, use_cache=True):
+    """蒙特卡洛模式：抽样年度停电，输出 SAIDI/SAIFI 分布统计并与解析值对照。"""
+    from reliability.kernel import SegmentTable, group_total_users
+    from reliability.montecarlo import monte_carlo_config, simulate, summarize_samples
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    config["verbose"] = False
+    constants = config["constants"]
+    mc = monte_carlo_config(config)
+    if trials:
+        mc["trials"] = trials
+    if seed is not None:
+        mc["seed"] = seed
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        base_name = os.path.splitext(os.path.basename(input_path))[0]
+        output_path = os.path.join(DEFAULT_OUTPUT_DIR, f"{base_name}_蒙特卡洛模拟结果.xlsx")
+
+    df_main_result, df_branch_result, summary_df = compute_feeder(input_path, config, make_cache(config, use_cache))
+    table = SegmentTable.from_frames([df_main_result, df_branch_result])
+    samples = simulate(table, constants, mc, workers)
+    stats = summarize_samples(samples, group_total_users(table), constants, mc, summary_df)
+    print(f"蒙特卡洛模拟: {mc['trials']} 年，seed={mc['seed']}")
+    print(stats.to_string(index=False))
+    stats.to_excel(output_path, sheet_name="分布统计", index=False)
+    print(f"结果已保存: {output_path}")
+    return stats, output_path
+
+
+def run_topology(config_path=None, input_path=None, output_path=None, use_cache=True):
+    """拓扑模式：由 主线（2）/分支（2） 设备父节点建树，计算考虑上下游影响及联络开关转供的 FMEA 指标，并与原公式对照。"""
+    import numpy as np
+    import pandas as pd
+    from reliability.batch import feeder_name
+    from reliability.tie import load_tie_index, node_transfer, read_tie_columns, tie_config
+    from reliability.topology import build_tree, read_device_segments, topology_config, topology_fmea
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    config["verbose"] = False
+    topo = topology_config(config)
+    tie = tie_config(config)
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        base_name = os.path.splitext(os.path.basename(input_path))[0]
+        output_path = os.path.join(DEFAULT_OUTPUT_DIR, f"{base_name}_拓扑可靠性计算结果.xlsx")
+
+    df_main_result, df_branch_result, summary_df = compute_feeder(input_path, config, make_cache(config, use_cache))
+    main_segs, branch_segs = read_device_segments(input_path, topo)
+    parent, unresolved = build_tree(df_main_result, df_branch_result, main_segs, branch_segs)
+    transfer = None
+    if tie["enabled"]:
+        tie_main, tie_branch = read_tie_columns(input_path, config, tie)
+        index = load_tie_index(tie, os.path.dirname(os.path.abspath(__file__)))
+        transfer = node_transfer(df_main_result, df_branch_result, tie_main, tie_branch, feeder_name(input_path), index, tie)
+    detail, topo_summary = topology_fmea(df_main_result, df_branch_result, parent, config["constants"], topo["branch_protection"], transfer)
+    print(f"拓扑 FMEA: {len(detail)} 个分段，{unresolved} 个分段未能由设备父节点定位上级（按顺序挂接）")
+    if transfer is not None:
+        print(f"联络开关转供: {int(np.isfinite(transfer['margin']).sum())} 个分段含联络开关，{int(detail['可转供'].sum())} 个分段可经联络开关转供")
+    print(topo_summary.to_string(index=False))
+    with pd.ExcelWriter(output_path) as writer:
+        detail.to_excel(writer, sheet_name="拓扑分段明细", index=False)
+        topo_summary.to_excel(writer, sheet_name="拓扑指标汇总", index=False)
+        summary_df.to_excel(writer, sheet_name="原公式指标汇总", index=False)
+    print(f"结果已保存: {output_path}")
+    return detail, topo_summary, output_path
+
+
+def run_watch(config_path=None, specs=None, output_path=None, interval=None, use_cache=True):
+    """监视模式：轮询输入工作簿，保存后只重算变化的分段并重写对应结果文件。"""
+    from reliability.output import is_output_file
+    from reliability.watch import Watcher
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    watcher = Watcher(specs, config, output_path, make_cache(config, use_cache))
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+    elif is_output_file(output_path):
+        # 单个输出文件（同 Watcher.output_path）：只创建其所在目录
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    else:
+        os.makedirs(output_path, exist_ok=True)
+    print(f"监视: {', '.join(specs)}（Ctrl+C 退出）")
+    try:
+        watcher.run(interval)
+    except KeyboardInterrupt:
+        print("\n已退出监视")
+    return watcher
+
+
+def run_build_tie_index(config_path=None, batch_spec=None, output_path=None, workers=None):
+    """扫描批量输入中全部线路的联络开关，建立 联络开关→线路 索引（JSON）。"""
+    from reliability.batch import collect_inputs
+    from reliability.tie import build_tie_index, tie_config
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    if output_path is None:
+        output_path = tie_config(config)["index"]
+        if not os.path.isabs(output_path):
+            output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), output_path)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    inputs = collect_inputs(batch_spec)
+    if not inputs:
+        print(f"未找到输入文件: {batch_spec}")
+        sys.exit(1)
+    index, failures = build_tie_index(inputs, config, workers)
+    index.save(output_path)
+    shared = sum(1 for feeders in index.switch_feeders.values() if len(feeders) > 1)
+    print(f"联络开关索引: {len(index.feeder_kva)} 条线路，{len(index.switch_feeders)} 个联络开关（{shared} 个已匹配对侧线路），{len(failures)} 条失败")
+    for res in failures:
+        print(f"  失败: {res['path']}: {res['error']}")
+    print(f"结果已保存: {output_path}")
+    return index, output_path
+
+
+def run_optimize_automation(config_path=None, input_path=None, batch_spec=None, output_path=None,
+                            budget_count=None, budget_cost=None, workers=None, use_cache=True):
+    """自动化布点优化：单条线路（-i）或全县批量（-b），在数量/投资预算内选择改造分段。"""
+    import pandas as pd
+    from reliability.automation import automation_config, feeder_candidates, optimize
+    from reliability.batch import collect_inputs, map_feeders
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    config["verbose"] = False
+    auto = automation_config(config)
+    if budget_count is None and budget_cost is None:
+        budget_count, budget_cost = auto["budget_count"], auto["budget_cost"]
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        base_name = os.path.splitext(os.path.basename(input_path))[0] if input_path else "批量"
+        output_path = os.path.join(DEFAULT_OUTPUT_DIR, f"{base_name}_自动化布点优化.xlsx")
+
+    failures = []
+    if input_path:
+        candidates = feeder_candidates(input_path, config, make_cache(config, use_cache))
+    else:
+        inputs = collect_inputs(batch_spec)
+        if not inputs:
+            print(f"未找到输入文件: {batch_spec}")
+            sys.exit(1)
+        parts = []
+        for res in map_feeders(feeder_candidates, inputs, config_path, workers, use_cache):
+            if res["ok"]:
+                parts.append(res["value"])
+            else:
+                failures.append({"输入文件": res["path"], "错误": res["error"]})
+        if not parts:
+            print("全部线路计算失败")
+            sys.exit(1)
+        candidates = pd.concat(parts, ignore_index=True)
+    detail, feeders, method = optimize(candidates, auto, budget_count, budget_cost)
+    chosen = detail[detail["是否入选"]]
+    print(f"自动化布点优化（{method}）: 候选 {len(detail)} 个分段，入选 {len(chosen)} 个，"
+          f"成本 {chosen['成本'].sum():g}，年停电时户数降幅 {chosen['时户数降幅(时户/年)'].sum():.4f}")
+    with pd.ExcelWriter(output_path) as writer:
+        chosen.to_excel(writer, sheet_name="入选分段", index=False)
+        feeders.to_excel(writer, sheet_name="线路汇总", index=False)
+        detail.to_excel(writer, sheet_name="全部候选", index=False)
+        if failures:
+            pd.DataFrame(failures).to_excel(writer, sheet_name="失败线路", index=False)
+    print(f"结果已保存: {output_path}")
+    return detail, feeders, output_path
+
+
+def run_diagnose(config_path=None, input_path=None, batch_spec=None, output_path=None, workers=None, use_cache=True):
+    """网架诊断：单条线路（-i）或批量（-b），多主干拆分后按主干诊断分段过多与冗余分段，结果与可靠性指标一并输出。"""
+    import pandas as pd
+    from reliability.batch import collect_inputs, map_feeders
+    from reliability.diagnosis import diagnose, feeder_diagnosis_input
+    from reliability.tie import load_tie_index, tie_config
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    config["verbose"] = False
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        base_name = os.path.splitext(os.path.basename(input_path))[0] if input_path else "批量"
+        output_path = os.path.join(DEFAULT_OUTPUT_DIR, f"{base_name}_网架诊断.xlsx")
+
+    failures = []
+    if input_path:
+        feeders = [feeder_diagnosis_input(input_path, config, make_cache(config, use_cache))]
+    else:
+        inputs = collect_inputs(batch_spec)
+        if not inputs:
+            print(f"未找到输入文件: {batch_spec}")
+            sys.exit(1)
+        feeders = []
+        for res in map_feeders(feeder_diagnosis_input, inputs, config_path, workers, use_cache):
+            if res["ok"]:
+                feeders.append(res["value"])
+            else:
+                failures.append({"输入文件": res["path"], "错误": res["error"]})
+        if not feeders:
+            print("全部线路计算失败")
+            sys.exit(1)
+
+    # 联络开关索引补充本次全部线路，对侧线路在本批次内时可直接匹配
+    index = load_tie_index(tie_config(config), os.path.dirname(os.path.abspath(__file__)))
+    for f in feeders:
+        index.add_feeder(f["name"], f["switches"], f["installed_kva"])
+    findings, trunks, candidates = diagnose(feeders, config, index)
+    summary_df = pd.concat([f["summary"] for f in feeders], ignore_index=True)
+    print(f"网架诊断: {len(feeders)} 条线路，{trunks.groupby(['输入文件', '主干编号']).ngroups if len(trunks) else 0} 个主干，{len(findings)} 条诊断结果")
+    if len(findings):
+        print(findings.groupby("规则").size().to_string())
+    with pd.ExcelWriter(output_path) as writer:
+        findings.to_excel(writer, sheet_name="诊断结果", index=False)
+        if len(candidates):
+            candidates.to_excel(writer, sheet_name="冗余分段候选", index=False)
+        trunks.to_excel(writer, sheet_name="主干拆分", index=False)
+        summary_df.to_excel(writer, sheet_name="指标汇总", index=False)
+        if failures:
+            pd.DataFrame(failures).to_excel(writer, sheet_name="失败线路", index=False)
+    print(f"结果已保存: {output_path}")
+    return findings, candidates, output_path
+
+
+def run_score(config_path=None, batch_spec=None, districts_path=None, output_path=None, workers=None, use_cache=True):
+    """区县评分：批量计算全部线路，结合区县属性表按 可靠性评分细则 计算各项得分与加权总分。"""
+    import pandas as pd
+    from reliability.batch import collect_inputs, file_districts, run_batch as _run_batch
+    from reliability.scoring import load_districts, run_scoring, scoring_config, scoring_rules
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    sc = scoring_config(config)
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        output_path = os.path.join(DEFAULT_OUTPUT_DIR, "区县可靠性评分.xlsx")
+    inputs = collect_inputs(batch_spec)
+    if not inputs:
+        print(f"未找到输入文件: {batch_spec}")
+        sys.exit(1)
+    summary_df, failure_df, metrics_df = _run_batch(inputs, config_path, workers, use_cache)
+    districts, feeder_district = load_districts(districts_path, sc["district_column"])
+    feeder_district = file_districts(summary_df, feeder_district)
+    result, missing = run_scoring(summary_df, districts, feeder_district, config["constants"], sc, metrics_df)
+    print(f"区县评分（{sc['version']} 版本）: {len(result)} 个区县，{summary_df['线路名称'].nunique() if len(summary_df) else 0} 条线路")
+    if missing:
+        print(f"  缺少指标（不计分）: {missing}")
+    print(result[[c for c in result.columns if c.endswith("得分") and c[:-2] in sc["category_weights"]] + ["总分", "排名"]].to_string())
+    with pd.ExcelWriter(output_path) as writer:
+        result.to_excel(writer, sheet_name="区县得分")
+        pd.DataFrame(scoring_rules(sc)).to_excel(writer, sheet_name="评分规则", index=False)
+        summary_df.to_excel(writer, sheet_name="线路汇总", index=False)
+        if len(failure_df):
+            failure_df.to_excel(writer, sheet_name="失败线路", index=False)
+    print(f"结果已保存: {output_path}")
+    return result, output_path
+
+
+def run_allocate(config_path=None, batch_spec=None, districts_path=None, output_path=None, total=None, workers=None, use_cache=True):
+    """26 年时户数指标分配：区县评分 → 分配原则1/2 → what-if 扫描 → 按改善潜力分解到线路。"""
+    import numpy as np
+    import pandas as pd
+    from reliability.allocation import (allocate_proportional, allocate_tiered, allocation_config, feeder_hours,
+                                        feeder_potential, push_down, target_total, tiered_what_if)
+    from reliability.batch import collect_inputs, file_districts, map_feeders
+    from reliability.scoring import load_districts, run_scoring, scoring_config
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    alloc = allocation_config(config)
+    if total is not None:
+        alloc["target_total"] = total
+    sc = scoring_config(config)
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        output_path = os.path.join(DEFAULT_OUTPUT_DIR, "2026时户数指标分配.xlsx")
+    inputs = collect_inputs(batch_spec)
+    if not inputs:
+        print(f"未找到输入文件: {batch_spec}")
+        sys.exit(1)
+    summaries, metrics, potential, failures = [], [], {}, []
+    for res in map_feeders(feeder_potential, inputs, config_path, workers, use_cache):
+        if res["ok"]:
+            summary_df, pot, feeder_metrics = res["value"]
+            summaries.append(summary_df)
+            metrics.append(feeder_metrics)
+            potential[res["path"]] = pot
+        else:
+            failures.append({"输入文件": res["path"], "错误": res["error"]})
+    if not summaries:
+        print("全部线路计算失败")
+        sys.exit(1)
+    summary_df = pd.concat(summaries, ignore_index=True)
+    districts, feeder_district = load_districts(districts_path, sc["district_column"])
+    feeder_district = file_districts(summary_df, feeder_district)
+    scored, _ = run_scoring(summary_df, districts, feeder_district, config["constants"], sc, pd.DataFrame(metrics))
+
+    hours = feeder_hours(summary_df)
+    current = hours.groupby(feeder_district.reindex(hours.index)).sum()
+    counties = scored.index[scored.index.isin(current.index)]
+    skipped = [c for c in scored.index if c not in current.index]
+    scores = scored.loc[counties, "总分"].astype(np.float64)
+    current = current.reindex(counties)
+    total_target = target_total(current.sum(), alloc)
+
+    tiered, unallocated = allocate_tiered(scores, current, total_target, alloc)
+    proportional = allocate_proportional(scores, current, total_target)
+    what_if = tiered_what_if(scores, current, total_target, alloc)
+    feeders = push_down(tiered, feeder_district, hours, pd.Series(potential))
+    print(f"时户数指标分配: {len(counties)} 个区县，当前 {current.sum():.4f} → 目标 {total_target:.4f} 时户")
+    if skipped:
+        print(f"  无线路数据的区县（不参与分配）: {skipped}")
+    if unallocated:
+        print(f"  第2档为空，未分配降幅: {unallocated:.4f}")
+    print(tiered.to_string())
+    with pd.ExcelWriter(output_path) as writer:
+        tiered.to_excel(writer, sheet_name="分配原则1")
+        proportional.to_excel(writer, sheet_name="分配原则2")
+        if len(what_if):
+            what_if.to_excel(writer, sheet_name="分档what-if", index=False)
+        feeders.to_excel(writer, sheet_name="线路分解", index=False)
+        scored.to_excel(writer, sheet_name="区县得分")
+        if failures:
+            pd.DataFrame(failures).to_excel(writer, sheet_name="失败线路", index=False)
+    print(f"结果已保存: {output_path}")
+    return tiered, proportional, feeders, output_path
+
+
+def run_stream(config_path=None, batch_spec=None, output_path=None, workers=None, use_cache=True, fmt=None,
+               shard=None, partial_path=None):
+    """
+    流式全省计算（-b --stream）：逐条线路计算后分段明细与线路汇总立即写出，只保留区县 / 全省累加器，
+    同时在途的线路数有上限，内存占用不随线路数增长。
+    shard: 'K/N' 时只计算清单中的第 K 片；partial_path: 另保存可合并的部分汇总 JSON（供 --merge）。
+    """
+    from reliability.batch import collect_inputs, imap_feeders
+    from reliability.partial import save_partial, shard_inputs
+    from reliability.output import DETAIL_TABLE, open_writer, with_format
+    from reliability.stream import StreamAggregator, feeder_stream_result
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        output_path = os.path.join(DEFAULT_OUTPUT_DIR, "流式可靠性计算结果.xlsx")
+    output_path = with_format(output_path, fmt)
+    all_inputs = collect_inputs(batch_spec)
+    inputs = shard_inputs(all_inputs, shard)
+    if not inputs:
+        print(f"未找到输入文件: {batch_spec}")
+        return None, None
+    print(f"流式计算: {len(inputs)} 个文件{f'（分片 {shard}）' if shard else ''}，进程数={workers or os.cpu_count()}")
+    with open_writer(output_path, fmt, primary=DETAIL_TABLE) as out:
+        agg = StreamAggregator(config["constants"], out, keep_feeders=partial_path is not None)
+        for i, res in enumerate(imap_feeders(feeder_stream_result, inputs, config_path, workers, use_cache), 1):
+            if res["ok"]:
+                agg.add(res["path"], *res["value"])
+            else:
+                agg.add_failure(res["path"], res["error"])
+                print(f"  [失败] {res['path']}: {res['error']}")
+            if i % 100 == 0:
+                print(f"  已完成 {i}/{len(inputs)}")
+        district_df, province_df = agg.finish()
+    print(f"\n成功 {agg.partial.province.feeders} 条，失败 {len(agg.partial.failures)} 条")
+    print(province_df.to_string(index=False))
+    print(f"结果已保存: {output_path}")
+    if partial_path:
+        save_partial(partial_path, agg.partial, shard, all_inputs)
+        print(f"部分汇总已保存: {partial_path}")
+    return province_df, output_path
+
+
+def run_merge(partial_paths, output_path=None, fmt=None):
+    """合并各分片的部分汇总，输出 逐线路汇总 / 区县汇总 / 全省汇总 / 失败线路。"""
+    import pandas as pd
+    from reliability.output import open_writer, with_format
+    from reliability.partial import merge_partials
+    from reliability.stream import write_partial_tables
+
+    merged, shards = merge_partials(partial_paths)
+    shard_df = pd.DataFrame(shards)
+    print(shard_df.to_string(index=False))
+    if output_path is None:
+        os.makedirs(DEFAULT_OUTPUT_DIR, exist_ok=True)
+        output_path = os.path.join(DEFAULT_OUTPUT_DIR, "合并可靠性计算汇总.xlsx")
+    output_path = with_format(output_path, fmt)
+    with open_writer(output_path, fmt) as out:
+        feeder_df = merged.feeder_summary()
+        if len(feeder_df):
+            out.write("指标汇总", feeder_df)
+        district_df, province_df = write_partial_tables(out, merged)
+        if merged.failures:
+            out.write("失败线路", pd.DataFrame(merged.failures))
+        out.write("分片", shard_df)
+    print(f"\n合并 {len(shards)} 个部分汇总：成功 {merged.province.feeders} 条，失败 {len(merged.failures)} 条")
+    print(province_df.to_string(index=False))
+    print(f"结果已保存: {output_path}")
+    return province_df, output_path
+
+
+def run_query(config_path=None, kind="worst", store=None, runs=None, metric=None, top=None, output_path=None):
+    """结果仓库查询：runs（运行列表）/ worst（最差线路）/ delta（两次运行变化）/ district（区县汇总）。"""
+    import pandas as pd
+    from reliability.output import open_writer
+    from reliability.warehouse import warehouse_config
+
+    if config_path is None:
+        config_path = default_config_path()
+    config = load_config(config_path)
+    wc = warehouse_config(config)
+    with open_warehouse(config, store or "") as wh:
+        result = wh.query(kind, runs, metric or wc["metric"], top or wc["top"])
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(result.to_string(index=False))
+    if output_path:
+        with open_writer(output_path) as out:
+            out.write(kind, result)
+        print(f"结果已保存: {output_path}")
+    return result
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="10kV配电线路供电可靠性计算")
-    parser.add_argument("-i", "--input", required=True, help="输入 Excel 文件路径")
-    parser.add_argument("-o", "--output", default=None, help="输出 Excel 文件路径；未指定时保存到 " + DEFAULT_OUTPUT_DIR + "/<输入文件名>_可靠性计算结果.xlsx")
+    src_group = parser.add_mutually_exclusive_group()
+    src_group.add_argument("-i", "--input", help="输入 Excel 文件路径")
+    src_group.add_argument("-b", "--batch", help="批量模式：目录、通配符（如 'data/*.xlsx'）或清单文件（.txt/.csv，每行一个路径）")
+    parser.add_argument("-o", "--output", default=None, help="输出文件路径（.xlsx / .parquet / .csv / .jsonl）；未指定时保存到 " + DEFAULT_OUTPUT_DIR + "/<输入文件名>_可靠性计算结果.xlsx（批量模式为 批量可靠性计算汇总.xlsx）")
+    parser.add_argument("-f", "--format", default=None, choices=["xlsx", "parquet", "csv", "jsonl"],
+                        help="单线路 / 批量结果输出格式；默认按 -o 扩展名判断。批量 parquet/csv/jsonl 输出全部线路分段明细的单一数据集，parquet 需安装 pyarrow")
     parser.add_argument("-c", "--config", default=None, help="参数配置文件路径；默认 config/reliability_params.json")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="批量模式并行进程数；默认 CPU 核数")
+    parser.add_argument("--sweep", default=None, help="参数扫描说明 JSON（grid / scenarios），需配合 -i；输出 场景×指标 表")
+    parser.add_argument("--monte-carlo", nargs="?", type=int, const=0, default=None, metavar="TRIALS", help="蒙特卡洛模拟模式，需配合 -i；可指定模拟年数，默认取参数文件 monte_carlo.trials")
+    parser.add_argument("--seed", type=int, default=None, help="蒙特卡洛随机种子；默认取参数文件 monte_carlo.seed")
+    parser.add_argument("--topology", action="store_true", help="拓扑 FMEA 模式，需配合 -i；由 主线（2）/分支（2） 设备父节点建树计算上下游停电影响")
+    parser.add_argument("--build-tie-index", action="store_true", help="扫描 -b 指定的全部线路，建立联络开关→线路索引；默认保存到参数文件 tie.index")
+    parser.add_argument("--optimize-automation", action="store_true", help="自动化布点优化，配合 -i（单条线路）或 -b（全县）；预算默认取参数文件 automation 段")
+    parser.add_argument("--budget", type=int, default=None, help="自动化布点数量预算（分段个数）")
+    parser.add_argument("--budget-cost", type=float, default=None, help="自动化布点投资预算（与 automation.unit_cost 同单位）")
+    parser.add_argument("--diagnose", action="store_true", help="网架诊断（多主干拆分、分段过多、冗余分段），配合 -i 或 -b；规则参数见参数文件 diagnosis 段")
+    parser.add_argument("--score", default=None, metavar="DISTRICTS", help="区县评分，需配合 -b；DISTRICTS 为区县属性表（区县、区域类别及各指标完成值，可含「线路归属」Sheet）")
+    parser.add_argument("--allocate", default=None, metavar="DISTRICTS", help="26 年时户数指标分配，需配合 -b；DISTRICTS 同 --score")
+    parser.add_argument("--target-total", type=float, default=None, help="26 年总时户数指标；默认取参数文件 allocation 段")
+    parser.add_argument("--watch", nargs="?", type=float, const=0, default=None, metavar="SECONDS", help="监视模式，配合 -i 或 -b：工作簿保存后只重算变化的分段并重写结果；可指定轮询间隔，默认取参数文件 watch.interval；-b 时 -o 为输出目录")
+    parser.add_argument("--stream", action="store_true",
+                        help="流式全省计算，需配合 -b：分段明细与线路汇总边算边写，只保留区县 / 全省累加器；输出含 区县汇总 / 全省汇总")
+    parser.add_argument("--shard", default=None, metavar="K/N", help="分片计算，配合 -b --stream：只计算清单中的第 K 片（共 N 片），各机器使用同一清单")
+    parser.add_argument("--partial", default=None, metavar="PATH", help="配合 -b --stream：另保存可合并的部分汇总 JSON")
+    parser.add_argument("--merge", nargs="+", default=None, metavar="PARTIAL", help="合并各分片的部分汇总 JSON，输出逐线路 / 区县 / 全省汇总；-o 指定输出文件")
+    parser.add_argument("--store", nargs="?", const="", default=None, metavar="DB",
+                        help="单线路 / 批量结果写入 SQLite 结果仓库（运行、线路、汇总、分段四张表）；默认取参数文件 warehouse.path")
+    parser.add_argument("--query", default=None, choices=["runs", "worst", "delta", "district"],
+                        help="查询结果仓库（可用 --store 指定数据库）：runs 运行列表，worst 最差线路，delta 两次运行间变化，district 区县汇总；-o 保存查询结果")
+    parser.add_argument("--run", type=int, nargs="+", default=None, metavar="RUN_ID", help="--query 的运行编号；delta 需两个，缺省为最近一次 / 最近两次运行")
+    parser.add_argument("--metric", default=None, help="--query worst / delta 的指标列；默认取参数文件 warehouse.metric")
+    parser.add_argument("--top", type=int, default=None, help="--query worst / delta 返回的线路数；默认取参数文件 warehouse.top")
+    parser.add_argument("--no-cache", action="store_true", help="不读写结果缓存（缓存目录与大小上限见参数文件 cache 段）")
+    parser.add_argument("--lite", action="store_true",
+                        help="单线路轻量路径：不导入 pandas / numpy，只读五个映射列逐行计算；文件超过 lite.max_file_mb、parquet / jsonl 输出或 --store 时回退到完整路径")
+    parser.add_argument("--verbose", type=int, default=None, choices=[0, 1, 2],
+                        help="单线路输出级别：0 不输出，1 步骤与汇总，2 另逐分段输出敷设方式与分段指标；默认取参数文件 verbose（true 为 2）")
+    parser.add_argument("--trace", default=None, metavar="PATH",
+                        help="单线路分段追踪：逐分段输出各公式输入与中间项（故障次数、故障总时间、SAIDI/SAIFI 分子与分母），按扩展名写为 csv / parquet / jsonl / xlsx")
+    parser.add_argument("--timing", action="store_true", help="结束时报告启动（导入与参数解析）、计算与输出耗时")
+    parser.add_argument("--profile", default=None, metavar="JSON",
+                        help="单线路 / 批量模式分阶段计量：逐条线路记录 读取 / 字段映射 / 清洗 / 敷设方式解析 / 分段内核 / 汇总 / 写出 的墙钟、CPU 时间、峰值内存与行数，保存为 JSON 报告")
+    parser.add_argument("--prometheus", default=None, metavar="PATH", help="同 --profile，另将按阶段聚合的指标保存为 Prometheus 文本格式")
     args = parser.parse_args()
-    run(config_path=args.config, input_path=args.input, output_path=args.output)
+    t_ready = time.perf_counter()
+    use_cache = not args.no_cache
+    if not (args.input or args.batch or args.query or args.merge):
+        parser.error("需要 -i 或 -b 指定线路（--query / --merge 除外）")
+    if (args.shard or args.partial) and not (args.batch and args.stream):
+        parser.error("--shard / --partial 需要配合 -b --stream")
+    if (args.sweep or args.monte_carlo is not None or args.topology) and not args.input:
+        parser.error("--sweep / --monte-carlo / --topology 需要配合 -i 指定线路")
+    if args.stream and not args.batch:
+        parser.error("--stream 需要配合 -b 指定线路范围")
+    if args.build_tie_index and not args.batch:
+        parser.error("--build-tie-index 需要配合 -b 指定线路范围")
+    single_or_batch = not (args.merge or args.query or args.watch is not None or args.allocate or args.score or args.diagnose
+                           or args.optimize_automation or args.build_tie_index or args.topology or args.monte_carlo is not None
+                           or args.sweep or args.stream)
+    if (args.profile or args.prometheus) and not single_or_batch:
+        parser.error("--profile / --prometheus 只用于单线路（-i）与批量（-b）计算")
+    if args.trace and not (single_or_batch and args.input):
+        parser.error("--trace 只用于单线路（-i）计算")
+    if (args.score or args.allocate) and not args.batch:
+        parser.error("--score / --allocate 需要配合 -b 指定全部线路")
+    if args.watch is not None and args.batch:
+        from reliability.output import is_output_file
+        from reliability.watch import single_workbook
+
+        if is_output_file(args.output) and not single_workbook([args.batch]):
+            parser.error("--watch 配合 -b 监视多个工作簿时，-o 应为输出目录（每条线路一个结果文件）")
+    if args.merge:
+        run_merge(args.merge, output_path=args.output, fmt=args.format)
+    elif args.query:
+        run_query(config_path=args.config, kind=args.query, store=args.store, runs=args.run, metric=args.metric, top=args.top, output_path=args.output)
+    elif args.watch is not None:
+        run_watch(config_path=args.config, specs=[args.input or args.batch], output_path=args.output,
+                  interval=args.watch or None, use_cache=use_cache)
+    elif args.allocate:
+        run_allocate(config_path=args.config, batch_spec=args.batch, districts_path=args.allocate, output_path=args.output,
+                     total=args.target_total, workers=args.workers, use_cache=use_cache)
+    elif args.score:
+        run_score(config_path=args.config, batch_spec=args.batch, districts_path=args.score, output_path=args.output, workers=args.workers, use_cache=use_cache)
+    elif args.diagnose:
+        run_diagnose(config_path=args.config, input_path=args.input, batch_spec=args.batch, output_path=args.output,
+                     workers=args.workers, use_cache=use_cache)
+    elif args.optimize_automation:
+        run_optimize_automation(config_path=args.config, input_path=args.input, batch_spec=args.batch, output_path=args.output,
+                                budget_count=args.budget, budget_cost=args.budget_cost, workers=args.workers, use_cache=use_cache)
+    elif args.build_tie_index:
+        run_build_tie_index(config_path=args.config, batch_spec=args.batch, output_path=args.output, workers=args.workers)
+    elif args.topology:
+        run_topology(config_path=args.config, input_path=args.input, output_path=args.output, use_cache=use_cache)
+    elif args.monte_carlo is not None:
+        run_monte_carlo(config_path=args.config, input_path=args.input, output_path=args.output, trials=args.monte_carlo, seed=args.seed, workers=args.workers, use_cache=use_cache)
+    elif args.sweep:
+        run_sweep(config_path=args.config, input_path=args.input, spec_path=args.sweep, output_path=args.output, use_cache=use_cache)
+    elif args.stream:
+        run_stream(config_path=args.config, batch_spec=args.batch, output_path=args.output, workers=args.workers, use_cache=use_cache, fmt=args.format,
+                   shard=args.shard, partial_path=args.partial)
+    elif args.batch:
+        run_batch(config_path=args.config, batch_spec=args.batch, output_path=args.output, workers=args.workers, use_cache=use_cache, fmt=args.format, store=args.store,
+                  profile_path=args.profile, prometheus_path=args.prometheus)
+    else:
+        run(config_path=args.config, input_path=args.input, output_path=args.output, use_cache=use_cache, fmt=args.format, store=args.store,
+            lite=args.lite, profile_path=args.profile, prometheus_path=args.prometheus, verbose=args.verbose, trace_path=args.trace)
+    if args.timing:
+        report_timing(t_ready)
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+"""
+10kV配电线路供电可靠性计算扩展模块
+main.py 提供单线路计算流程，本包在其基础上提供批量等扩展能力。
+"""
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+2026 年时户数指标分配（document/可靠性评分细则.xlsx「指标计算版本」分配原则）：
+- 分配原则1（分档）：按区县评分从高到低分为三档。第1档打分越高降幅率越低（tier1_rate 区间），
+  第3档打分越高降幅率越高（tier3_rate 区间），第2档按统一降幅率分摊剩余降幅；
+- 分配原则2（比例）：按各区县评分比例直接分解 26 年总时户数指标。
+时户数 = 全线路 SAIDI合计 × 总用户数。分档方案以 方案×区县 数组一次计算，what-if 扫描档位与降幅率区间不重复汇总线路。
+区县指标再按各线路改善潜力（全部未自动化分段改造后的时户数降幅）分解到线路。
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from main import compute_feeder
+
+DEFAULT_ALLOCATION = {
+    # 26 年总时户数指标；为 null 时取 当前总时户数 × (1 - target_drop_rate)
+    "target_total": None,
+    "target_drop_rate": 0.1,
+    "tier1_count": 4,
+    "tier3_count": 4,
+    "tier1_rate": [0.03, 0.06],
+    "tier3_rate": [0.10, 0.15],
+    # what-if 扫描：各键取值列表，缺省取上面的单值
+    "what_if": {},
+}
+
+
+def allocation_config(config):
+    return {**DEFAULT_ALLOCATION, **config.get("allocation", {})}
+
+
+def feeder_hours(feeder_summary):
+    """逐线路当前时户数（全线路 SAIDI合计 × 总用户数），按输入文件索引。"""
+    whole = feeder_summary[feeder_summary["线路类型"] == "全线路"]
+    return pd.Series(whole["SAIDI合计"].to_numpy(dtype=np.float64) * whole["总用户数(台)"].to_numpy(dtype=np.float64),
+                     index=whole["输入文件"].to_numpy(), name="时户数")
+
+
+def target_total(current_total, alloc):
+    if alloc["target_total"] is not None:
+        return float(alloc["target_total"])
+    return current_total * (1 - alloc["target_drop_rate"])
+
+
+def allocate_proportional(scores, current, total):
+    """分配原则2：目标时户数 = 总指标 × 评分 / 评分之和。"""
+    share = scores / scores.sum()
+    target = total * share
+    return pd.DataFrame({
+        "评分": scores, "当前时户数": current, "分配比例": share, "目标时户数": target,
+        "降幅": current - target, "降幅率": (current - target) / current.where(current > 0),
+    })
+
+
+def tiered_rates(scores, current, total_drop, tier1_count, tier3_count, tier1_rate, tier3_rate):
+    """
+    分配原则1，方案向量化计算。
+    scores / current: (n,) 区县评分与当前时户数；其余参数为长度 S 的数组（tier*_rate 为 (S, 2)）
+    返回: (降幅率 (S, n)，档位 (S, n)，二档降幅率 (S,)，未分配降幅 (S,))
+    """
+    n = len(scores)
+    order = np.argsort(-scores, kind="stable")
+    s = scores[order][None, :]
+    cur = current[order][None, :]
+    pos = np.arange(n)[None, :]
+    k1 = np.asarray(tier1_count)[:, None]
+    k3 = np.asarray(tier3_count)[:, None]
+    r1 = np.asarray(tier1_rate, dtype=np.float64)
+    r3 = np.asarray(tier3_rate, dtype=np.float64)
+    in1 = pos < k1
+    in3 = (pos >= n - k3) & ~in1
+    in2 = ~in1 & ~in3
+
+    def normalized(mask):
+        lo = np.where(mask, s, np.inf).min(axis=1, keepdims=True)
+        hi = np.where(mask, s, -np.inf).max(axis=1, keepdims=True)
+        span = np.where(hi > lo, hi - lo, 1.0)
+        return np.where(hi > lo, (s - lo) / span, 1.0)
+
+    rate = np.zeros((len(k1), n))
+    # 一档：分高者降幅率低；三档：分高者降幅率高
+    rate = np.where(in1, r1[:, 1:2] - (r1[:, 1:2] - r1[:, 0:1]) * normalized(in1), rate)
+    rate = np.where(in3, r3[:, 0:1] + (r3[:, 1:2] - r3[:, 0:1]) * normalized(in3), rate)
+    fixed = (rate * cur * (in1 | in3)).sum(axis=1)
+    base2 = (cur * in2).sum(axis=1)
+    rest = total_drop - fixed
+    rate2 = np.where(base2 > 0, rest / np.where(base2 > 0, base2, 1.0), np.nan)
+    rate = np.where(in2, rate2[:, None], rate)
+    unallocated = np.where(base2 > 0, 0.0, rest)
+
+    tier = np.where(in1, 1, np.where(in3, 3, 2))
+    inverse = np.argsort(order)
+    return rate[:, inverse], tier[:, inverse], rate2, unallocated
+
+
+def allocate_tiered(scores, current, total, alloc):
+    """分配原则1 的单一方案结果。"""
+    rate, tier, rate2, unallocated = tiered_rates(
+        scores.to_numpy(dtype=np.float64), current.to_numpy(dtype=np.float64), current.sum() - total,
+        [alloc["tier1_count"]], [alloc["tier3_count"]], [alloc["tier1_rate"]], [alloc["tier3_rate"]])
+    drop = rate[0] * current.to_numpy(dtype=np.float64)
+    out = pd.DataFrame({
+        "评分": scores, "当前时户数": current, "档位": tier[0], "降幅率": rate[0], "降幅": drop,
+        "目标时户数": current - drop,
+    })
+    return out, float(unallocated[0])
+
+
+def tiered_what_if(scores, current, total, alloc):
+    """
+    分配原则1 what-if：对 alloc["what_if"] 中各键取值的笛卡尔积一次性计算。
+    返回: 每行一个方案，含二档降幅率、降幅率极值、是否满足 一档 ≤ 二档 ≤ 三档
+    """
+    keys = ("tier1_count", "tier3_count", "tier1_rate", "tier3_rate")
+    grid = [alloc["what_if"].get(k, [alloc[k]]) for k in keys]
+    combos = [c for c in itertools.product(*grid) if c[0] + c[1] <= len(scores)]
+    if not combos:
+        return pd.DataFrame()
+    k1, k3, r1, r3 = (list(x) for x in zip(*combos))
+    rate, tier, rate2, unallocated = tiered_rates(
+        scores.to_numpy(dtype=np.float64), current.to_numpy(dtype=np.float64), current.sum() - total, k1, k3, r1, r3)
+    max1 = np.where(tier == 1, rate, -np.inf).max(axis=1)
+    min3 = np.where(tier == 3, rate, np.inf).min(axis=1)
+    return pd.DataFrame({
+        "一档数": k1, "三档数": k3,
+        "一档降幅率下限": [r[0] for r in r1], "一档降幅率上限": [r[1] for r in r1],
+        "三档降幅率下限": [r[0] for r in r3], "三档降幅率上限": [r[1] for r in r3],
+        "二档降幅率": rate2, "最大降幅率": rate.max(axis=1), "最小降幅率": rate.min(axis=1),
+        "档位有序": (max1 <= rate2) & (rate2 <= min3), "未分配降幅": unallocated,
+    })
+
+
+def feeder_potential(excel_path, config, cache=None):
+    """
+    单条线路的指标汇总、改善潜力与网架计数（可作为 batch.map_feeders 的工作函数）。
+    改善潜力 = 全部未自动化分段改造后的年停电时户数降幅。
+    """
+    from reliability.automation import automation_config, candidates_from_results
+    from reliability.batch import feeder_name
+    from reliability.metrics import feeder_grid_metrics, metrics_config
+
+    name = feeder_name(excel_path)
+    df_main_result, df_branch_result, summary_df = compute_feeder(excel_path, config, cache)
+    cands = candidates_from_results(name, excel_path, df_main_result, df_branch_result, summary_df, config["constants"], automation_config(config))
+    summary_df = summary_df.copy()
+    summary_df.insert(0, "线路名称", name)
+    summary_df.insert(1, "输入文件", excel_path)
+    metrics = {"线路名称": name, "输入文件": excel_path,
+               **feeder_grid_metrics(df_main_result, df_branch_result, metrics_config(config))}
+    return summary_df, float(cands["时户数降幅(时户/年)"].sum()), metrics
+
+
+def push_down(county_alloc, feeder_district, hours, potential):
+    """
+    区县降幅按线路改善潜力分解到线路；区县内潜力全为 0 时按当前时户数比例分解。
+    county_alloc: 区县分配结果（含 降幅）；feeder_district / hours / potential: 输入文件 → 区县 / 当前时户数 / 改善潜力
+    """
+    from reliability.batch import feeder_name
+
+    df = pd.DataFrame({"区县": feeder_district.reindex(hours.index), "当前时户数": hours, "改善潜力": potential.reindex(hours.index).fillna(0.0)})
+    df = df.dropna(subset=["区县"])
+    pot_sum = df.groupby("区县")["改善潜力"].transform("sum")
+    hour_sum = df.groupby("区县")["当前时户数"].transform("sum")
+    weight = np.where(pot_sum > 0, df["改善潜力"] / pot_sum.where(pot_sum > 0, 1.0), df["当前时户数"] / hour_sum.where(hour_sum > 0, 1.0))
+    df["分解权重"] = weight
+    df["降幅"] = df["区县"].map(county_alloc["降幅"]).to_numpy() * weight
+    df["目标时户数"] = df["当前时户数"] - df["降幅"]
+    df["潜力覆盖率"] = df["改善潜力"] / df["降幅"].where(df["降幅"] > 0)
+    df.index.name = "输入文件"
+    df.insert(0, "线路名称", [feeder_name(p) for p in df.index])
+    return df.reset_index()[["线路名称", "输入文件"] + [c for c in df.columns if c != "线路名称"]]
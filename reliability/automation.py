@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+自动化布点优化：在数量或投资预算内选择改造为自动化的分段，使年停电时户数降幅最大。
+原公式下分段 i 改造后 隔离时间 由 Manual_Isolation_Time 降为 Auto_Isolation_Time，
+年停电时户数降幅 = 故障次数i × (Manual − Auto) × 用户数i，与其他分段是否改造无关，
+因此每个候选的增量只需计算一次（O(1)），全县所有线路的候选可合并后统一选择：
+- 贪心：仅数量预算时按降幅取前 N（即最优解）；有投资预算时按 降幅/成本 依次选取；
+- 精确：候选数不超过 exact_max_candidates 且有投资预算时，按 数量×成本 的 0/1 背包动态规划求解；
+  动态规划表（候选数 × 数量 × 离散化成本，每格 1 字节）超过 exact_max_cells 时改用贪心。
+"""
+
+import numpy as np
+import pandas as pd
+
+from main import compute_feeder, is_automated
+
+DEFAULT_AUTOMATION = {
+    "budget_count": 10,
+    "budget_cost": None,
+    # 单个分段改造成本（万元），按线路类型
+    "unit_cost": {"主线": 1.0, "分支": 1.0},
+    "exact_max_candidates": 30,
+    # 精确求解时成本离散化粒度
+    "cost_resolution": 0.01,
+    # 精确求解动态规划表的格数上限（约等于字节数），超出时改用贪心
+    "exact_max_cells": 50_000_000,
+}
+
+
+def automation_config(config):
+    auto = {**DEFAULT_AUTOMATION, **config.get("automation", {})}
+    auto["unit_cost"] = {**DEFAULT_AUTOMATION["unit_cost"], **auto.get("unit_cost", {})}
+    return auto
+
+
+def candidates_from_results(feeder, excel_path, df_main_result, df_branch_result, summary_df, constants, auto):
+    """
+    由单条线路分段结果整理改造候选（未自动化且故障次数、用户数均大于 0 的分段）。
+    线路以 excel_path（输入文件）区分，不同目录下的同名线路各自汇总。
+    返回: 候选 DataFrame，每行一个分段
+    """
+    saving = constants["Manual_Isolation_Time"] - constants["Auto_Isolation_Time"]
+    line_users = int(summary_df.loc[summary_df["线路类型"] == "全线路", "总用户数(台)"].iloc[0])
+    line_saidi = float(summary_df.loc[summary_df["线路类型"] == "全线路", "SAIDI合计"].iloc[0])
+    rows = []
+    for line_type, df in (("主线", df_main_result), ("分支", df_branch_result)):
+        for seg, status, users, count in zip(df["分段编号"], df["自动化状态"], df["用户数(台)"], df["故障次数(次/年)"]):
+            if is_automated(status) or users <= 0 or count <= 0:
+                continue
+            rows.append({
+                "线路名称": feeder,
+                "输入文件": excel_path,
+                "线路类型": line_type,
+                "分段编号": seg,
+                "用户数(台)": users,
+                "故障次数(次/年)": count,
+                "时户数降幅(时户/年)": count * saving * users,
+                "成本": auto["unit_cost"].get(line_type, 1.0),
+                "线路总用户数(台)": line_users,
+                "线路原SAIDI合计": line_saidi,
+            })
+    return pd.DataFrame(rows, columns=[
+        "线路名称", "输入文件", "线路类型", "分段编号", "用户数(台)", "故障次数(次/年)", "时户数降幅(时户/年)",
+        "成本", "线路总用户数(台)", "线路原SAIDI合计",
+    ])
+
+
+def feeder_candidates(excel_path, config, cache=None):
+    """单条线路的改造候选（可作为 batch.map_feeders 的工作函数）。"""
+    from reliability.batch import feeder_name
+
+    df_main_result, df_branch_result, summary_df = compute_feeder(excel_path, config, cache)
+    return candidates_from_results(feeder_name(excel_path), excel_path, df_main_result, df_branch_result, summary_df,
+                                   config["constants"], automation_config(config))
+
+
+def greedy_select(benefit, cost, budget_count=None, budget_cost=None):
+    """
+    贪心选择：无投资预算时按降幅、有投资预算时按 降幅/成本 降序依次选取，放不下的跳过。
+    返回: (入选 bool 数组, 入选顺序)
+    """
+    n = len(benefit)
+    if budget_cost is None:
+        order = np.argsort(-benefit, kind="stable")
+    else:
+        ratio = np.where(cost > 0, benefit / np.where(cost > 0, cost, 1.0), np.inf)
+        order = np.lexsort((-benefit, -ratio))
+    if budget_count is not None:
+        max_count = min(int(budget_count), n)
+    else:
+        max_count = n
+    if budget_cost is None:
+        picked = order[:max_count]
+    else:
+        fits = []
+        spent = 0.0
+        for i in order:
+            if len(fits) >= max_count:
+                break
+            if spent + cost[i] <= budget_cost + 1e-9:
+                fits.append(i)
+                spent += cost[i]
+        picked = np.asarray(fits, dtype=np.int64)
+    selected = np.zeros(n, dtype=bool)
+    selected[picked] = True
+    return selected, picked
+
+
+def _knapsack_shape(cost, budget_count, budget_cost, resolution):
+    """离散化成本与动态规划表维度；成本上限不超过全部候选成本之和。"""
+    n = len(cost)
+    max_count = n if budget_count is None else min(int(budget_count), n)
+    units = np.ceil(np.asarray(cost) / resolution - 1e-9).astype(np.int64)
+    cap = int(min(np.floor(budget_cost / resolution + 1e-9), units.sum()))
+    return units, max_count, cap
+
+
+def exact_cells(cost, budget_count, budget_cost, resolution=0.01):
+    """精确求解动态规划表格数（候选数 × (数量+1) × (离散化成本+1)）。"""
+    _, max_count, cap = _knapsack_shape(cost, budget_count, budget_cost, resolution)
+    return len(cost) * (max_count + 1) * (cap + 1)
+
+
+def exact_select(benefit, cost, budget_count=None, budget_cost=None, resolution=0.01, max_cells=None):
+    """
+    0/1 背包动态规划（数量 × 离散化成本），适用于候选较少的线路。
+    max_cells: 动态规划表格数上限，超出时抛出 ValueError（调用方应改用贪心或放粗 resolution）
+    返回: (入选 bool 数组, 入选顺序（按降幅降序）)
+    """
+    n = len(benefit)
+    if budget_cost is None:
+        return greedy_select(benefit, cost, budget_count)
+    units, max_count, cap = _knapsack_shape(cost, budget_count, budget_cost, resolution)
+    cells = n * (max_count + 1) * (cap + 1)
+    if max_cells is not None and cells > max_cells:
+        raise ValueError(f"动态规划表 {cells} 格超过上限 {max_cells}，请放粗 cost_resolution 或改用贪心")
+    # value[k, b]: 至多 k 个、成本至多 b 时的最大降幅
+    value = np.zeros((max_count + 1, cap + 1))
+    keep = np.zeros((n, max_count + 1, cap + 1), dtype=bool)
+    for i in range(n):
+        c = units[i]
+        if c > cap:
+            continue
+        cand = np.full_like(value, -np.inf)
+        cand[1:, c:] = value[:-1, :cap + 1 - c] + benefit[i]
+        better = cand > value
+        keep[i] = better
+        value = np.where(better, cand, value)
+    selected = np.zeros(n, dtype=bool)
+    k, b = max_count, cap
+    for i in range(n - 1, -1, -1):
+        if keep[i, k, b]:
+            selected[i] = True
+            k -= 1
+            b -= units[i]
+    picked = np.flatnonzero(selected)
+    return selected, picked[np.argsort(-benefit[picked], kind="stable")]
+
+
+def optimize(candidates, auto, budget_count=None, budget_cost=None):
+    """
+    在全部候选中选择改造分段。
+    返回: (候选明细（含 排名、是否入选）, 线路汇总（改造前后 SAIDI）, 求解方式)
+    """
+    benefit = candidates["时户数降幅(时户/年)"].to_numpy(dtype=np.float64)
+    cost = candidates["成本"].to_numpy(dtype=np.float64)
+    if (budget_cost is not None and len(candidates) <= auto["exact_max_candidates"]
+            and exact_cells(cost, budget_count, budget_cost, auto["cost_resolution"]) <= auto["exact_max_cells"]):
+        selected, picked = exact_select(benefit, cost, budget_count, budget_cost, auto["cost_resolution"])
+        method = "精确（动态规划）"
+    else:
+        selected, picked = greedy_select(benefit, cost, budget_count, budget_cost)
+        method = "贪心" if budget_cost is not None else "贪心（数量预算下即最优）"
+
+    detail = candidates.copy()
+    users = detail["线路总用户数(台)"].to_numpy(dtype=np.float64)
+    detail["线路SAIDI降幅"] = np.where(users > 0, benefit / np.where(users > 0, users, 1.0), 0.0)
+    rank = np.zeros(len(detail), dtype=np.int64)
+    rank[picked] = np.arange(1, len(picked) + 1)
+    detail["入选顺序"] = rank
+    detail["是否入选"] = selected
+    detail = detail.sort_values(["是否入选", "时户数降幅(时户/年)"], ascending=[False, False], kind="stable")
+
+    chosen = detail[detail["是否入选"]]
+    feeders = detail.groupby("输入文件", sort=False).agg(
+        线路名称=("线路名称", "first"),
+        线路总用户数=("线路总用户数(台)", "first"),
+        原SAIDI合计=("线路原SAIDI合计", "first"),
+    )
+    gain = chosen.groupby("输入文件").agg(
+        改造分段数=("分段编号", "size"),
+        成本=("成本", "sum"),
+        时户数降幅=("时户数降幅(时户/年)", "sum"),
+        SAIDI降幅=("线路SAIDI降幅", "sum"),
+    )
+    feeders = feeders.join(gain, how="left").fillna({"改造分段数": 0, "成本": 0.0, "时户数降幅": 0.0, "SAIDI降幅": 0.0})
+    feeders["改造分段数"] = feeders["改造分段数"].astype(np.int64)
+    feeders["改造后SAIDI合计"] = feeders["原SAIDI合计"] - feeders["SAIDI降幅"]
+    feeders = feeders.reset_index()
+    feeders = feeders[["线路名称", "输入文件"] + [c for c in feeders.columns if c not in ("线路名称", "输入文件")]]
+    feeders = feeders.sort_values("时户数降幅", ascending=False, kind="stable")
+    return detail.reset_index(drop=True), feeders.reset_index(drop=True), method
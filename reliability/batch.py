@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+批量计算：按目录 / 通配符 / 清单收集线路 Excel，进程池并行执行单线路流程，
+输出一张合并的指标汇总表（每条线路 主线 / 分支 / 全线路 三行）；
+列式输出（parquet / csv / jsonl）时另将全部线路的分段明细随结果到达逐条追加写为一个数据集。
+"""
+
+import glob
+import os
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+
+import pandas as pd
+
+from main import OUTPUT_COLS, compute_feeder, load_config, make_cache
+from reliability.instrument import NULL_PROBE, Probe
+from reliability.metrics import district_grid_metrics, feeder_grid_metrics, metrics_config
+from reliability.output import DETAIL_TABLE, open_writer, segment_detail
+
+MANIFEST_EXTS = (".txt", ".lst", ".csv")
+
+# 每个工作进程只加载一次参数文件、创建一次缓存
+_CONFIG = None
+_CACHE = None
+# 是否逐条线路分阶段计量（reliability.instrument）
+_INSTRUMENT = False
+
+
+def collect_inputs(spec):
+    """
+    解析批量输入：目录（其下全部 .xlsx）、通配符，或清单文件（每行一个路径，# 开头为注释）。
+    清单中的相对路径按清单所在目录解析。
+    """
+    if os.path.isdir(spec):
+        paths = glob.glob(os.path.join(spec, "*.xlsx"))
+    elif os.path.isfile(spec) and spec.lower().endswith(MANIFEST_EXTS):
+        base = os.path.dirname(os.path.abspath(spec))
+        paths = []
+        with open(spec, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.split(",")[0].strip()
+                if not line or line.startswith("#"):
+                    continue
+                paths.append(line if os.path.isabs(line) else os.path.join(base, line))
+    else:
+        paths = glob.glob(spec, recursive=True)
+    # 跳过 Excel 打开时产生的 ~$ 临时文件
+    paths = [p for p in paths if not os.path.basename(p).startswith("~$")]
+    return sorted(set(paths))
+
+
+def feeder_name(excel_path):
+    return os.path.splitext(os.path.basename(excel_path))[0]
+
+
+def _init_worker(config_path, use_cache=True, instrument=False):
+    global _CONFIG, _CACHE, _INSTRUMENT
+    _CONFIG = load_config(config_path)
+    # 批量模式下逐段打印没有意义，统一关闭
+    _CONFIG["verbose"] = False
+    _CACHE = make_cache(_CONFIG, use_cache)
+    _INSTRUMENT = instrument
+
+
+def _evaluate(excel_path, detail=False):
+    """
+    工作进程内计算单条线路；异常只影响本线路。detail=True 时另返回合并的分段明细。
+    开启计量时结果另含 stages（各阶段记录，失败线路为失败前已完成的阶段）。
+    """
+    probe = Probe() if _INSTRUMENT else None
+    try:
+        df_main_result, df_branch_result, summary_df = compute_feeder(excel_path, _CONFIG, _CACHE, probe)
+    except Exception as e:
+        return {"ok": False, "path": excel_path, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc(),
+                "stages": probe and probe.records}
+    summary_df = summary_df.copy()
+    summary_df.insert(0, "线路名称", feeder_name(excel_path))
+    summary_df.insert(1, "输入文件", excel_path)
+    metrics = {"线路名称": feeder_name(excel_path), "输入文件": excel_path,
+               **feeder_grid_metrics(df_main_result, df_branch_result, metrics_config(_CONFIG))}
+    res = {"ok": True, "path": excel_path, "summary": summary_df, "metrics": metrics, "stages": probe and probe.records}
+    if detail:
+        res["detail"] = segment_detail(df_main_result, df_branch_result, OUTPUT_COLS, 线路名称=feeder_name(excel_path), 输入文件=excel_path)
+    return res
+
+
+def _chunksize(n, workers):
+    return max(1, n // ((workers or os.cpu_count() or 1) * 4))
+
+
+def _apply(task):
+    """工作进程内对单条线路执行 fn(excel_path, config, cache)；异常只影响本线路。"""
+    fn, excel_path = task
+    try:
+        value = fn(excel_path, _CONFIG, _CACHE)
+    except Exception as e:
+        return {"ok": False, "path": excel_path, "error": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+    return {"ok": True, "path": excel_path, "value": value}
+
+
+def map_feeders(fn, inputs, config_path, workers=None, use_cache=True):
+    """
+    进程池中对每条线路执行模块级函数 fn(excel_path, config, cache)。
+    返回: 与 inputs 同序的结果列表，每项 {"ok", "path", "value" 或 "error"}
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config_path, use_cache)) as pool:
+        return list(pool.map(_apply, [(fn, p) for p in inputs], chunksize=_chunksize(len(inputs), workers)))
+
+
+def imap_feeders(fn, inputs, config_path, workers=None, use_cache=True, window=None):
+    """
+    同 map_feeders，但按完成顺序逐个产出结果，同时在途的线路不超过 window（默认进程数 × 4），
+    主进程来不及消费时不再提交新任务，结果不会在内存中堆积。inputs 可为任意可迭代对象（如逐行读取的清单）。
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 4
+    tasks = iter(inputs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config_path, use_cache)) as pool:
+        pending = set()
+        while True:
+            for path in tasks:
+                pending.add(pool.submit(_apply, (fn, path)))
+                if len(pending) >= window:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def run_batch(inputs, config_path, workers=None, use_cache=True, detail_writers=(), report=None):
+    """
+    并行计算多条线路。
+    detail_writers: 写入器列表（open_writer 返回的写入器、结果仓库等）；提供时各线路分段明细按完成顺序追加写入「分段明细」表，主进程不保留
+    report: 可选 StageReport；提供时各工作进程逐条线路分阶段计量，主进程的分段明细写出计入 report.main
+    返回: (合并汇总DataFrame, 失败列表DataFrame, 逐线路网架计数DataFrame)
+    """
+    summaries = []
+    metrics = []
+    failures = []
+    main_probe = report.main if report is not None else NULL_PROBE
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config_path, use_cache, report is not None)) as pool:
+        evaluate = partial(_evaluate, detail=bool(detail_writers))
+        for i, res in enumerate(pool.map(evaluate, inputs, chunksize=_chunksize(len(inputs), workers)), 1):
+            if report is not None:
+                report.add(res["path"], res["stages"] or ())
+            if res["ok"]:
+                summaries.append(res["summary"])
+                metrics.append(res["metrics"])
+                if detail_writers:
+                    with main_probe.stage("write", len(res["detail"]) * len(detail_writers)):
+                        for writer in detail_writers:
+                            writer.write(DETAIL_TABLE, res["detail"])
+            else:
+                failures.append({"线路名称": feeder_name(res["path"]), "输入文件": res["path"], "错误": res["error"]})
+                print(f"  [失败] {res['path']}: {res['error']}")
+            if i % 100 == 0:
+                print(f"  已完成 {i}/{len(inputs)}")
+    summary_df = pd.concat(summaries, ignore_index=True) if summaries else pd.DataFrame()
+    failure_df = pd.DataFrame(failures, columns=["线路名称", "输入文件", "错误"])
+    return summary_df, failure_df, pd.DataFrame(metrics)
+
+
+def directory_districts(feeder_table):
+    """未提供线路归属时，以线路文件所在目录名作为区县（输入文件 → 区县，不同目录下的同名线路互不覆盖）。"""
+    files = feeder_table["输入文件"].drop_duplicates()
+    return pd.Series([os.path.basename(os.path.dirname(os.path.abspath(p))) for p in files],
+                     index=files.to_numpy(), name="区县")
+
+
+def file_districts(feeder_table, feeder_district=None):
+    """
+    输入文件 → 区县。feeder_district 为「线路归属」的 线路名称 → 区县，未提供时按线路文件所在目录归属。
+    按线路名称归属时，归属表中的线路名称对应多个输入文件（不同目录下的同名线路）无法区分，报 ValueError。
+    """
+    if feeder_district is None:
+        return directory_districts(feeder_table)
+    files = feeder_table[["线路名称", "输入文件"]].drop_duplicates("输入文件")
+    names = files["线路名称"]
+    ambiguous = sorted(set(names[names.duplicated(keep=False)]) & set(feeder_district.index))
+    if ambiguous:
+        raise ValueError(f"线路归属按线路名称匹配，以下线路名称对应多个输入文件: {ambiguous}；"
+                         "请重命名线路文件，或去掉「线路归属」改按线路文件所在目录归属")
+    return pd.Series(names.map(feeder_district).to_numpy(), index=files["输入文件"].to_numpy(), name="区县")
+
+
+def write_batch_result(summary_df, failure_df, output, metrics_df=None):
+    """output: 输出路径（按扩展名选择格式），或已打开的写入器（由调用方关闭）。"""
+    out = open_writer(output) if isinstance(output, str) else output
+    out.write("指标汇总", summary_df)
+    if metrics_df is not None and len(metrics_df):
+        out.write("网架结构", metrics_df)
+        # 按线路文件所在目录（区县）汇总
+        out.write("区县网架结构", district_grid_metrics(metrics_df, directory_districts(metrics_df)).reset_index())
+    if len(failure_df):
+        out.write("失败线路", failure_df)
+    if out is not output:
+        out.close()
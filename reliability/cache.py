@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+内容寻址缓存：
+- 输入层：键 = 工作簿内容哈希 + 字段映射/Sheet 名哈希，值 = 清洗后的主线/分支分段表；
+- 结果层：键 = 输入层键 + constants 哈希，值 = 分段结果与指标汇总。
+按列存为 .npz（每列一个数组），目录总大小超过上限时按最近访问时间淘汰。
+object 列（文本、混合类型）编码为 UTF-8 JSON 字节数组，读取时不允许反序列化 pickle：
+缓存目录可配置、可共享，条目内容不可信，无法读取或格式不符的条目一律视为未命中。
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# 缓存格式或计算逻辑变化时递增，使旧缓存失效
+CACHE_VERSION = 3
+
+DEFAULT_MAX_SIZE_MB = 2048
+
+# 多进程各自估算目录大小，每写入这么多次后重新扫描一次
+RESCAN_INTERVAL = 256
+
+_INDEX_KEY = "__index__"
+
+# object 列数组名后缀：值为 JSON 列表的 UTF-8 字节（uint8）
+_JSON_SUFFIX = ".json"
+
+
+def _json_value(v):
+    if isinstance(v, np.generic):
+        return v.item()
+    raise TypeError(f"缓存不支持的值类型: {type(v).__name__}")
+
+
+def _encode_column(values):
+    """数值 / 布尔列原样保存；object 列编码为 JSON 字节（保留 str / int / float / bool / None，含 NaN）。"""
+    if values.dtype != object:
+        return "", values
+    data = json.dumps(values.tolist(), ensure_ascii=False, default=_json_value).encode("utf-8")
+    return _JSON_SUFFIX, np.frombuffer(data, dtype=np.uint8)
+
+
+def _decode_column(z, key):
+    if key in z.files:
+        return z[key]
+    values = json.loads(z[key + _JSON_SUFFIX].tobytes().decode("utf-8"))
+    out = np.empty(len(values), dtype=object)
+    out[:] = values
+    return out
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def json_digest(obj):
+    data = json.dumps(obj, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def _save_frames(path, frames):
+    """将若干 DataFrame 按列写入一个 .npz（先写临时文件再原子替换，多进程并发安全）。"""
+    arrays = {}
+    layout = {}
+    for name, df in frames.items():
+        cols = [str(c) for c in df.columns]
+        layout[name] = cols
+        suffix, values = _encode_column(df.index.to_numpy())
+        arrays[f"{name}/{_INDEX_KEY}{suffix}"] = values
+        for k, col in enumerate(df.columns):
+            suffix, values = _encode_column(df[col].to_numpy())
+            arrays[f"{name}/{k}{suffix}"] = values
+    arrays["__layout__"] = np.array(json.dumps(layout, ensure_ascii=False))
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _load_frames(path):
+    with np.load(path, allow_pickle=False) as z:
+        layout = json.loads(str(z["__layout__"]))
+        frames = {}
+        for name, cols in layout.items():
+            data = {col: _decode_column(z, f"{name}/{k}") for k, col in enumerate(cols)}
+            frames[name] = pd.DataFrame(data, columns=cols, index=_decode_column(z, f"{name}/{_INDEX_KEY}"))
+    return frames
+
+
+class ResultCache:
+    """两层内容寻址缓存，目录大小超过 max_size_mb 时按访问时间淘汰最旧条目。"""
+
+    def __init__(self, cache_dir, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self._approx_bytes = None
+        self._writes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def input_key(self, excel_path, input_cfg, field_mappings):
+        sheets = {"main_sheet": input_cfg["main_sheet"], "branch_sheet": input_cfg["branch_sheet"]}
+        return f"{file_digest(excel_path)}-{json_digest([CACHE_VERSION, sheets, field_mappings])}"
+
+    def _path(self, layer, key):
+        return os.path.join(self.cache_dir, f"{layer}-{key}.npz")
+
+    def _load(self, path):
+        try:
+            frames = _load_frames(path)
+        except Exception:
+            # 损坏、旧格式（含 pickle 的 object 数组）或被篡改的条目：视为未命中
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return frames
+
+    def _store(self, path, frames):
+        try:
+            _save_frames(path, frames)
+        except TypeError:
+            # 含无法按 JSON 保存的值（如日期）：不缓存
+            return
+        self._writes += 1
+        if self._approx_bytes is None or self._writes % RESCAN_INTERVAL == 0:
+            self.evict()
+            return
+        self._approx_bytes += os.path.getsize(path)
+        if self._approx_bytes > self.max_bytes:
+            self.evict()
+
+    def load_input(self, key):
+        """返回 (主线清洗后, 分支清洗后) 或 None。"""
+        frames = self._load(self._path("input", key))
+        return None if frames is None else (frames["main"], frames["branch"])
+
+    def store_input(self, key, df_main_clean, df_branch_clean):
+        self._store(self._path("input", key), {"main": df_main_clean, "branch": df_branch_clean})
+
+    def load_result(self, key, constants):
+        """返回 (主线结果, 分支结果, 指标汇总) 或 None。"""
+        frames = self._load(self._path("result", f"{key}-{json_digest(constants)}"))
+        return None if frames is None else (frames["main"], frames["branch"], frames["summary"])
+
+    def store_result(self, key, constants, df_main_result, df_branch_result, summary_df):
+        frames = {"main": df_main_result, "branch": df_branch_result, "summary": summary_df}
+        self._store(self._path("result", f"{key}-{json_digest(constants)}"), frames)
+
+    def evict(self):
+        """目录总大小超过上限时，按最近访问（mtime）从旧到新删除。"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        self._approx_bytes = total
+
+
+def cache_from_config(config, base_dir):
+    """按参数文件 cache 段创建缓存；enabled 为 false 时返回 None。"""
+    cfg = config.get("cache", {})
+    if not cfg.get("enabled", True):
+        return None
+    cache_dir = cfg.get("dir", os.path.join("workspace", "cache"))
+    if not os.path.isabs(cache_dir):
+        cache_dir = os.path.join(base_dir, cache_dir)
+    return ResultCache(cache_dir, cfg.get("max_size_mb", DEFAULT_MAX_SIZE_MB))
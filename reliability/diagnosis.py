@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+网架诊断（document/一线一案智能体规则数据清单.xlsx「网架诊断智能体」）：
+- 多主干拆分：由联络开关得到全部对侧线路；对侧线路 ≥ 2 时，按分段顺序查找起点/终点（剔除「xxx变电站」）
+  以对侧线路关键词（「10kV安54新窑线」的「安54」，找不够时用「新窑」）开头的开关作为各主干终点；
+  后续主干被省略的公共分段从前面主干补齐；不含联络开关的主干并入前一主干；
+- 分段过多：各主干架空分段不宜超过 max_overhead_segments 段、电缆分段不宜超过 max_cable_segments 段。
+  起点与终点均含电缆关键词、且设备 Sheet 中该分段电缆头较多（缺少时以线路型号电缆权重判断）的为电缆分段；
+- 冗余分段：超标主干中相邻同类分段合并后用户数 ≤ merge_max_users、装机容量 ≤ merge_max_kva 的为合并候选，
+  用户量（其次装机容量）最少者为冗余分段；合并对全线路 SAIDI/SAIFI 的影响由分段内核对合并前后分段一次计算，不重算线路。
+规则按参数编译一次，在全部线路堆叠后的 主干×分段 表上分组向量化求值。
+"""
+
+import re
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from main import compute_feeder
+from reliability.kernel import SegmentTable, segment_kernel
+from reliability.xlsx_reader import read_projected_sheets
+
+DEFAULT_DIAGNOSIS = {
+    "rules": ["多主干拆分", "分段过多", "冗余分段"],
+    "max_overhead_segments": 5,
+    "max_cable_segments": 2,
+    "merge_max_users": 20,
+    "merge_max_kva": 4000,
+    "cable_keywords": ["环网柜", "环网箱", "配电室", "开闭所", "电缆"],
+    "cable_head_keyword": "电缆头",
+    "cable_head_min": 2,
+    # 设备 Sheet 无电缆头时，线路型号电缆权重不低于该值视为电缆分段
+    "cable_weight_min": 0.5,
+    "start_column": "起点",
+    "end_column": "终点",
+    "capacity_column": "装机容量(kVA)",
+    # 对侧线路补充：{线路名称: [对侧线路名称, ...]}，与联络开关索引结果合并
+    "tie_feeders": {},
+}
+
+FINDING_COLS = ["线路名称", "输入文件", "规则", "主干编号", "对象", "描述", "数值", "限值"]
+# 主干以输入文件区分：不同目录下的同名线路为不同线路
+TRUNK_KEYS = ["输入文件", "主干编号"]
+
+_FEEDER_NAME = re.compile(r"10kV([一-鿿]+\d+)([一-鿿]+?)线", re.IGNORECASE)
+_SWITCH_FEEDER = re.compile(r"^10kV[一-鿿]+\d+[一-鿿]+?线", re.IGNORECASE)
+_STATION = re.compile(r"^.*?变电站")
+_VOLTAGE = re.compile(r"^\d+kV", re.IGNORECASE)
+
+
+def diagnosis_config(config):
+    return {**DEFAULT_DIAGNOSIS, **config.get("diagnosis", {})}
+
+
+def feeder_keywords(name):
+    """对侧线路名称关键词：(「中文+数字」, 「xx线」中文)，如 10kV安54新窑线 → (安54, 新窑)。"""
+    m = _FEEDER_NAME.search(name)
+    return (m.group(1), m.group(2)) if m else (None, None)
+
+
+def _switch_head(name):
+    """开关名称剔除「xxx变电站」及电压等级前缀。"""
+    if not isinstance(name, str):
+        return ""
+    return _VOLTAGE.sub("", _STATION.sub("", name.strip()))
+
+
+def switch_feeders(switches):
+    """联络开关名称以「10kV…线」开头时，由名称直接得到对侧线路。"""
+    out = []
+    for sw in switches:
+        m = _SWITCH_FEEDER.match(sw)
+        if m and m.group(0) not in out:
+            out.append(m.group(0))
+    return out
+
+
+def split_trunks(starts, ends, has_tie, opposites):
+    """
+    多主干拆分。
+    starts / ends / has_tie: 按分段顺序的起点、终点、段内是否有联络开关
+    opposites: 对侧线路名称列表
+    返回: [(分段位置列表, 前部补充分段数), ...]，每个元素为一个主干
+    """
+    n = len(starts)
+    keywords = [feeder_keywords(name) for name in opposites]
+    keywords = [kw for kw in keywords if kw[0]]
+    need = len(keywords) - 1 if len(keywords) >= 2 else 0
+    heads = [(_switch_head(s), _switch_head(e)) for s, e in zip(starts, ends)]
+
+    def search(begin, which, pending):
+        # 排除线路首段起点、末段终点及本主干首段起点
+        for k in range(begin, n):
+            for pos, cut in ((0, k - 1), (1, k)):
+                if (pos == 0 and k == begin) or (pos == 1 and k == n - 1):
+                    continue
+                head = heads[k][pos]
+                for j in pending:
+                    if head and head.startswith(keywords[j][which]):
+                        return cut, j
+        return None
+
+    cuts = []
+    pending = list(range(len(keywords)))
+    begin = 0
+    while len(cuts) < need and begin < n:
+        found = search(begin, 0, pending) or search(begin, 1, pending)
+        if found is None:
+            break
+        cut, j = found
+        cuts.append(cut)
+        pending.remove(j)
+        begin = cut + 1
+
+    bounds = [0] + [c + 1 for c in cuts] + [n]
+    own = [list(range(a, b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+    # 不含联络开关的主干并入前一主干
+    trunks = []
+    for segs in own:
+        if trunks and not any(has_tie[k] for k in segs):
+            trunks[-1].extend(segs)
+        else:
+            trunks.append(list(segs))
+
+    # 补充被省略的公共分段：以主干起点匹配前面主干的终点
+    out = []
+    for t, segs in enumerate(trunks):
+        path, extra = list(segs), 0
+        for prev, _ in reversed(out):
+            match = [p for p, k in enumerate(prev) if ends[k] == starts[segs[0]]]
+            if match:
+                extra = match[0] + 1
+                path = prev[:extra] + path
+                break
+        out.append((path, extra))
+    return out
+
+
+def read_diagnosis_columns(excel_path, config, dcfg, tie, topo):
+    """
+    读取诊断所需的起点/终点/装机容量/联络开关列（按原始行号，与清洗后分段表的索引对齐），
+    以及设备 Sheet 各分段电缆头数量（缺少设备 Sheet 时为 None）。
+    """
+    inp = config["input"]
+    main_sheet, branch_sheet = inp["main_sheet"], inp["branch_sheet"]
+    main_cols = [dcfg["start_column"], dcfg["end_column"], dcfg["capacity_column"], tie["main_tie_column"]]
+    _, frames = read_projected_sheets(
+        excel_path, {main_sheet: main_cols, branch_sheet: [tie["branch_tie_column"], dcfg["capacity_column"]]},
+        optional={main_sheet: [dcfg["capacity_column"], tie["main_tie_column"]],
+                  branch_sheet: [tie["branch_tie_column"], dcfg["capacity_column"]]})
+    main = frames[main_sheet].rename(columns={
+        dcfg["start_column"]: "起点", dcfg["end_column"]: "终点",
+        dcfg["capacity_column"]: "装机容量(kVA)", tie["main_tie_column"]: "联络开关",
+    })
+    main["装机容量(kVA)"] = pd.to_numeric(main["装机容量(kVA)"], errors="coerce").fillna(0.0)
+    branch = frames[branch_sheet].rename(columns={tie["branch_tie_column"]: "联络开关", dcfg["capacity_column"]: "装机容量(kVA)"})
+    branch["装机容量(kVA)"] = pd.to_numeric(branch["装机容量(kVA)"], errors="coerce").fillna(0.0)
+
+    heads = None
+    try:
+        _, dev = read_projected_sheets(excel_path, {topo["main_device_sheet"]: ["线路分段", "设备类型"]})
+    except (KeyError, ValueError):
+        dev = None
+    if dev is not None:
+        df = dev[topo["main_device_sheet"]]
+        seg = df["线路分段"].where(df["线路分段"].map(lambda x: isinstance(x, str) and bool(x.strip()))).ffill()
+        is_head = df["设备类型"].astype(str).str.contains(dcfg["cable_head_keyword"], regex=False)
+        heads = is_head.groupby(seg.str.strip()).sum()
+    return main, branch, heads
+
+
+def feeder_diagnosis_input(excel_path, config, cache=None):
+    """单条线路的诊断输入（可作为 batch.map_feeders 的工作函数）：分段结果 + 起终点、联络开关与电缆头数量。"""
+    from reliability.batch import feeder_name
+    from reliability.tie import split_switches, tie_config
+    from reliability.topology import topology_config
+
+    dcfg = diagnosis_config(config)
+    name = feeder_name(excel_path)
+    df_main_result, df_branch_result, summary_df = compute_feeder(excel_path, config, cache)
+    main, branch, heads = read_diagnosis_columns(excel_path, config, dcfg, tie_config(config), topology_config(config))
+    aligned = main.reindex(df_main_result.index)
+    seg = pd.DataFrame({
+        "线路名称": name,
+        "输入文件": excel_path,
+        "分段编号": df_main_result["分段编号"].astype(str).str.strip().to_numpy(),
+        "起点": aligned["起点"].to_numpy(),
+        "终点": aligned["终点"].to_numpy(),
+        "用户数(台)": df_main_result["用户数(台)"].to_numpy(dtype=np.float64),
+        "装机容量(kVA)": aligned["装机容量(kVA)"].fillna(0.0).to_numpy(dtype=np.float64),
+        "长度(km)": df_main_result["长度(km)"].to_numpy(dtype=np.float64),
+        "故障率": df_main_result["故障率"].to_numpy(dtype=np.float64),
+        "隔离时间": df_main_result["隔离时间"].to_numpy(dtype=np.float64),
+        "电缆权重": df_main_result["电缆权重"].to_numpy(dtype=np.float64),
+        "联络开关": aligned["联络开关"].to_numpy(),
+    })
+    seg["电缆头数"] = seg["分段编号"].map(heads).fillna(0).astype(np.int64) if heads is not None else 0
+    switches = [sw for v in list(main["联络开关"]) + list(branch["联络开关"]) for sw in split_switches(v)]
+    summary_df = summary_df.copy()
+    summary_df.insert(0, "线路名称", name)
+    summary_df.insert(1, "输入文件", excel_path)
+    whole = summary_df[summary_df["线路类型"] == "全线路"].iloc[0]
+    return {
+        "name": name, "path": excel_path, "segments": seg, "switches": switches, "summary": summary_df,
+        "installed_kva": float(main["装机容量(kVA)"].sum() + branch["装机容量(kVA)"].sum()),
+        "total_users": int(whole["总用户数(台)"]), "saidi": float(whole["SAIDI合计"]), "saifi": float(whole["SAIFI合计"]),
+    }
+
+
+def classify_segments(seg, dcfg):
+    """全部线路分段一次判断电缆/架空分段。"""
+    pattern = "|".join(re.escape(k) for k in dcfg["cable_keywords"])
+    ends_ok = (seg["起点"].astype(str).str.contains(pattern) & seg["终点"].astype(str).str.contains(pattern)).to_numpy()
+    evidence = (np.asarray(seg["电缆头数"]) >= dcfg["cable_head_min"]) | (seg["电缆权重"].to_numpy() >= dcfg["cable_weight_min"])
+    return np.where(ends_ok & evidence, "电缆", "架空")
+
+
+def _trunk_counts(trunks, params):
+    counts = pd.crosstab([trunks[k] for k in TRUNK_KEYS], trunks["分段类型"]).reindex(columns=["架空", "电缆"], fill_value=0)
+    counts["架空超出"] = (counts["架空"] - params["max_overhead_segments"]).clip(lower=0)
+    counts["电缆超出"] = (counts["电缆"] - params["max_cable_segments"]).clip(lower=0)
+    return counts
+
+
+def rule_too_many(trunks, params, constants):
+    """分段过多：各主干架空/电缆分段数超过上限。"""
+    counts = _trunk_counts(trunks, params)
+    names = trunks.drop_duplicates("输入文件").set_index("输入文件")["线路名称"]
+    rows = []
+    for kind, limit in (("架空", params["max_overhead_segments"]), ("电缆", params["max_cable_segments"])):
+        over = counts[counts[f"{kind}超出"] > 0]
+        for (path, trunk), n in zip(over.index, over[kind]):
+            rows.append([names[path], path, "分段过多", trunk, f"主干{trunk}", f"{kind}分段 {n} 段，不宜超过 {limit} 段", n, limit])
+    return pd.DataFrame(rows, columns=FINDING_COLS), None
+
+
+def rule_redundant(trunks, params, constants):
+    """
+    冗余分段：超标主干内相邻同类分段两两合并的候选，按合并前后分段一次内核计算全线路 SAIDI/SAIFI 变化。
+    返回: (诊断结果, 合并候选明细)
+    """
+    counts = _trunk_counts(trunks, params)
+    keys = TRUNK_KEYS
+    nxt = trunks.groupby(keys, sort=False).shift(-1)
+    excess = pd.concat([counts["架空超出"].rename("架空"), counts["电缆超出"].rename("电缆")], axis=1)
+    kind_excess = excess.stack()
+    kind_excess.index.names = keys + ["分段类型"]
+    over = kind_excess.reindex(pd.MultiIndex.from_frame(trunks[keys + ["分段类型"]])).to_numpy()
+    merged_users = trunks["用户数(台)"].to_numpy() + nxt["用户数(台)"].to_numpy()
+    merged_kva = trunks["装机容量(kVA)"].to_numpy() + nxt["装机容量(kVA)"].to_numpy()
+    ok = ((nxt["分段类型"] == trunks["分段类型"]).to_numpy() & (over > 0)
+          & (merged_users <= params["merge_max_users"]) & (merged_kva <= params["merge_max_kva"]))
+    a = trunks[ok].reset_index(drop=True)
+    b = nxt[ok].reset_index(drop=True)
+    if not len(a):
+        return pd.DataFrame(columns=FINDING_COLS), pd.DataFrame()
+
+    # 合并段：长度、故障次数相加，隔离时间取上游分段（保留其起点开关）；各行单独成组，分母为全线路用户数
+    n = len(a)
+    ua, ub = a["用户数(台)"].to_numpy(), b["用户数(台)"].to_numpy(dtype=np.float64)
+    la, lb = a["长度(km)"].to_numpy(), b["长度(km)"].to_numpy(dtype=np.float64)
+    fa, fb = a["故障率"].to_numpy(), b["故障率"].to_numpy(dtype=np.float64)
+    length = la + lb
+    rate = np.where(length > 0, (fa * la + fb * lb) / np.where(length > 0, length, 1.0), fa)
+    table = SegmentTable(
+        length=np.concatenate([length, la, lb]),
+        users=np.concatenate([merged_users[ok], ua, ub]),
+        fault_rate=np.concatenate([rate, fa, fb]),
+        isolation_time=np.concatenate([a["隔离时间"].to_numpy()] * 2 + [b["隔离时间"].to_numpy(dtype=np.float64)]),
+        offsets=np.arange(3 * n + 1),
+    )
+    result = segment_kernel(table, constants, np.tile(a["全线路用户数"].to_numpy(dtype=np.int64), 3))
+    saidi, saifi = result[5], result[8]
+
+    # 用户量少者（相同时装机容量少者）为冗余分段
+    small_a = (ua < ub) | ((ua == ub) & (a["装机容量(kVA)"].to_numpy() <= b["装机容量(kVA)"].to_numpy(dtype=np.float64)))
+    cand = pd.DataFrame({
+        "线路名称": a["线路名称"], "输入文件": a["输入文件"], "主干编号": a["主干编号"], "分段类型": a["分段类型"],
+        "冗余分段": np.where(small_a, a["分段编号"], b["分段编号"]),
+        "合并分段": np.where(small_a, b["分段编号"], a["分段编号"]),
+        "取消开关": a["终点"],
+        "冗余分段用户数(台)": np.where(small_a, a["用户数(台)"], b["用户数(台)"]),
+        "冗余分段装机容量(kVA)": np.where(small_a, a["装机容量(kVA)"], b["装机容量(kVA)"]),
+        "合并后用户数(台)": merged_users[ok],
+        "合并后装机容量(kVA)": merged_kva[ok],
+        "SAIDI变化(h/户·年)": saidi[:n] - saidi[n:2 * n] - saidi[2 * n:],
+        "SAIFI变化(次/户·年)": saifi[:n] - saifi[n:2 * n] - saifi[2 * n:],
+        "原SAIDI合计": a["原SAIDI合计"],
+        "_位置": a["主干内序号"],
+    })
+    cand["合并后SAIDI合计"] = cand["原SAIDI合计"] + cand["SAIDI变化(h/户·年)"]
+    cand = cand.sort_values(keys + ["分段类型", "冗余分段用户数(台)", "冗余分段装机容量(kVA)", "SAIDI变化(h/户·年)"], kind="stable")
+
+    # 每个超标主干按超出段数依次取不相交的候选
+    recommend = np.zeros(len(cand), dtype=bool)
+    taken = {}
+    for i, (path, trunk, kind, pos) in enumerate(zip(cand["输入文件"], cand["主干编号"], cand["分段类型"], cand["_位置"])):
+        used = taken.setdefault((path, trunk, kind), set())
+        if len(used) // 2 < kind_excess[(path, trunk, kind)] and pos not in used and pos + 1 not in used:
+            used.update((pos, pos + 1))
+            recommend[i] = True
+    cand["推荐合并"] = recommend
+    cand = cand.drop(columns="_位置").reset_index(drop=True)
+
+    chosen = cand[cand["推荐合并"]]
+    findings = pd.DataFrame({
+        "线路名称": chosen["线路名称"], "输入文件": chosen["输入文件"], "规则": "冗余分段", "主干编号": chosen["主干编号"],
+        "对象": chosen["冗余分段"],
+        "描述": [f"{k}分段 {r} 可与 {m} 合并（取消 {s}），合并后 {int(u)} 台 / {kva:g} kVA，全线路 SAIDI 变化 {d:+.6f}"
+               for k, r, m, s, u, kva, d in zip(chosen["分段类型"], chosen["冗余分段"], chosen["合并分段"], chosen["取消开关"],
+                                                  chosen["合并后用户数(台)"], chosen["合并后装机容量(kVA)"], chosen["SAIDI变化(h/户·年)"])],
+        "数值": chosen["合并后用户数(台)"], "限值": params["merge_max_users"],
+    })
+    return findings, cand
+
+
+RULES = {"分段过多": rule_too_many, "冗余分段": rule_redundant}
+
+
+def compile_rules(dcfg, constants):
+    """按参数绑定规则，返回 [(规则名, 求值函数)]；多主干拆分在建表时处理。"""
+    compiled = []
+    for name in dcfg["rules"]:
+        if name == "多主干拆分":
+            continue
+        if name not in RULES:
+            raise KeyError(f"未知诊断规则: {name}，可选 {['多主干拆分', *RULES]}")
+        compiled.append((name, partial(RULES[name], params=dcfg, constants=constants)))
+    return compiled
+
+
+def build_trunks(feeders, dcfg, index):
+    """
+    各线路拆分主干并堆叠为 主干×分段 表。
+    feeders: feeder_diagnosis_input 结果列表；index: 联络开关索引（TieIndex）
+    返回: (主干×分段 DataFrame, 多主干拆分诊断结果)
+    """
+    seg_all = pd.concat([f["segments"] for f in feeders], ignore_index=True)
+    seg_all["分段类型"] = classify_segments(seg_all, dcfg)
+    split = "多主干拆分" in dcfg["rules"]
+    parts, rows = [], []
+    offset = 0
+    for f in feeders:
+        seg = seg_all.iloc[offset:offset + len(f["segments"])]
+        offset += len(f["segments"])
+        if not len(seg):
+            continue
+        opposites = list(dcfg["tie_feeders"].get(f["name"], []))
+        for sw in f["switches"]:
+            other = index.opposite(sw, f["name"])
+            if other and other not in opposites:
+                opposites.append(other)
+        opposites += [o for o in switch_feeders(f["switches"]) if o not in opposites and o != f["name"]]
+        has_tie = [isinstance(v, str) and bool(v.strip()) for v in seg["联络开关"]]
+        if split:
+            trunks = split_trunks(list(seg["起点"]), list(seg["终点"]), has_tie, opposites)
+        else:
+            trunks = [(list(range(len(seg))), 0)]
+        for t, (path, extra) in enumerate(trunks, start=1):
+            part = seg.iloc[path].copy()
+            part.insert(2, "主干编号", t)
+            part.insert(3, "主干内序号", np.arange(len(path)))
+            part["补充分段"] = np.arange(len(path)) < extra
+            part["全线路用户数"] = f["total_users"]
+            part["原SAIDI合计"] = f["saidi"]
+            parts.append(part)
+        if len(trunks) > 1:
+            desc = "；".join(f"主干{t}: {seg['分段编号'].iloc[p[0]]}～{seg['分段编号'].iloc[p[-1]]}（{len(p)} 段）"
+                            for t, (p, _) in enumerate(trunks, start=1))
+            rows.append([f["name"], f["path"], "多主干拆分", 0, "全线", f"对侧线路 {len(opposites)} 条，拆分为 {len(trunks)} 个主干；{desc}",
+                         len(trunks), len(opposites)])
+    trunks_df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    return trunks_df, pd.DataFrame(rows, columns=FINDING_COLS)
+
+
+def diagnose(feeders, config, index):
+    """
+    对全部线路求值诊断规则。
+    返回: (诊断结果, 主干×分段 表, 冗余分段合并候选)
+    """
+    dcfg = diagnosis_config(config)
+    trunks, split_findings = build_trunks(feeders, dcfg, index)
+    findings, candidates = [split_findings], pd.DataFrame()
+    if len(trunks):
+        for name, fn in compile_rules(dcfg, config["constants"]):
+            found, detail = fn(trunks)
+            findings.append(found)
+            if detail is not None:
+                candidates = detail
+    findings = pd.concat([f for f in findings if len(f)], ignore_index=True) if any(len(f) for f in findings) \
+        else pd.DataFrame(columns=FINDING_COLS)
+    return findings, trunks, candidates
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+分阶段计量：逐条线路记录各阶段（读取、字段映射、清洗、敷设方式解析、分段内核、汇总、写出）的
+墙钟时间、CPU 时间、进程峰值内存与行数，输出 JSON 报告与可选的 Prometheus 文本格式文件。
+
+未开启计量时各阶段使用 NULL_PROBE，stage() 返回共享的空上下文，开销可忽略。
+峰值内存取 getrusage 的进程常驻内存高水位（阶段结束时读取，随阶段单调不减）；无 resource 模块的平台记为空。
+批量模式下各工作进程分别计量后随结果返回，报告中的 读取+写出 与 计算 占比用于判断瓶颈在 Excel I/O 还是计算。
+"""
+
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 阶段标识 → 显示名（Prometheus 标签使用标识）
+STAGES = {
+    "cache": "缓存查找",
+    "read": "读取",
+    "mapping": "字段映射",
+    "clean": "清洗",
+    "laying": "敷设方式解析",
+    "kernel": "分段内核",
+    "summary": "汇总",
+    "write": "写出",
+}
+
+IO_STAGES = ("cache", "read", "write")
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 为 KB，macOS 为字节
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+class _Stage:
+    __slots__ = ("probe", "name", "rows", "wall", "cpu")
+
+    def __init__(self, probe, name, rows):
+        self.probe = probe
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.probe.records.append({
+            "stage": self.name,
+            "wall_s": time.perf_counter() - self.wall,
+            "cpu_s": time.process_time() - self.cpu,
+            "peak_rss_mb": peak_rss_mb(),
+            "rows": self.rows,
+        })
+        return False
+
+
+class Probe:
+    """
+    单条线路的阶段计量：
+        with probe.stage("read") as s:
+            ...
+            s.rows = len(df)
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.records = []
+
+    def stage(self, name, rows=None):
+        return _Stage(self, name, rows)
+
+
+class _NullStage:
+    __slots__ = ()
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+class _NullProbe:
+    enabled = False
+    records = ()
+
+    def stage(self, name, rows=None):
+        return _NULL_STAGE
+
+
+_NULL_STAGE = _NullStage()
+NULL_PROBE = _NullProbe()
+
+
+def _value(v):
+    return str(v) if isinstance(v, int) else repr(float(v))
+
+
+class StageReport:
+    """汇集各线路（及主进程）的阶段记录，生成 JSON 报告与 Prometheus 文本。"""
+
+    def __init__(self, mode, source):
+        self.mode = mode
+        self.source = source
+        self.started = time.perf_counter()
+        self.feeders = []
+        self.main = Probe()
+
+    def add(self, excel_path, records):
+        self.feeders.append({"input": excel_path, "stages": list(records)})
+
+    def stage_totals(self):
+        """按阶段汇总：次数、墙钟 / CPU 时间合计、最大峰值内存、行数合计。"""
+        totals = {}
+        for records in [f["stages"] for f in self.feeders] + [self.main.records]:
+            for r in records:
+                t = totals.setdefault(r["stage"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_mb": None, "rows": 0})
+                t["count"] += 1
+                t["wall_s"] += r["wall_s"]
+                t["cpu_s"] += r["cpu_s"]
+                t["rows"] += r["rows"] or 0
+                if r["peak_rss_mb"] is not None:
+                    t["peak_rss_mb"] = max(t["peak_rss_mb"] or 0.0, r["peak_rss_mb"])
+        return {name: totals[name] for name in STAGES if name in totals}
+
+    def to_dict(self):
+        totals = self.stage_totals()
+        busy = sum(t["wall_s"] for t in totals.values())
+        io = sum(t["wall_s"] for name, t in totals.items() if name in IO_STAGES)
+        return {
+            "mode": self.mode,
+            "source": self.source,
+            "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "elapsed_s": time.perf_counter() - self.started,
+            "feeder_count": len(self.feeders),
+            "stages": totals,
+            "io_share": io / busy if busy > 0 else None,
+            "main_stages": self.main.records,
+            "feeders": self.feeders,
+        }
+
+    def summary_lines(self):
+        report = self.to_dict()
+        busy = sum(t["wall_s"] for t in report["stages"].values()) or 1.0
+        lines = [f"阶段计量（{report['feeder_count']} 条线路，总耗时 {report['elapsed_s']:.3f} s）:"]
+        for name, t in report["stages"].items():
+            rss = "" if t["peak_rss_mb"] is None else f"，峰值内存 {t['peak_rss_mb']:.0f} MB"
+            lines.append(f"  {STAGES[name]:<8} 墙钟 {t['wall_s']:.3f} s（{t['wall_s'] / busy:.0%}）CPU {t['cpu_s']:.3f} s，行数 {t['rows']}{rss}")
+        if report["io_share"] is not None:
+            lines.append(f"  Excel 读写与缓存占 {report['io_share']:.0%}，计算占 {1 - report['io_share']:.0%}")
+        return lines
+
+    def save_json(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+    def prometheus_text(self):
+        """Prometheus 文本格式（可供 node_exporter textfile 采集），按阶段聚合，不带线路标签以控制基数。"""
+        totals = self.stage_totals()
+        metrics = [
+            ("reliability_stage_wall_seconds", "各阶段墙钟时间合计", "wall_s", 1),
+            ("reliability_stage_cpu_seconds", "各阶段 CPU 时间合计", "cpu_s", 1),
+            ("reliability_stage_rows", "各阶段处理行数合计", "rows", 1),
+            ("reliability_stage_peak_rss_bytes", "各阶段结束时进程峰值常驻内存（最大值）", "peak_rss_mb", 1 << 20),
+        ]
+        lines = []
+        for metric, help_text, key, scale in metrics:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for name, t in totals.items():
+                if t[key] is not None:
+                    lines.append(f'{metric}{{mode="{self.mode}",stage="{name}"}} {_value(t[key] * scale)}')
+        lines.append("# HELP reliability_feeders 计量的线路数")
+        lines.append("# TYPE reliability_feeders gauge")
+        lines.append(f'reliability_feeders{{mode="{self.mode}"}} {len(self.feeders)}')
+        return "\n".join(lines) + "\n"
+
+    def save_prometheus(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
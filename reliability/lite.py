@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+轻量单线路路径：不导入 pandas / numpy，交互式核对单条小线路时秒级返回。
+
+只读取 field_mappings 的五个映射列（流式列投影读取），清洗、敷设方式解析与分段指标均以 Python 列表逐行计算，
+运算顺序与 reliability.kernel.segment_kernel 相同，分段指标与完整路径逐位一致；汇总沿用 summary_record / combine_summaries，
+求和顺序不同时末位可能不同，汇总按 6 位小数输出。
+csv 用标准库写出（行尾与列类型推断同 CsvWriter，分段明细与完整路径逐字节一致），xlsx 用 openpyxl 只写模式写出，表结构同 write_feeder_result。
+以下情况回退到完整路径：文件超过 lite.max_file_mb、输出 parquet / jsonl（浮点格式由 pandas 的 JSON 编码器决定，不另行仿写）、
+写入结果仓库、分段追踪、input.reader 不是 stream。
+不读写结果缓存（缓存依赖 pandas，小线路直接计算更快），也不带出网架指标附带列。
+"""
+
+import csv
+import math
+import os
+
+from main import OUTPUT_COLS, _log, _parse_laying_cached, combine_summaries, get_isolation_time, summary_record, verbosity
+from reliability.instrument import NULL_PROBE
+from reliability.output import DETAIL_TABLE, output_format, table_path
+from reliability.xlsx_reader import read_projected_columns
+
+DEFAULT_LITE = {
+    "max_file_mb": 5,
+}
+
+# 同 reliability.kernel.LINE_TYPES（kernel 导入 numpy，此处不引用）
+LINE_TYPES = ("主线", "分支")
+
+
+def lite_config(config):
+    return {**DEFAULT_LITE, **config.get("lite", {})}
+
+
+def lite_fallback(excel_path, output_path, config, fmt=None, store=None, trace_path=None):
+    """需要回退到完整路径时返回原因，否则返回 None。"""
+    lc = lite_config(config)
+    if config["input"].get("reader", "stream") != "stream":
+        return "input.reader 不是 stream"
+    if store is not None:
+        return "写入结果仓库"
+    if trace_path:
+        return "分段追踪"
+    fmt = output_format(output_path, fmt)
+    if fmt in ("parquet", "jsonl"):
+        return f"{fmt} 输出"
+    size_mb = os.path.getsize(excel_path) / (1 << 20)
+    if size_mb > lc["max_file_mb"]:
+        return f"文件 {size_mb:.1f} MB 超过 lite.max_file_mb={lc['max_file_mb']}"
+    return None
+
+
+def _to_number(value):
+    """同 pd.to_numeric(errors='coerce') 的单值转换，无法转换时为 None。"""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return None if math.isnan(value) else value
+    text = str(value).strip()
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    return None if math.isnan(value) else value
+
+
+def _numeric_column(values):
+    """整列数值化：含缺失或小数时整列为浮点（同 pandas 的 float64 列），否则保持整数。"""
+    numbers = [_to_number(v) for v in values]
+    if any(v is None or isinstance(v, float) for v in numbers):
+        return [None if v is None else float(v) for v in numbers]
+    return numbers
+
+
+def clean_columns(cols, line_type, verbose):
+    """同 clean_data：长度、用户数数值化后保留两者均非空且非负的行。返回逐行字典列表。"""
+    cols = dict(cols)
+    n = len(cols["长度(km)"])
+    cols["长度(km)"] = _numeric_column(cols["长度(km)"])
+    cols["用户数(台)"] = _numeric_column(cols["用户数(台)"])
+    names = list(cols)
+    rows = []
+    for values in zip(*(cols[name] for name in names)):
+        row = dict(zip(names, values))
+        length, users = row["长度(km)"], row["用户数(台)"]
+        if length is not None and users is not None and length >= 0 and users >= 0:
+            rows.append(row)
+    _log(f"{line_type}: 原始{n}行 → 清洗后{len(rows)}行", verbose)
+    return rows
+
+
+def prepare_rows(rows, constants):
+    """同 prepare_segments：就地写入敷设方式权重、故障率、描述与隔离时间。"""
+    cable_rate = constants["Cable_Fault_Rate"]
+    overhead_rate = constants["Overhead_Fault_Rate"]
+    for row in rows:
+        cable_w, overhead_w, rate, desc = _parse_laying_cached(str(row["敷设方式_原始"]), cable_rate, overhead_rate)
+        row.update({"电缆权重": cable_w, "架空权重": overhead_w, "故障率": rate, "敷设方式描述": desc,
+                    "隔离时间": get_isolation_time(row["自动化状态"], constants)})
+    return rows
+
+
+def segment_rows(rows, total_users, constants):
+    """就地计算一组已解析敷设方式的分段指标（运算顺序同 segment_kernel）。"""
+    repair = constants["Cable_Repair_Time"]
+    sched_rate = constants["Scheduled_Outage_Rate"]
+    sched_time = constants["Scheduled_Total_Time"]
+    denom = float(total_users)
+    for row in rows:
+        rate = row["故障率"]
+        length = float(row["长度(km)"])
+        users = float(row["用户数(台)"])
+        effective = users > 0
+        fault_count = length * rate if effective else 0.0
+        fault_time = row["隔离时间"] + repair
+        sched_count = length * sched_rate if effective else 0.0
+        if effective and denom > 0:
+            saidi_f = fault_count * fault_time * users / denom
+            saifi_f = fault_count * users / denom
+            saidi_s = sched_count * sched_time * users / denom
+            saifi_s = sched_count * users / denom
+        else:
+            saidi_f = saifi_f = saidi_s = saifi_s = 0.0
+        row.update({
+            "有效分段": effective,
+            "故障次数(次/年)": fault_count, "故障总时间(小时/次)": fault_time, "预安排次数(次/年)": sched_count,
+            "SAIDI-F": saidi_f, "SAIDI-S": saidi_s, "SAIDI合计": saidi_f + saidi_s,
+            "SAIFI-F": saifi_f, "SAIFI-S": saifi_s, "SAIFI合计": saifi_f + saifi_s,
+        })
+    return rows
+
+
+def _sums(rows):
+    return {
+        "总长度(km)": sum(float(r["长度(km)"]) for r in rows),
+        "总故障次数(次/年)": sum(r["故障次数(次/年)"] for r in rows),
+        "总预安排次数(次/年)": sum(r["预安排次数(次/年)"] for r in rows),
+        "SAIDI-F": sum(r["SAIDI-F"] for r in rows),
+        "SAIDI-S": sum(r["SAIDI-S"] for r in rows),
+        "SAIFI-F": sum(r["SAIFI-F"] for r in rows),
+        "SAIFI-S": sum(r["SAIFI-S"] for r in rows),
+    }
+
+
+def compute_feeder_lite(excel_path, config, probe=NULL_PROBE):
+    """
+    轻量计算单条线路。
+    probe: 可选阶段计量（reliability.instrument.Probe），阶段同 compute_feeder
+    返回: (主线分段行列表, 分支分段行列表, 指标汇总行列表)，行为 {列名: 值} 字典，列同 compute_feeder 的结果
+    """
+    inp = config["input"]
+    field_mappings = config["field_mappings"]
+    constants = config["constants"]
+    verbose = verbosity(config)
+    sheets = {inp["main_sheet"]: field_mappings["main"], inp["branch_sheet"]: field_mappings["branch"]}
+
+    with probe.stage("read") as st:
+        sheet_names, tables = read_projected_columns(excel_path, {sheet: list(mapping) for sheet, mapping in sheets.items()})
+        st.rows = sum(len(next(iter(cols.values()))) for cols in tables.values())
+    _log(f"Excel: {excel_path}", verbose)
+    _log(f"Sheet: {sheet_names}", verbose)
+    with probe.stage("mapping", st.rows):
+        mapped = [{mapping[src]: values for src, values in tables[sheet].items()} for sheet, mapping in sheets.items()]
+    with probe.stage("clean") as st:
+        groups = [clean_columns(cols, line_type, verbose) for cols, line_type in zip(mapped, LINE_TYPES)]
+        st.rows = sum(len(rows) for rows in groups)
+    with probe.stage("laying", st.rows):
+        for rows in groups:
+            prepare_rows(rows, constants)
+
+    totals = [int(sum(float(r["用户数(台)"]) for r in rows)) for rows in groups]
+    with probe.stage("kernel", st.rows):
+        for rows, total_users in zip(groups, totals):
+            segment_rows(rows, total_users, constants)
+    with probe.stage("summary", 3):
+        summaries = [summary_record(line_type, total_users, _sums(rows), constants, verbose)
+                     for rows, total_users, line_type in zip(groups, totals, LINE_TYPES)]
+        summaries.append(combine_summaries(summaries[0], summaries[1], constants))
+    if verbose:
+        print("\t".join(summaries[0]))
+        for record in summaries:
+            print("\t".join(str(v) for v in record.values()))
+    return groups[0], groups[1], summaries
+
+
+def _values(row, columns):
+    # 缺失值与完整路径一致写为空单元格
+    return [None if isinstance(v, float) and math.isnan(v) else v for v in (row.get(c) for c in columns)]
+
+
+def _unify_column(values):
+    """同 pandas 由列表构建列时的类型推断：只含整数、浮点数（或缺失值与整数并存）的列整体为浮点数。"""
+    kinds = {type(v) for v in values}
+    if kinds & {float, type(None)} and kinds <= {int, float, type(None)} and int in kinds:
+        return [None if v is None else float(v) for v in values]
+    return values
+
+
+def _table_rows(rows, cols):
+    columns = [_unify_column(c) for c in zip(*(_values(row, cols) for row in rows))]
+    return list(zip(*columns))
+
+
+def write_feeder_result_lite(output_path, main_rows, branch_rows, summaries, columns=OUTPUT_COLS, fmt=None):
+    """轻量结果写出（xlsx / csv），表结构同 reliability.output.write_feeder_result（parquet / jsonl 由调用方回退到完整路径）。"""
+    fmt = output_format(output_path, fmt)
+    summary_cols = list(summaries[0])
+    if fmt == "xlsx":
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        for title, rows, cols in (("主线分段明细", main_rows, columns), ("分支分段明细", branch_rows, columns),
+                                  ("指标汇总", summaries, summary_cols)):
+            ws = wb.create_sheet(title=title)
+            ws.append(list(cols))
+            for row in rows:
+                ws.append(_values(row, cols))
+        wb.save(output_path)
+        return
+    detail_cols = ["线路类型"] + list(columns)
+    detail = [dict(row, 线路类型=line_type) for line_type, rows in zip(LINE_TYPES, (main_rows, branch_rows)) for row in rows]
+    for table, rows, cols in ((DETAIL_TABLE, detail, detail_cols), ("指标汇总", summaries, summary_cols)):
+        path = table_path(output_path, table, DETAIL_TABLE)
+        if fmt == "csv":
+            with open(path, "w", encoding="utf-8-sig", newline="") as f:
+                # 行尾同 DataFrame.to_csv（\n）
+                writer = csv.writer(f, lineterminator="\n")
+                writer.writerow(cols)
+                writer.writerows(_table_rows(rows, cols))
+        else:
+            raise ValueError(f"轻量路径不支持输出格式: {fmt}")
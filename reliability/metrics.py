@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+网架结构指标：与分段计算同一次读取（联络开关数量、分支类型、末端联络开关 作为附带列随分段表读入），
+逐线路得到原始计数，再按区县用可合并的累加器汇总：
+- 线路联络率 = 有联络的线路数 / 线路数 × 100（段内联络开关数量 > 0 或有末端联络开关）
+- 分段平均挂接数量 = 主线用户数 / 主线分段数
+- 线均中压用户数量 = 总用户数 / 线路数
+- 线均大分支数量 = 大分支数 / 线路数
+- 平均供电半径 = Σ 主线长度 / 线路数（以主干长度近似供电半径）
+"""
+
+import pandas as pd
+
+DEFAULT_METRICS = {
+    "enabled": True,
+    # 附带列：原始列名 → 内部列名；工作簿中缺失时视为空
+    "main": {"段内联络开关数量": "联络开关数量"},
+    "branch": {"分支类型": "分支类型", "末端联络开关": "末端联络开关"},
+    "big_branch": "大分支",
+}
+
+GRID_INDICATORS = ("线路联络率", "分段平均挂接数量", "线均中压用户数量", "线均大分支数量", "平均供电半径")
+
+
+def metrics_config(config):
+    return {**DEFAULT_METRICS, **config.get("metrics", {})}
+
+
+def metric_mappings(config):
+    """需随分段表读入的附带列映射 (主线, 分支)；未启用时为空。"""
+    mcfg = metrics_config(config)
+    if not mcfg["enabled"]:
+        return {}, {}
+    return dict(mcfg["main"]), dict(mcfg["branch"])
+
+
+def feeder_grid_metrics(df_main, df_branch, mcfg):
+    """单条线路的网架原始计数（分段结果或清洗后分段表均可）。"""
+    tie_count = 0.0
+    if "联络开关数量" in df_main:
+        tie_count = float(pd.to_numeric(df_main["联络开关数量"], errors="coerce").fillna(0).sum())
+    end_ties = 0
+    if "末端联络开关" in df_branch:
+        end_ties = int(df_branch["末端联络开关"].map(lambda x: isinstance(x, str) and bool(x.strip())).sum())
+    big = 0
+    if "分支类型" in df_branch:
+        big = int((df_branch["分支类型"].astype(str).str.strip() == mcfg["big_branch"]).sum())
+    main_users = float(df_main["用户数(台)"].sum())
+    return {
+        "主线分段数": len(df_main),
+        "主线用户数": main_users,
+        "总用户数": main_users + float(df_branch["用户数(台)"].sum()),
+        "联络开关数": tie_count + end_ties,
+        "是否联络": bool(tie_count + end_ties > 0),
+        "大分支数": big,
+        "供电半径(km)": float(df_main["长度(km)"].sum()),
+    }
+
+
+class GridAccumulator:
+    """按区县累加网架原始计数；merge 满足结合律，可分片计算后合并。"""
+    __slots__ = ("feeders", "tied", "main_segments", "main_users", "users", "big_branches", "radius")
+
+    def __init__(self):
+        self.feeders = 0
+        self.tied = 0
+        self.main_segments = 0
+        self.main_users = 0.0
+        self.users = 0.0
+        self.big_branches = 0
+        self.radius = 0.0
+
+    def add(self, m):
+        self.feeders += 1
+        self.tied += int(bool(m["是否联络"]))
+        self.main_segments += int(m["主线分段数"])
+        self.main_users += m["主线用户数"]
+        self.users += m["总用户数"]
+        self.big_branches += int(m["大分支数"])
+        self.radius += m["供电半径(km)"]
+        return self
+
+    def merge(self, other):
+        for name in self.__slots__:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        acc = cls()
+        for name in cls.__slots__:
+            setattr(acc, name, data[name])
+        return acc
+
+    def indicators(self):
+        n = self.feeders or 1
+        return {
+            "线路数": self.feeders,
+            "线路联络率": self.tied / n * 100,
+            "分段平均挂接数量": self.main_users / self.main_segments if self.main_segments else 0.0,
+            "线均中压用户数量": self.users / n,
+            "线均大分支数量": self.big_branches / n,
+            "平均供电半径": self.radius / n,
+        }
+
+
+def district_grid_metrics(metrics_df, feeder_district):
+    """
+    逐线路网架计数 → 区县网架指标。
+    metrics_df: 每行一条线路（含 输入文件）；feeder_district: 输入文件 → 区县
+    """
+    accs = {}
+    for row in metrics_df.to_dict("records"):
+        district = feeder_district.get(row["输入文件"])
+        if district is None or district != district:
+            continue
+        accs.setdefault(district, GridAccumulator()).add(row)
+    out = pd.DataFrame.from_dict({d: acc.indicators() for d, acc in accs.items()}, orient="index")
+    out.index.name = "区县"
+    return out
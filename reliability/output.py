@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+结果输出层：按输出文件扩展名或 --format 选择后端，逐表追加写出。
+
+- xlsx：openpyxl 只写（write_only）模式流式写出，每张表一个 Sheet，行写入后即释放，不在内存中保留单元格对象；
+- parquet：列式数据集（需安装 pyarrow），每次追加写为一个行组；
+- csv / jsonl：逐表追加的文本文件，供下游入库。
+xlsx 的各表在同一工作簿内；列式格式每张表一个文件：主表写到输出路径本身，其余表写到 <输出路径去扩展名>_<表名>.<扩展名>。
+单线路列式输出将主线、分支分段明细合并为一张「分段明细」表（以 线路类型 区分），批量列式输出再加 线路名称 / 输入文件 列，
+全部线路写成一个数据集，而不是每条线路一个工作簿。
+"""
+
+import os
+
+FORMATS = {".xlsx": "xlsx", ".parquet": "parquet", ".csv": "csv", ".jsonl": "jsonl"}
+
+DETAIL_TABLE = "分段明细"
+
+
+def output_format(path, fmt=None):
+    """输出格式：显式指定优先，否则按扩展名判断，未知扩展名按 xlsx 输出。"""
+    if fmt is not None:
+        if fmt not in FORMATS.values():
+            raise ValueError(f"未知输出格式: {fmt}，可选 {sorted(set(FORMATS.values()))}")
+        return fmt
+    return FORMATS.get(os.path.splitext(path)[1].lower(), "xlsx")
+
+
+def is_output_file(path):
+    """路径以输出格式扩展名结尾时视为单个输出文件，否则视为输出目录。"""
+    return bool(path) and os.path.splitext(path)[1].lower() in FORMATS
+
+
+def with_format(path, fmt):
+    """将输出路径的扩展名替换为指定格式的扩展名（扩展名已匹配或未指定格式时原样返回）。"""
+    if fmt is None or FORMATS.get(os.path.splitext(path)[1].lower()) == fmt:
+        return path
+    return os.path.splitext(path)[0] + "." + fmt
+
+
+def table_path(path, table, primary):
+    """列式格式下各表的文件路径。"""
+    if table == primary:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_{table}{ext}"
+
+
+class _Writer:
+    fmt = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class XlsxWriter(_Writer):
+    """openpyxl 只写模式：Sheet 按首次写入顺序创建，close 时保存。"""
+
+    fmt = "xlsx"
+
+    def __init__(self, path, primary=None):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.wb = Workbook(write_only=True)
+        self.sheets = {}
+
+    def write(self, table, df):
+        from openpyxl.utils.dataframe import dataframe_to_rows
+
+        ws = self.sheets.get(table)
+        first = ws is None
+        if first:
+            ws = self.sheets[table] = self.wb.create_sheet(title=table)
+        for row in dataframe_to_rows(df, index=False, header=first):
+            ws.append(row)
+
+    def close(self):
+        if not self.sheets:
+            self.wb.create_sheet()
+        self.wb.save(self.path)
+
+
+class _FileWriter(_Writer):
+    """列式格式公共部分：每张表一个文件，首次写入时打开；未指定主表时首次写入的表为主表。"""
+
+    def __init__(self, path, primary=None):
+        self.path = path
+        self.primary = primary
+        self.files = {}
+
+    def _open(self, path):
+        raise NotImplementedError
+
+    def _append(self, handle, df, first):
+        raise NotImplementedError
+
+    def write(self, table, df):
+        handle = self.files.get(table)
+        first = handle is None
+        if first:
+            if self.primary is None:
+                self.primary = table
+            handle = self.files[table] = self._open(table_path(self.path, table, self.primary))
+        self._append(handle, df, first)
+
+    def close(self):
+        for handle in self.files.values():
+            handle.close()
+        self.files.clear()
+
+
+class CsvWriter(_FileWriter):
+    fmt = "csv"
+
+    def _open(self, path):
+        # utf-8-sig：Excel 直接打开不乱码，与区县属性表 csv 读取编码一致
+        return open(path, "w", encoding="utf-8-sig", newline="")
+
+    def _append(self, handle, df, first):
+        df.to_csv(handle, header=first, index=False)
+
+
+class JsonlWriter(_FileWriter):
+    fmt = "jsonl"
+
+    def _open(self, path):
+        return open(path, "w", encoding="utf-8")
+
+    def _append(self, handle, df, first):
+        if len(df):
+            handle.write(df.to_json(orient="records", lines=True, force_ascii=False, double_precision=15).rstrip("\n") + "\n")
+
+
+class _ParquetTable:
+    """单个 parquet 文件：首次写入确定 schema，之后的行组按该 schema 转换。"""
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+
+    def append(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # object 列（分段编号、自动化状态等）各线路取值类型可能不同，统一为字符串，缺失值保持为空
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        if self.writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = pa.Table.from_pandas(df, schema=self.writer.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class ParquetWriter(_FileWriter):
+    fmt = "parquet"
+
+    def __init__(self, path, primary=None):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("parquet 输出需要安装 pyarrow：pip install pyarrow") from None
+        super().__init__(path, primary)
+
+    def _open(self, path):
+        return _ParquetTable(path)
+
+    def _append(self, handle, df, first):
+        handle.append(df)
+
+
+WRITERS = {"xlsx": XlsxWriter, "parquet": ParquetWriter, "csv": CsvWriter, "jsonl": JsonlWriter}
+
+
+def open_writer(path, fmt=None, primary=None):
+    """
+    按格式打开输出写入器，可用作上下文管理器：
+        with open_writer(path, fmt, primary="分段明细") as out:
+            out.write("分段明细", df)
+    primary: 列式格式中写到 path 本身的表；为 None 时取首次写入的表。
+    """
+    return WRITERS[output_format(path, fmt)](path, primary)
+
+
+def segment_detail(df_main_result, df_branch_result, columns, **keys):
+    """主线、分支分段明细合并为一张表（线路类型 列在前，keys 为批量模式附加的 线路名称 / 输入文件）。"""
+    import pandas as pd
+
+    frames = []
+    for line_type, df in (("主线", df_main_result), ("分支", df_branch_result)):
+        part = df[columns].copy()
+        part.insert(0, "线路类型", line_type)
+        frames.append(part)
+    detail = pd.concat(frames, ignore_index=True)
+    for k, (name, value) in enumerate(keys.items()):
+        detail.insert(k, name, value)
+    return detail
+
+
+def write_feeder_result(output_path, df_main_result, df_branch_result, summary_df, columns, fmt=None):
+    """单线路结果：xlsx 为 主线分段明细 / 分支分段明细 / 指标汇总 三个 Sheet，列式格式为 分段明细 + 指标汇总 两张表。"""
+    with open_writer(output_path, fmt, primary=DETAIL_TABLE) as out:
+        if out.fmt == "xlsx":
+            out.write("主线分段明细", df_main_result[columns])
+            out.write("分支分段明细", df_branch_result[columns])
+        else:
+            out.write(DETAIL_TABLE, segment_detail(df_main_result, df_branch_result, columns))
+        out.write("指标汇总", summary_df)
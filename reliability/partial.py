@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+分片计算与部分汇总合并：同一清单按 --shard K/N 分给多台机器（或容器、进程），各自以流式模式计算并保存部分汇总 JSON，
+最后用 --merge 合并为与单机计算相同的逐线路、区县、全省汇总。
+
+部分汇总保存逐线路 / 区县 / 全省的 用户数、长度、故障/预安排次数与 SAIDI/SAIFI×用户数 分子（见 reliability.stream），
+合并只做加法，与分片方式、合并顺序无关（浮点加法顺序不同时末位可能不同，汇总按 6 位小数输出）。
+每个部分汇总记录分片清单：分片编号 / 分片数与全部输入清单（分片前）的摘要；合并时清单不一致、分片重复或缺少分片均报错。
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from reliability.cache import json_digest
+from reliability.stream import PartialSummary
+
+PARTIAL_FORMAT = "reliability-partial-summary"
+PARTIAL_VERSION = 2
+
+
+def parse_shard(text):
+    """'K/N'（K 从 1 开始）→ (K, N)。"""
+    try:
+        k, n = (int(x) for x in str(text).split("/"))
+    except ValueError:
+        raise ValueError(f"分片格式应为 K/N（如 2/8）: {text}") from None
+    if not 1 <= k <= n:
+        raise ValueError(f"分片编号应在 1..{n} 之间: {text}")
+    return k, n
+
+
+def shard_inputs(inputs, shard):
+    """按排序后的下标轮流分配：第 K 片取下标 ≡ K-1 (mod N) 的线路，各片线路数相差不超过 1，与机器无关。"""
+    if shard is None:
+        return list(inputs)
+    k, n = parse_shard(shard)
+    return sorted(inputs)[k - 1::n]
+
+
+def input_digest(inputs):
+    """全部输入清单的摘要：路径取相对于公共目录的部分，各机器数据目录挂载位置不同时摘要仍相同。"""
+    paths = sorted(os.path.abspath(p) for p in inputs)
+    base = os.path.commonpath([os.path.dirname(p) for p in paths]) if paths else ""
+    return json_digest([os.path.relpath(p, base).replace(os.sep, "/") for p in paths])
+
+
+def save_partial(path, partial, shard=None, inputs=()):
+    """
+    写出部分汇总（先写临时文件再原子替换）。
+    inputs: 分片前的全部输入清单，记录其摘要与线路数；shard 为 None 时记为 1/1。
+    """
+    inputs = list(inputs)
+    k, n = parse_shard(shard) if shard else (1, 1)
+    data = {
+        "format": PARTIAL_FORMAT,
+        "version": PARTIAL_VERSION,
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "shard": {"index": k, "count": n, "inputs": len(inputs), "digest": input_digest(inputs)},
+        "inputs": len(shard_inputs(inputs, shard)),
+        "summary": partial.to_dict(),
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load_partial(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("format") != PARTIAL_FORMAT:
+        raise ValueError(f"不是部分汇总文件: {path}")
+    if data.get("version") != PARTIAL_VERSION:
+        raise ValueError(f"部分汇总版本不支持: {data.get('version')}（当前 {PARTIAL_VERSION}）: {path}")
+    return data
+
+
+def merge_partials(paths):
+    """
+    合并同一清单的全部分片。分片数或输入清单摘要不一致、分片重复、缺少分片时报错。
+    返回: (合并后的 PartialSummary, 各文件信息列表 [{文件, 分片, 线路数, 失败数}])
+    """
+    merged = None
+    manifest = None
+    seen = {}
+    shards = []
+    for path in paths:
+        data = load_partial(path)
+        shard = data["shard"]
+        if manifest is None:
+            manifest = shard
+        elif (shard["count"], shard["digest"]) != (manifest["count"], manifest["digest"]):
+            raise ValueError(f"部分汇总不属于同一清单（分片数或输入清单不同）: {path}")
+        label = f"{shard['index']}/{shard['count']}"
+        if shard["index"] in seen:
+            raise ValueError(f"分片 {label} 重复: {seen[shard['index']]}, {path}")
+        seen[shard["index"]] = path
+        partial = PartialSummary.from_dict(data["summary"])
+        shards.append({"文件": path, "分片": label, "线路数": partial.province.feeders, "失败数": len(partial.failures)})
+        merged = partial if merged is None else merged.merge(partial)
+    if merged is None:
+        raise ValueError("未指定部分汇总文件")
+    missing = sorted(set(range(1, manifest["count"] + 1)) - set(seen))
+    if missing:
+        n = manifest["count"]
+        raise ValueError(f"缺少分片: {', '.join(f'{k}/{n}' for k in missing)}")
+    return merged, shards
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+区县可靠性评分（document/可靠性评分细则.xlsx）：
+供电可靠性 0.6、网架结构 0.2、设备水平 0.1、自动化水平 0.1，一级分类得分为其下各指标得分的平均值。
+规则类型（均按区县向量化计算，得分截断到 [0, 100]）：
+- rank_desc / rank_asc：按完成值从大到小 / 从小到大排名，第一名 100，每降一名扣 step（并列取最好名次）；
+- threshold：以 target 为目标，完成值 > knee 时每降低 1 个百分点扣 1 分，≤ knee 部分每百分点扣 2 分；
+- over_target：以 target 为目标，每超过目标 1 个百分点（相对值）扣 1 分；
+- per_unit：基础分 100，每单位扣 penalty；
+- radius：按区域类别上限，每超过 step km 扣 penalty，不足 step 按一档计（如 B 类超过 0.1 km 扣 25 分）；
+- reliability_class：理论可靠性版本，可靠率 ≥ 区域类别门槛得 100，否则 60×(1-(门槛-可靠率)×50/门槛)。
+百分比类指标以百分数（如 95 表示 95%）输入。
+"""
+
+import numpy as np
+import pandas as pd
+
+from reliability.metrics import district_grid_metrics
+
+CATEGORY_WEIGHTS = {"供电可靠性": 0.6, "网架结构": 0.2, "设备水平": 0.1, "自动化水平": 0.1}
+
+RELIABILITY_THRESHOLDS = {"A+": 99.999, "A": 99.99, "B": 99.965, "C": 99.863, "D": 99.726}
+
+# 供电半径：区域类别 → (上限 km, 每超过 step km, 扣分)
+RADIUS_LIMITS = {"A+": (3.0, 0.5, 25.0), "A": (3.0, 0.5, 25.0), "B": (3.0, 0.5, 25.0), "C": (5.0, 1.0, 10.0), "D": (15.0, 1.0, 10.0)}
+
+_GRID_AND_EQUIPMENT = [
+    {"category": "网架结构", "indicator": "线路联络率", "rule": "threshold", "target": 100, "knee": 90},
+    {"category": "网架结构", "indicator": "分段平均挂接数量", "rule": "over_target", "target": 5},
+    {"category": "网架结构", "indicator": "线均中压用户数量", "rule": "over_target", "target": 60},
+    {"category": "网架结构", "indicator": "线均大分支数量", "rule": "per_unit", "penalty": 10},
+    {"category": "网架结构", "indicator": "平均供电半径", "rule": "radius"},
+    {"category": "设备水平", "indicator": "设备运行年限低于20年的占比率", "rule": "threshold", "target": 100, "knee": 90},
+    {"category": "设备水平", "indicator": "百公里跳闸次数", "rule": "rank_asc", "step": 5},
+    {"category": "设备水平", "indicator": "架空线路长度", "rule": "rank_desc", "step": 5},
+    {"category": "设备水平", "indicator": "绝缘化率", "rule": "threshold", "target": 100, "knee": 90},
+    {"category": "设备水平", "indicator": "电缆线路长度", "rule": "rank_desc", "step": 5},
+    {"category": "设备水平", "indicator": "开关类设备数量", "rule": "rank_desc", "step": 5},
+    {"category": "自动化水平", "indicator": "线均终端数量", "rule": "rank_desc", "step": 5},
+    {"category": "自动化水平", "indicator": "联络开关上线率", "rule": "threshold", "target": 100, "knee": 90},
+    {"category": "自动化水平", "indicator": "FA覆盖率", "rule": "threshold", "target": 95, "knee": 90},
+    {"category": "自动化水平", "indicator": "终端在线率", "rule": "threshold", "target": 95, "knee": 90},
+    {"category": "自动化水平", "indicator": "遥控成功率", "rule": "threshold", "target": 95, "knee": 90},
+    {"category": "自动化水平", "indicator": "FA正确动作率", "rule": "threshold", "target": 80, "knee": 70},
+]
+
+# 评分细则两个版本：指标计算版本（可靠率排名）、理论可靠性计算版本（可靠率按区域类别门槛）
+SCORING_VERSIONS = {
+    "rank": [{"category": "供电可靠性", "indicator": "供电可靠率", "rule": "rank_desc", "step": 5}] + _GRID_AND_EQUIPMENT,
+    "theory": [{"category": "供电可靠性", "indicator": "供电可靠率", "rule": "reliability_class"}] + _GRID_AND_EQUIPMENT,
+}
+
+DEFAULT_SCORING = {
+    "version": "rank",
+    "category_weights": CATEGORY_WEIGHTS,
+    # 覆盖或追加规则（按 indicator 匹配），如 {"indicator": "FA覆盖率", "target": 98}
+    "rule_overrides": [],
+    "district_column": "区县",
+    "area_class_column": "区域类别",
+}
+
+
+def scoring_config(config):
+    sc = {**DEFAULT_SCORING, **config.get("scoring", {})}
+    sc["category_weights"] = {**CATEGORY_WEIGHTS, **sc.get("category_weights", {})}
+    return sc
+
+
+def scoring_rules(sc):
+    """当前版本的规则列表，应用 rule_overrides。"""
+    if sc["version"] not in SCORING_VERSIONS:
+        raise KeyError(f"未知评分版本: {sc['version']}，可选 {list(SCORING_VERSIONS)}")
+    rules = [dict(r) for r in SCORING_VERSIONS[sc["version"]]]
+    by_name = {r["indicator"]: r for r in rules}
+    for override in sc["rule_overrides"]:
+        if override["indicator"] in by_name:
+            by_name[override["indicator"]].update(override)
+        else:
+            rules.append(dict(override))
+    return rules
+
+
+def _rank_score(values, step, ascending):
+    """并列取最好名次；缺失值不参与排名，得分为 NaN。"""
+    ranks = pd.Series(values).rank(method="min", ascending=ascending).to_numpy()
+    return 100.0 - step * (ranks - 1)
+
+
+def _threshold_score(values, target, knee):
+    above = np.minimum(target, np.maximum(values, knee))
+    below = np.minimum(values, knee)
+    return 100.0 - (target - above) - 2.0 * (knee - below)
+
+
+def score_indicator(rule, values, area):
+    """
+    单个指标的区县得分。
+    values: 完成值数组；area: 区域类别数组
+    """
+    values = np.asarray(values, dtype=np.float64)
+    kind = rule["rule"]
+    if kind == "rank_desc":
+        score = _rank_score(values, rule.get("step", 5), ascending=False)
+    elif kind == "rank_asc":
+        score = _rank_score(values, rule.get("step", 5), ascending=True)
+    elif kind == "threshold":
+        score = _threshold_score(values, rule["target"], rule.get("knee", rule["target"]))
+    elif kind == "over_target":
+        score = 100.0 - np.maximum(0.0, (values - rule["target"]) / rule["target"] * 100)
+    elif kind == "per_unit":
+        score = 100.0 - rule["penalty"] * values
+    elif kind == "radius":
+        limits = np.array([RADIUS_LIMITS.get(str(a).strip(), RADIUS_LIMITS["D"]) for a in area], dtype=np.float64).reshape(-1, 3)
+        limit, step, penalty = limits[:, 0], limits[:, 1], limits[:, 2]
+        # 超出档数向上取整；先舍入到 9 位小数，避免 0.5 的整数倍因浮点误差多计一档
+        steps = np.ceil(np.round(np.maximum(0.0, values - limit) / step, 9))
+        score = 100.0 - steps * penalty
+    elif kind == "reliability_class":
+        threshold = np.array([RELIABILITY_THRESHOLDS.get(str(a).strip(), np.nan) for a in area], dtype=np.float64)
+        score = np.where(values >= threshold, 100.0, 60 * (1 - (threshold - values) * 50 / threshold))
+    else:
+        raise ValueError(f"未知评分规则: {kind}")
+    score = np.clip(score, 0.0, 100.0)
+    score[np.isnan(values)] = np.nan
+    return score
+
+
+def district_indicators_from_feeders(feeder_summary, feeder_district, constants, metrics_df=None):
+    """
+    由逐线路 calculate_summary 结果（批量「指标汇总」）汇总可直接得到的区县指标：
+    - 供电可靠率：各线路全线路 SAIDI 按用户数加权，(1 - SAIDI / 年供电小时) × 100
+    - 线均中压用户数量：总用户数 / 线路数
+    - 提供 metrics_df（批量逐线路网架计数）时另含 网架结构 各指标，见 reliability.metrics
+    feeder_district: Series，输入文件 → 区县（见 reliability.batch.file_districts）
+    """
+    whole = feeder_summary[feeder_summary["线路类型"] == "全线路"].copy()
+    whole["区县"] = whole["输入文件"].map(feeder_district)
+    whole = whole.dropna(subset=["区县"])
+    users = whole["总用户数(台)"].to_numpy(dtype=np.float64)
+    whole["_时户数"] = whole["SAIDI合计"].to_numpy(dtype=np.float64) * users
+    g = whole.groupby("区县", sort=False)
+    agg = pd.DataFrame({
+        "线路数": g.size(),
+        "总用户数": g["总用户数(台)"].sum(),
+        "_时户数": g["_时户数"].sum(),
+    })
+    saidi = agg["_时户数"] / agg["总用户数"].where(agg["总用户数"] > 0)
+    agg["平均停电时间(h)"] = saidi
+    agg["供电可靠率"] = (1 - saidi / constants["Annual_Power_Hours"]) * 100
+    agg["线均中压用户数量"] = agg["总用户数"] / agg["线路数"]
+    agg = agg.drop(columns="_时户数")
+    if metrics_df is not None and len(metrics_df):
+        grid = district_grid_metrics(metrics_df, feeder_district)
+        agg = agg.join(grid[[c for c in grid.columns if c not in agg.columns]], how="left")
+    return agg
+
+
+def score_districts(districts, rules, category_weights, area_column="区域类别"):
+    """
+    districts: DataFrame，索引为区县，列含各指标完成值与区域类别
+    返回: (得分 DataFrame：各指标得分、一级分类得分、总分、排名；缺失指标列表)
+    """
+    area = districts[area_column].to_numpy() if area_column in districts else np.array(["D"] * len(districts))
+    scores = pd.DataFrame(index=districts.index)
+    missing = []
+    by_category = {}
+    for rule in rules:
+        name = rule["indicator"]
+        if name not in districts:
+            missing.append(name)
+            continue
+        values = pd.to_numeric(districts[name], errors="coerce").to_numpy(dtype=np.float64)
+        col = f"{name}得分"
+        scores[col] = score_indicator(rule, values, area)
+        by_category.setdefault(rule["category"], []).append(col)
+
+    total = np.zeros(len(districts))
+    for category, weight in category_weights.items():
+        cols = by_category.get(category)
+        if not cols:
+            continue
+        cat = scores[cols].mean(axis=1, skipna=True)
+        scores[f"{category}得分"] = cat
+        total = total + weight * cat.fillna(0.0).to_numpy()
+    scores["总分"] = total
+    scores["排名"] = scores["总分"].rank(method="min", ascending=False).astype(np.int64)
+    return scores, missing
+
+
+def load_districts(path, district_column="区县"):
+    """
+    区县属性表：xlsx 的「区县属性」Sheet（或首个 Sheet）/ csv，每行一个区县，含 区域类别 与各指标完成值；
+    可选「线路归属」Sheet（线路名称, 区县）。
+    返回: (区县属性 DataFrame（索引为区县）, 线路名称→区县 Series 或 None)
+    """
+    feeder_district = None
+    if path.lower().endswith(".csv"):
+        districts = pd.read_csv(path, encoding="utf-8-sig")
+    else:
+        xls = pd.ExcelFile(path)
+        sheet = "区县属性" if "区县属性" in xls.sheet_names else xls.sheet_names[0]
+        districts = pd.read_excel(xls, sheet)
+        if "线路归属" in xls.sheet_names:
+            mapping = pd.read_excel(xls, "线路归属")
+            feeder_district = mapping.set_index("线路名称")[district_column]
+    districts[district_column] = districts[district_column].astype(str).str.strip()
+    return districts.set_index(district_column), feeder_district
+
+
+def run_scoring(feeder_summary, districts, feeder_district, constants, sc, metrics_df=None):
+    """
+    合并线路汇总指标与区县属性（属性表中已填的值优先，空缺处取线路汇总值），计算全部区县得分。
+    返回: (区县得分表, 缺失指标列表)
+    """
+    derived = district_indicators_from_feeders(feeder_summary, feeder_district, constants, metrics_df)
+    merged = districts.combine_first(derived)
+    merged = merged[list(districts.columns) + [c for c in derived.columns if c not in districts.columns]]
+    merged.index.name = sc["district_column"]
+    scores, missing = score_districts(merged, scoring_rules(sc), sc["category_weights"], sc["area_class_column"])
+    result = merged.join(scores)
+    return result.sort_values("排名", kind="stable"), missing
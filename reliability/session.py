@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+what-if 会话：由一次 compute_feeder 结果建立内存会话，逐分段修改 自动化状态 / 线路型号 / 用户数 / 长度，
+每次修改 O(1) 更新汇总并返回主线、分支、全线路指标。
+
+SAIDI-F/S、SAIFI-F/S 均为 Σ 分段分子 / 分母（线路总用户数），会话按分组（主线/分支）维护分子之和与用户数之和：
+修改分段时减去旧贡献、加上新贡献，分母随用户数变化同步更新，汇总时再除以分母，与 segment_kernel 结果一致。
+撤销/重做只记录被修改分段的旧值与新值，不复制整张分段表。
+"""
+
+import numpy as np
+import pandas as pd
+
+from main import _parse_laying_cached, combine_summaries, compute_feeder, get_isolation_time, summary_record
+from reliability.kernel import LINE_TYPES, SegmentTable, group_sums, segment_kernel
+
+# 会话维护的各分组累加量：summary_record 所需汇总量 + 按分母折算前的分子
+_SUMS = ("总长度(km)", "总故障次数(次/年)", "总预安排次数(次/年)", "SAIDI-F", "SAIDI-S", "SAIFI-F", "SAIFI-S")
+_FIELDS = ("自动化状态", "敷设方式_原始", "用户数(台)", "长度(km)")
+# 取值不能为负的字段
+_NON_NEGATIVE = ("用户数(台)", "长度(km)")
+
+
+class WhatIfSession:
+    """
+    单条线路 what-if 会话。
+    分段以 (线路类型, 分段编号) 定位，线路类型为 "主线" / "分支"。
+    """
+
+    def __init__(self, df_main, df_branch, constants, max_history=None):
+        self.constants = dict(constants)
+        self.max_history = max_history
+        frames = [df_main, df_branch]
+        self.table = SegmentTable.from_frames(frames)
+        self.status = np.concatenate([df["自动化状态"].to_numpy(dtype=object) for df in frames])
+        self.model = np.concatenate([df["敷设方式_原始"].to_numpy(dtype=object) for df in frames])
+        self.ids = [df["分段编号"].astype(str).str.strip().tolist() for df in frames]
+        self._pos = []
+        for g, ids in enumerate(self.ids):
+            lookup = {}
+            for k, sid in enumerate(ids):
+                lookup.setdefault(sid, int(self.table.offsets[g]) + k)
+            self._pos.append(lookup)
+        self._undo = []
+        self._redo = []
+        self.recompute()
+
+    @classmethod
+    def from_feeder(cls, excel_path, config, cache=None):
+        df_main, df_branch, _ = compute_feeder(excel_path, config, cache)
+        return cls(df_main, df_branch, config["constants"])
+
+    # ---- 累加量 ----
+
+    def recompute(self):
+        """以分段内核全量重建累加量（O(n)），用于初始化或消除长期增量修改的浮点累积误差。"""
+        n_groups = self.table.n_groups
+        self.users_total = np.array([self.table.users[self.table.slice(g)].sum() for g in range(n_groups)])
+        ones = np.ones(n_groups, dtype=np.int64)
+        # 分母取 1 得到未折算的分子之和；用户数为 0 的分组内核结果为 0，与原公式一致
+        sums = group_sums(self.table, segment_kernel(self.table, self.constants, ones))
+        self.sums = np.array([sums[k] for k in _SUMS])
+
+    def _contribution(self, i):
+        """分段 i 对所在分组累加量的贡献（顺序同 _SUMS）。"""
+        c = self.constants
+        t = self.table
+        users = t.users[i]
+        count = t.length[i] * t.fault_rate[i] if users > 0 else 0.0
+        sched = t.length[i] * c["Scheduled_Outage_Rate"] if users > 0 else 0.0
+        return np.array([
+            t.length[i], count, sched,
+            count * (t.isolation_time[i] + c["Cable_Repair_Time"]) * users,
+            sched * c["Scheduled_Total_Time"] * users,
+            count * users, sched * users,
+        ])
+
+    def _group(self, i):
+        return int(np.searchsorted(self.table.offsets, i, side="right") - 1)
+
+    def _locate(self, line_type, seg_id):
+        g = LINE_TYPES.index(line_type)
+        try:
+            return self._pos[g][str(seg_id).strip()]
+        except KeyError:
+            raise KeyError(f"未知分段: {line_type} {seg_id}") from None
+
+    def _values(self, i):
+        return (self.status[i], self.model[i], self.table.users[i], self.table.length[i])
+
+    def _assign(self, i, values):
+        """写入分段字段并 O(1) 更新所在分组累加量与分母。"""
+        g = self._group(i)
+        self.sums[:, g] -= self._contribution(i)
+        self.users_total[g] -= self.table.users[i]
+        status, model, users, length = values
+        if status != self.status[i]:
+            self.status[i] = status
+            self.table.isolation_time[i] = get_isolation_time(status, self.constants)
+        if model != self.model[i]:
+            self.model[i] = model
+            self.table.fault_rate[i] = _parse_laying_cached(str(model), self.constants["Cable_Fault_Rate"], self.constants["Overhead_Fault_Rate"])[2]
+        self.table.users[i] = users
+        self.table.length[i] = length
+        self.sums[:, g] += self._contribution(i)
+        self.users_total[g] += users
+
+    def _apply(self, changes):
+        """changes: [(分段下标, {字段: 新值})]，作为一步记入撤销栈；任一修改无效时整步不生效。"""
+        for i, fields in changes:
+            unknown = set(fields) - set(_FIELDS)
+            if unknown:
+                raise KeyError(f"不支持修改的字段: {sorted(unknown)}，可选 {list(_FIELDS)}")
+            for name in _NON_NEGATIVE:
+                if name in fields and not fields[name] >= 0:
+                    raise ValueError(f"{name} 不能为负: {fields[name]}")
+        step = []
+        for i, fields in changes:
+            old = self._values(i)
+            new = tuple(fields.get(name, v) for name, v in zip(_FIELDS, old))
+            self._assign(i, new)
+            step.append((i, old, new))
+        self._undo.append(step)
+        if self.max_history is not None and len(self._undo) > self.max_history:
+            del self._undo[:len(self._undo) - self.max_history]
+        self._redo.clear()
+        return self.summary()
+
+    # ---- 修改操作 ----
+
+    def update(self, line_type, seg_id, **fields):
+        """修改单个分段字段（自动化状态 / 敷设方式_原始 / 用户数(台) / 长度(km)），返回更新后的指标汇总。"""
+        return self._apply([(self._locate(line_type, seg_id), fields)])
+
+    def update_rows(self, line_type, changes):
+        """按分组内行位置修改多个分段：changes 为 [(位置, {字段: 新值})]，作为一步记入撤销栈。"""
+        base = int(self.table.offsets[LINE_TYPES.index(line_type)])
+        return self._apply([(base + k, fields) for k, fields in changes])
+
+    def set_automation(self, line_type, seg_id, status):
+        return self.update(line_type, seg_id, **{"自动化状态": status})
+
+    def set_line_model(self, line_type, seg_id, line_model):
+        return self.update(line_type, seg_id, **{"敷设方式_原始": line_model})
+
+    def set_users(self, line_type, seg_id, users):
+        return self.update(line_type, seg_id, **{"用户数(台)": float(users)})
+
+    def set_length(self, line_type, seg_id, length):
+        return self.update(line_type, seg_id, **{"长度(km)": float(length)})
+
+    def move_users(self, source, target, users):
+        """在两个分段之间转移用户数；source / target 为 (线路类型, 分段编号)，转移数不能为负或超过源分段用户数。"""
+        i, j = self._locate(*source), self._locate(*target)
+        if not 0 <= users <= self.table.users[i]:
+            raise ValueError(f"转移用户数应在 0～{self.table.users[i]:g} 之间（源分段 {source[1]} 现有用户数）: {users}")
+        if i == j:
+            return self.summary()
+        return self._apply([
+            (i, {"用户数(台)": self.table.users[i] - users}),
+            (j, {"用户数(台)": self.table.users[j] + users}),
+        ])
+
+    def undo(self):
+        if not self._undo:
+            return None
+        step = self._undo.pop()
+        for i, old, _ in reversed(step):
+            self._assign(i, old)
+        self._redo.append(step)
+        return self.summary()
+
+    def redo(self):
+        if not self._redo:
+            return None
+        step = self._redo.pop()
+        for i, _, new in step:
+            self._assign(i, new)
+        self._undo.append(step)
+        return self.summary()
+
+    # ---- 结果 ----
+
+    def summary(self):
+        """当前主线、分支、全线路指标汇总（O(1)），列同 compute_feeder 的指标汇总。"""
+        records = []
+        for g in range(2):
+            total_users = int(self.users_total[g])
+            denom = total_users if total_users > 0 else None
+            sums = {}
+            for k, name in enumerate(_SUMS):
+                value = self.sums[k, g]
+                if name.startswith("SAI"):
+                    value = value / denom if denom else 0.0
+                sums[name] = value
+            records.append(summary_record(LINE_TYPES[g], total_users, sums, self.constants, False))
+        records.append(combine_summaries(records[0], records[1], self.constants))
+        return pd.DataFrame(records)
+
+    def segment(self, line_type, seg_id):
+        """单个分段当前字段值。"""
+        i = self._locate(line_type, seg_id)
+        return dict(zip(_FIELDS, self._values(i)), 故障率=self.table.fault_rate[i], 隔离时间=self.table.isolation_time[i])
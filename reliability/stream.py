@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+流式全省计算：逐条线路计算后立即把分段明细写入输出，主进程只保留可合并的汇总累加器，内存占用不随线路数增长。
+
+累加器按 主线 / 分支 / 全线路 三组保存 用户数、长度、故障次数、预安排次数，以及 SAIDI/SAIFI 乘以用户数后的分子，
+均取自分段结果的 group_sums（未舍入）；指标 = Σ 分子 / Σ 用户数，只在输出汇总行时舍入，
+与 combine_summaries 的全线路用户数加权、区县评分的供电可靠率口径一致。
+线路、区县、全省累加器之间 merge 满足结合律，PartialSummary 因此可在多台机器上分片计算后合并（见 reliability.partial）。
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from main import OUTPUT_COLS, compute_feeder
+from reliability.batch import feeder_name
+from reliability.kernel import LINE_TYPES, RESULT_FIELDS, SegmentTable, group_sums, group_total_users
+from reliability.output import DETAIL_TABLE, segment_detail
+
+GROUPS = LINE_TYPES + ("全线路",)
+
+# 累加量：汇总列 → 是否按用户数加权（加权列累加 group_sums × 用户数）；SAIDI合计 / SAIFI合计 输出时由 -F、-S 相加
+ACC_FIELDS = {
+    "总长度(km)": False,
+    "总用户数(台)": False,
+    "总故障次数(次/年)": False,
+    "总预安排次数(次/年)": False,
+    "SAIDI-F": True,
+    "SAIDI-S": True,
+    "SAIFI-F": True,
+    "SAIFI-S": True,
+}
+
+# 输出列（同 summary_record 的指标汇总列）
+SUMMARY_COLS = list(ACC_FIELDS)[:6] + ["SAIDI合计", "SAIFI-F", "SAIFI-S", "SAIFI合计", "ASAI(%)"]
+
+_ROUND = {"总长度(km)": 4}
+_USERS = list(ACC_FIELDS).index("总用户数(台)")
+_SAIDI = [list(ACC_FIELDS).index("SAIDI-F"), list(ACC_FIELDS).index("SAIDI-S")]
+
+
+class ReliabilityAccumulator:
+    """主线 / 分支 / 全线路三组可靠性汇总量；merge 满足结合律，可分片计算后合并。"""
+    __slots__ = ("feeders", "sums")
+
+    def __init__(self):
+        self.feeders = 0
+        self.sums = np.zeros((len(ACC_FIELDS), len(GROUPS)))
+
+    def add_feeder(self, df_main_result, df_branch_result):
+        """累加一条线路（compute_feeder 返回的主线、分支分段结果）：分段结果按分组求和，不经汇总行的舍入。"""
+        frames = [df_main_result, df_branch_result]
+        table = SegmentTable.from_frames(frames)
+        result = np.vstack([np.concatenate([df[name].to_numpy(dtype=np.float64) for df in frames]) for name in RESULT_FIELDS])
+        sums = group_sums(table, result)
+        users = group_total_users(table).astype(np.float64)
+        for k, (name, weighted) in enumerate(ACC_FIELDS.items()):
+            values = users if name == "总用户数(台)" else sums[name] * users if weighted else sums[name]
+            self.sums[k, :2] += values
+            self.sums[k, 2] += values.sum()
+        self.feeders += 1
+        return self
+
+    def merge(self, other):
+        self.feeders += other.feeders
+        self.sums += other.sums
+        return self
+
+    def to_dict(self):
+        return {"feeders": self.feeders, "fields": list(ACC_FIELDS), "groups": list(GROUPS), "sums": self.sums.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        if data["fields"] != list(ACC_FIELDS) or data["groups"] != list(GROUPS):
+            raise ValueError("累加器字段与当前版本不一致")
+        acc = cls()
+        acc.feeders = data["feeders"]
+        acc.sums = np.array(data["sums"], dtype=np.float64).reshape(len(ACC_FIELDS), len(GROUPS))
+        return acc
+
+    def records(self, constants):
+        """主线 / 分支 / 全线路 三行汇总，列同 compute_feeder 的指标汇总；由未舍入的累加量计算，只在此处舍入。"""
+        records = []
+        for g, line_type in enumerate(GROUPS):
+            users = self.sums[_USERS, g]
+            values = {}
+            for k, (name, weighted) in enumerate(ACC_FIELDS.items()):
+                value = self.sums[k, g]
+                if weighted:
+                    value = value / users if users > 0 else 0.0
+                values[name] = value
+            values["SAIDI合计"] = values["SAIDI-F"] + values["SAIDI-S"]
+            values["SAIFI合计"] = values["SAIFI-F"] + values["SAIFI-S"]
+            if users > 0:
+                theory = users * constants["Annual_Power_Hours"]
+                values["ASAI(%)"] = (theory - self.sums[_SAIDI, g].sum()) / theory * 100
+            else:
+                values["ASAI(%)"] = 100.0
+            record = {"线路类型": line_type}
+            for name in SUMMARY_COLS:
+                value = values[name]
+                record[name] = int(round(value)) if name == "总用户数(台)" else round(value, _ROUND.get(name, 6))
+            records.append(record)
+        return records
+
+
+def feeder_stream_result(excel_path, config, cache=None):
+    """
+    单条线路的分段明细（附 线路名称 / 输入文件）、指标汇总与累加器（可作为 batch.imap_feeders 的工作函数，
+    累加在工作进程内完成，主进程不再持有分段结果）。
+    """
+    df_main_result, df_branch_result, summary_df = compute_feeder(excel_path, config, cache)
+    detail = segment_detail(df_main_result, df_branch_result, OUTPUT_COLS, 线路名称=feeder_name(excel_path), 输入文件=excel_path)
+    return detail, summary_df, ReliabilityAccumulator().add_feeder(df_main_result, df_branch_result)
+
+
+def file_district(excel_path):
+    """线路文件所在目录名作为区县（同批量「区县网架结构」）。"""
+    return os.path.basename(os.path.dirname(os.path.abspath(excel_path)))
+
+
+class PartialSummary:
+    """
+    可合并的部分汇总：区县、全省累加器与失败线路，可选按输入文件保留逐线路累加器（用于合并后输出逐线路汇总、检查重复线路）。
+    to_dict / from_dict 为 JSON 可序列化结构；merge 要求常量相同，同一输入文件出现在两个部分汇总中时报错。
+    """
+
+    def __init__(self, constants, keep_feeders=False):
+        self.constants = dict(constants)
+        self.feeders = {} if keep_feeders else None
+        self.districts = {}
+        self.province = ReliabilityAccumulator()
+        self.failures = []
+
+    def add(self, name, district, excel_path, acc):
+        if self.feeders is not None:
+            if excel_path in self.feeders:
+                raise ValueError(f"线路重复: {excel_path}")
+            self.feeders[excel_path] = (name, district, acc)
+        self.districts.setdefault(district, ReliabilityAccumulator()).merge(acc)
+        self.province.merge(acc)
+
+    def add_failure(self, name, excel_path, error):
+        self.failures.append({"线路名称": name, "输入文件": excel_path, "错误": error})
+
+    def merge(self, other):
+        if other.constants != self.constants:
+            diff = sorted(k for k in set(self.constants) | set(other.constants) if self.constants.get(k) != other.constants.get(k))
+            raise ValueError(f"部分汇总的常量不一致: {diff}")
+        if self.feeders is not None and other.feeders is not None:
+            duplicated = self.feeders.keys() & other.feeders.keys()
+            if duplicated:
+                raise ValueError(f"线路重复（同一分片合并了两次？）: {sorted(duplicated)[:5]}")
+            self.feeders.update(other.feeders)
+        else:
+            self.feeders = None
+        for district, acc in other.districts.items():
+            self.districts.setdefault(district, ReliabilityAccumulator()).merge(acc)
+        self.province.merge(other.province)
+        self.failures.extend(other.failures)
+        return self
+
+    def feeder_summary(self):
+        rows = []
+        for excel_path, (name, district, acc) in (self.feeders or {}).items():
+            for record in acc.records(self.constants):
+                rows.append({"线路名称": name, "区县": district, "输入文件": excel_path, **record})
+        return pd.DataFrame(rows)
+
+    def district_summary(self):
+        rows = []
+        for district, acc in self.districts.items():
+            for record in acc.records(self.constants):
+                rows.append({"区县": district, "线路数": acc.feeders, **record})
+        return pd.DataFrame(rows)
+
+    def province_summary(self):
+        return pd.DataFrame([{"线路数": self.province.feeders, **r} for r in self.province.records(self.constants)])
+
+    def to_dict(self):
+        return {
+            "constants": self.constants,
+            "feeders": None if self.feeders is None else [
+                {"线路名称": name, "区县": district, "输入文件": excel_path, "acc": acc.to_dict()}
+                for excel_path, (name, district, acc) in self.feeders.items()],
+            "districts": {district: acc.to_dict() for district, acc in self.districts.items()},
+            "province": self.province.to_dict(),
+            "failures": self.failures,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        partial = cls(data["constants"], keep_feeders=data["feeders"] is not None)
+        for f in data["feeders"] or []:
+            partial.feeders[f["输入文件"]] = (f["线路名称"], f["区县"], ReliabilityAccumulator.from_dict(f["acc"]))
+        partial.districts = {d: ReliabilityAccumulator.from_dict(acc) for d, acc in data["districts"].items()}
+        partial.province = ReliabilityAccumulator.from_dict(data["province"])
+        partial.failures = list(data["failures"])
+        return partial
+
+
+class StreamAggregator:
+    """
+    流式汇总：逐条线路接收结果，分段明细与线路汇总直接写入 out（open_writer 返回的写入器），
+    只在内存中保留部分汇总（区县与全省累加器；keep_feeders=True 时另含逐线路累加器）。
+    """
+
+    def __init__(self, constants, out, keep_feeders=False):
+        self.out = out
+        self.partial = PartialSummary(constants, keep_feeders)
+
+    def add(self, excel_path, detail, summary_df, acc):
+        """acc: 该线路的累加器（feeder_stream_result 的第三项）；区县取线路文件所在目录名。"""
+        name = feeder_name(excel_path)
+        district = file_district(excel_path)
+        self.partial.add(name, district, excel_path, acc)
+        self.out.write(DETAIL_TABLE, detail)
+        summary_df = summary_df.copy()
+        summary_df.insert(0, "线路名称", name)
+        summary_df.insert(1, "区县", district)
+        summary_df.insert(2, "输入文件", excel_path)
+        self.out.write("指标汇总", summary_df)
+
+    def add_failure(self, excel_path, error):
+        self.partial.add_failure(feeder_name(excel_path), excel_path, error)
+        self.out.write("失败线路", pd.DataFrame([self.partial.failures[-1]]))
+
+    def finish(self):
+        """写出区县汇总与全省汇总（每个区县 / 全省 主线、分支、全线路三行）。"""
+        return write_partial_tables(self.out, self.partial)
+
+
+def write_partial_tables(out, partial):
+    """区县汇总、全省汇总写入 out；返回 (区县汇总, 全省汇总)。"""
+    district_df = partial.district_summary()
+    province_df = partial.province_summary()
+    if len(district_df):
+        out.write("区县汇总", district_df)
+    out.write("全省汇总", province_df)
+    return district_df, province_df
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+参数扫描：一次性评估成千上万组 constants 取值。
+SAIDI/SAIFI 对各常量是分段项之和的线性组合，先按 主线 / 分支 / 全线路 归约出分段矩（与常量无关），
+再对场景向量做广播，单个场景的代价与分段数无关。
+"""
+
+import itertools
+import json
+
+import numpy as np
+import pandas as pd
+
+from main import is_automated, parse_laying_column
+
+CONSTANT_KEYS = (
+    "Cable_Fault_Rate", "Overhead_Fault_Rate", "Auto_Isolation_Time", "Manual_Isolation_Time",
+    "Cable_Repair_Time", "Scheduled_Outage_Rate", "Scheduled_Total_Time", "Annual_Power_Hours",
+)
+
+SWEEP_LINES = ("主线", "分支", "全线路")
+SWEEP_INDICATORS = ("SAIDI-F", "SAIDI-S", "SAIDI合计", "SAIFI-F", "SAIFI-S", "SAIFI合计", "ASAI(%)")
+
+# 分段矩列：电缆×自动化、电缆×非自动化、架空×自动化、架空×非自动化、长度×用户
+_MOMENTS = ("cable_auto", "cable_manual", "overhead_auto", "overhead_manual", "length_users")
+
+
+def _expand_values(values):
+    """取值列表，或 {"start", "stop", "num"} 等间距取值。"""
+    if isinstance(values, dict):
+        return list(np.linspace(values["start"], values["stop"], int(values["num"])))
+    if isinstance(values, (list, tuple)):
+        return list(values)
+    return [values]
+
+
+def build_scenarios(base_constants, spec):
+    """
+    由扫描说明生成场景表，未指定的常量取 base_constants。
+    spec: {"grid": {常量: 取值列表或 {start, stop, num}}, "scenarios": [{常量: 值}, ...]}
+          grid 取笛卡尔积，scenarios 逐条追加；二者均缺省时只有基准场景。
+    """
+    grid = spec.get("grid") or {}
+    for part in [grid] + list(spec.get("scenarios", [])):
+        unknown = [k for k in part if k not in CONSTANT_KEYS]
+        if unknown:
+            raise KeyError(f"未知常量: {unknown}")
+    rows = []
+    if grid:
+        keys = list(grid)
+        for combo in itertools.product(*[_expand_values(grid[k]) for k in keys]):
+            rows.append(dict(zip(keys, combo)))
+    rows.extend(spec.get("scenarios", []))
+    if not rows:
+        rows.append({})
+    table = pd.DataFrame([{**{k: base_constants[k] for k in CONSTANT_KEYS}, **row} for row in rows], columns=list(CONSTANT_KEYS))
+    return table.astype(np.float64)
+
+
+def load_sweep_spec(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def segment_moments(frames, constants):
+    """
+    按 主线 / 分支 / 全线路 归约分段矩（只含有效分段，即用户数>0）。
+    frames: [主线清洗后, 分支清洗后]
+    返回: (矩矩阵 shape=(3, 5)，分母用户数 shape=(3,))
+    """
+    moments = np.zeros((len(SWEEP_LINES), len(_MOMENTS)), dtype=np.float64)
+    users_total = np.zeros(len(SWEEP_LINES), dtype=np.float64)
+    for g, df in enumerate(frames):
+        length = df["长度(km)"].to_numpy(dtype=np.float64)
+        users = df["用户数(台)"].to_numpy(dtype=np.float64)
+        cable_w, overhead_w, _, _ = parse_laying_column(df["敷设方式_原始"], constants)
+        auto = np.fromiter((is_automated(x) for x in df["自动化状态"]), dtype=bool, count=len(df))
+        lu = np.where(users > 0, length * users, 0.0)
+        moments[g] = [
+            (lu * cable_w)[auto].sum(), (lu * cable_w)[~auto].sum(),
+            (lu * overhead_w)[auto].sum(), (lu * overhead_w)[~auto].sum(),
+            lu.sum(),
+        ]
+        users_total[g] = int(users.sum())
+    moments[2] = moments[0] + moments[1]
+    users_total[2] = users_total[0] + users_total[1]
+    return moments, users_total
+
+
+def sweep_indicators(moments, users_total, scenarios):
+    """
+    分段矩 × 场景广播计算指标。
+    返回: DataFrame，每行一个场景，列为常量取值 + <线路类型>_<指标>
+    """
+    sc = {k: scenarios[k].to_numpy(dtype=np.float64)[None, :] for k in CONSTANT_KEYS}
+    m = {name: moments[:, k][:, None] for k, name in enumerate(_MOMENTS)}
+    n = users_total[:, None]
+    denom = np.where(n > 0, n, 1.0)
+
+    cable = m["cable_auto"] + m["cable_manual"]
+    overhead = m["overhead_auto"] + m["overhead_manual"]
+    repair = sc["Cable_Repair_Time"]
+    saidi_f = (
+        sc["Cable_Fault_Rate"] * (sc["Auto_Isolation_Time"] * m["cable_auto"] + sc["Manual_Isolation_Time"] * m["cable_manual"] + repair * cable)
+        + sc["Overhead_Fault_Rate"] * (sc["Auto_Isolation_Time"] * m["overhead_auto"] + sc["Manual_Isolation_Time"] * m["overhead_manual"] + repair * overhead)
+    ) / denom
+    saifi_f = (sc["Cable_Fault_Rate"] * cable + sc["Overhead_Fault_Rate"] * overhead) / denom
+    saifi_s = sc["Scheduled_Outage_Rate"] * m["length_users"] / denom
+    saidi_s = saifi_s * sc["Scheduled_Total_Time"]
+    valid = n > 0
+    saidi_f = np.where(valid, saidi_f, 0.0)
+    saifi_f = np.where(valid, saifi_f, 0.0)
+    saidi_s = np.where(valid, saidi_s, 0.0)
+    saifi_s = np.where(valid, saifi_s, 0.0)
+    saidi = saidi_f + saidi_s
+    saifi = saifi_f + saifi_s
+    asai = np.where(valid, (1.0 - saidi / sc["Annual_Power_Hours"]) * 100, 100.0)
+
+    values = {"SAIDI-F": saidi_f, "SAIDI-S": saidi_s, "SAIDI合计": saidi, "SAIFI-F": saifi_f, "SAIFI-S": saifi_s, "SAIFI合计": saifi, "ASAI(%)": asai}
+    cols = {}
+    for i, line in enumerate(SWEEP_LINES):
+        for ind in SWEEP_INDICATORS:
+            cols[f"{line}_{ind}"] = values[ind][i]
+    out = pd.concat([scenarios, pd.DataFrame(cols, index=scenarios.index)], axis=1)
+    out.index.name = "场景"
+    return out
+
+
+def run_sweep(frames, base_constants, spec):
+    """对一条线路的清洗后分段表执行参数扫描。"""
+    scenarios = build_scenarios(base_constants, spec)
+    moments, users_total = segment_moments(frames, base_constants)
+    return sweep_indicators(moments, users_total, scenarios)
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+联络开关转供：分段故障隔离后，故障点下游若有联络开关且对侧线路容量裕度足够，
+下游用户经联络开关转供，停电时间由 修复时间 缩短为 转供操作时间（按联络开关所在分段自动化状态取值）。
+
+- 联络开关取自 主线「段内联络开关」、分支「末端联络开关」（单元格内可换行列出多个）；
+- 转供负荷 = 下游装机容量(kVA) × load_factor；
+- 对侧裕度 = 对侧线路额定容量 × max_loading_rate − 对侧装机容量 × load_factor；
+- 联络开关 → 对侧线路 由 TieIndex 字典索引，一次扫描全部工作簿后每个开关 O(1) 查找，
+  索引可保存为 JSON 供全省运行复用；对侧不在索引中时按 default_margin_kva 计。
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from main import is_automated
+from reliability.xlsx_reader import read_projected_sheets
+
+DEFAULT_TIE = {
+    "enabled": True,
+    "main_tie_column": "段内联络开关",
+    "branch_tie_column": "末端联络开关",
+    "capacity_column": "装机容量(kVA)",
+    "load_factor": 0.1,
+    "feeder_capacity_kva": 8660,
+    "max_loading_rate": 0.8,
+    "default_margin_kva": 3000,
+    "auto_transfer_time": 0.1,
+    "manual_transfer_time": 1.0,
+    "index": "workspace/tie_index.json",
+    # 单条线路额定容量覆盖：{线路名称: kVA}
+    "feeder_capacity_overrides": {},
+}
+
+
+def tie_config(config):
+    return {**DEFAULT_TIE, **config.get("tie", {})}
+
+
+def split_switches(value):
+    """单元格内换行 / 顿号 / 分号分隔的联络开关名称列表。"""
+    if not isinstance(value, str):
+        return []
+    for sep in ("、", ";", "；"):
+        value = value.replace(sep, "\n")
+    return [s.strip() for s in value.split("\n") if s.strip()]
+
+
+def read_tie_columns(excel_path, config, tie):
+    """
+    读取主线/分支的联络开关与装机容量列（按原始行号，与清洗后分段表的索引对齐）。
+    返回: (主线 DataFrame, 分支 DataFrame)，列为 联络开关 / 装机容量(kVA)
+    """
+    inp = config["input"]
+    main_sheet, branch_sheet = inp["main_sheet"], inp["branch_sheet"]
+    _, frames = read_projected_sheets(excel_path, {
+        main_sheet: [tie["main_tie_column"], tie["capacity_column"]],
+        branch_sheet: [tie["branch_tie_column"], tie["capacity_column"]],
+    })
+    out = []
+    for sheet, col in ((main_sheet, tie["main_tie_column"]), (branch_sheet, tie["branch_tie_column"])):
+        df = frames[sheet].rename(columns={col: "联络开关", tie["capacity_column"]: "装机容量(kVA)"})
+        df["装机容量(kVA)"] = df["装机容量(kVA)"].apply(lambda x: x if isinstance(x, (int, float)) and x == x else 0)
+        out.append(df)
+    return tuple(out)
+
+
+class TieIndex:
+    """联络开关 → 所在线路、线路 → 装机容量 的字典索引。"""
+
+    def __init__(self, switch_feeders=None, feeder_kva=None):
+        self.switch_feeders = switch_feeders or {}
+        self.feeder_kva = feeder_kva or {}
+
+    def add_feeder(self, feeder, switches, installed_kva):
+        self.feeder_kva[feeder] = float(installed_kva)
+        for sw in switches:
+            feeders = self.switch_feeders.setdefault(sw, [])
+            if feeder not in feeders:
+                feeders.append(feeder)
+
+    def opposite(self, switch, feeder):
+        """联络开关对侧线路名称；索引中没有对侧时返回 None。"""
+        for other in self.switch_feeders.get(switch, ()):
+            if other != feeder:
+                return other
+        return None
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"switch_feeders": self.switch_feeders, "feeder_kva": self.feeder_kva}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("switch_feeders"), data.get("feeder_kva"))
+
+
+def _scan_feeder(args):
+    """工作进程内读取单条线路的联络开关；异常（含损坏/无法读取的工作簿）只影响本线路。"""
+    excel_path, config, tie = args
+    from reliability.batch import feeder_name
+
+    try:
+        df_main, df_branch = read_tie_columns(excel_path, config, tie)
+    except Exception as e:
+        return {"ok": False, "path": excel_path, "error": f"{type(e).__name__}: {e}"}
+    switches = [sw for df in (df_main, df_branch) for v in df["联络开关"] for sw in split_switches(v)]
+    installed = float(df_main["装机容量(kVA)"].sum() + df_branch["装机容量(kVA)"].sum())
+    return {"ok": True, "feeder": feeder_name(excel_path), "switches": switches, "installed_kva": installed}
+
+
+def build_tie_index(inputs, config, workers=None):
+    """
+    扫描全部线路工作簿建立联络开关索引（只读联络开关与装机容量两列）。
+    返回: (TieIndex, 失败列表)
+    """
+    tie = tie_config(config)
+    tasks = [(path, config, tie) for path in inputs]
+    if workers is not None and workers <= 1:
+        results = [_scan_feeder(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_scan_feeder, tasks, chunksize=max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))))
+    index = TieIndex()
+    failures = []
+    for res in results:
+        if res["ok"]:
+            index.add_feeder(res["feeder"], res["switches"], res["installed_kva"])
+        else:
+            failures.append(res)
+    return index, failures
+
+
+def load_tie_index(tie, base_dir):
+    """按参数文件 tie.index 加载索引；文件不存在时返回空索引。"""
+    path = tie.get("index")
+    if not path:
+        return TieIndex()
+    if not os.path.isabs(path):
+        path = os.path.join(base_dir, path)
+    return TieIndex.load(path) if os.path.exists(path) else TieIndex()
+
+
+def feeder_margin(index, feeder, tie):
+    """对侧线路可用转供裕度(kVA)。"""
+    if feeder is None or feeder not in index.feeder_kva:
+        return float(tie["default_margin_kva"])
+    capacity = tie["feeder_capacity_overrides"].get(feeder, tie["feeder_capacity_kva"])
+    return capacity * tie["max_loading_rate"] - index.feeder_kva[feeder] * tie["load_factor"]
+
+
+def node_transfer(df_main, df_branch, tie_main, tie_branch, feeder, index, tie):
+    """
+    逐节点（主线分段 + 大分支）整理转供参数，按清洗后分段表的行号对齐。
+    返回: dict
+      load   节点自身转供负荷(kVA)
+      margin 节点内联络开关的最大对侧裕度(kVA)，无联络开关为 -inf
+      time   该联络开关的转供操作时间(h)
+      switch 该联络开关名称 / 对侧线路
+    """
+    loads, margins, times, switches = [], [], [], []
+    for df, ties in ((df_main, tie_main), (df_branch, tie_branch)):
+        aligned = ties.reindex(df.index)
+        for auto, name_cell, kva in zip(df["自动化状态"], aligned["联络开关"], aligned["装机容量(kVA)"]):
+            loads.append((kva if kva == kva else 0.0) * tie["load_factor"])
+            best, best_sw = -np.inf, ""
+            for sw in split_switches(name_cell):
+                other = index.opposite(sw, feeder)
+                m = feeder_margin(index, other, tie)
+                if m > best:
+                    best, best_sw = m, f"{sw} → {other or '未知'}"
+            margins.append(best)
+            times.append(tie["auto_transfer_time"] if is_automated(auto) else tie["manual_transfer_time"])
+            switches.append(best_sw)
+    return {
+        "load": np.asarray(loads, dtype=np.float64),
+        "margin": np.asarray(margins, dtype=np.float64),
+        "time": np.asarray(times, dtype=np.float64),
+        "switch": switches,
+    }
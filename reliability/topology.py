@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+拓扑 FMEA：由设备级 主线（2）/分支（2） 的设备父节点建立线路树，计算考虑上下游影响的 SAIDI/SAIFI。
+
+建树（分段粒度）：
+- 主线分段 ↔ 主线（2） 同名「分段k」；大分支按出现顺序 ↔ 分支 Sheet 各行；
+- 小分支不在 分支 Sheet 中、其用户已计入所挂主线分段，并入其上级节点；
+- 每个设备分段的首个设备的「设备父节点」确定上级分段：先在主线设备、再在分支设备中查找，
+  名称重复时取本分段之前最近的出现位置；无法定位的主线分段挂在前一分段，分支挂在首段。
+
+故障模式（分段 j 故障，年故障次数 λj = 长度×故障率，与用户数无关）：
+- j 及其下游用户：停电 隔离时间j + Cable_Repair_Time；
+- 同一保护范围内的其余（上游/旁路）用户：停电 隔离时间j；
+- 保护范围：分支首端有开关保护（branch_protection）时为该分支子树，否则为全线路。
+预安排停电影响 j 及其下游用户。
+联络开关转供（可选，见 reliability.tie）：j 的子节点 c 的子树内若有联络开关、且对侧裕度不小于 c 子树转供负荷，
+则 c 子树用户停电 隔离时间j + 转供操作时间（不超过修复时间）。
+
+按祖先前缀和计算每个节点用户的年停电时间 h_i = Σ_{j∈祖先(i)} (λj·R + Wj)，
+Wj 为以 j 为保护范围根的所有故障 λ·隔离时间 之和；按树深度分层向量化，整体线性复杂度。
+"""
+
+import numpy as np
+import pandas as pd
+
+from main import combine_summaries, summary_record
+from reliability.kernel import LINE_TYPES
+from reliability.xlsx_reader import read_projected_sheets
+
+DEFAULT_TOPOLOGY = {
+    "main_device_sheet": "主线（2）",
+    "branch_device_sheet": "分支（2）",
+    "branch_protection": True,
+}
+
+BIG_BRANCH = "大分支"
+
+
+def topology_config(config):
+    return {**DEFAULT_TOPOLOGY, **config.get("topology", {})}
+
+
+def _device_segments(df, has_type):
+    """按「线路分段」表头行切分设备分段，返回 [{name, type, head_parent, devices}]。"""
+    segs = []
+    names = df["线路分段"].tolist()
+    devs = df["设备名称"].tolist()
+    parents = df["设备父节点"].tolist()
+    types = df["分支类型"].tolist() if has_type else [None] * len(df)
+    for name, dev, parent, typ in zip(names, devs, parents, types):
+        if isinstance(name, str) and name.strip():
+            segs.append({"name": name.strip(), "type": typ, "head_parent": None, "devices": []})
+            continue
+        if not segs or not isinstance(dev, str):
+            continue
+        seg = segs[-1]
+        if not seg["devices"] and isinstance(parent, str):
+            seg["head_parent"] = parent.strip()
+        seg["devices"].append(dev.strip())
+    return segs
+
+
+def read_device_segments(excel_path, topo):
+    _, frames = read_projected_sheets(excel_path, {
+        topo["main_device_sheet"]: ["线路分段", "设备名称", "设备父节点"],
+        topo["branch_device_sheet"]: ["线路分段", "分支类型", "设备名称", "设备父节点"],
+    })
+    return (_device_segments(frames[topo["main_device_sheet"]], False),
+            _device_segments(frames[topo["branch_device_sheet"]], True))
+
+
+def build_tree(df_main, df_branch, main_segs, branch_segs):
+    """
+    建立节点（主线分段 + 大分支）上级关系。
+    返回: (parent 数组，-1 为根；未能由设备定位上级的节点数)
+    """
+    n_main = len(df_main)
+    n = n_main + len(df_branch)
+    main_node = {str(sid): k for k, sid in enumerate(df_main["分段编号"])}
+    # 分支 Sheet 行号 → 节点；清洗后的 DataFrame 保留原始行号
+    branch_row_node = {int(idx): n_main + k for k, idx in enumerate(df_branch.index)}
+
+    # 设备分段 → 节点（小分支为 None）
+    main_seg_node = [main_node.get(s["name"]) for s in main_segs]
+    branch_seg_node = []
+    big = 0
+    for s in branch_segs:
+        if s["type"] == BIG_BRANCH:
+            branch_seg_node.append(branch_row_node.get(big))
+            big += 1
+        else:
+            branch_seg_node.append(None)
+
+    # 设备名 → 出现过的设备分段（通用名称如「站外-电缆终端头」会重复出现）
+    main_dev_occ = {}
+    for k, s in enumerate(main_segs):
+        for d in s["devices"]:
+            main_dev_occ.setdefault(d, []).append(k)
+    branch_dev_occ = {}
+    for k, s in enumerate(branch_segs):
+        for d in s["devices"]:
+            branch_dev_occ.setdefault(d, []).append(k)
+
+    def nearest(occ, kind, k, same):
+        """优先取当前分段之前最近的出现位置，否则取最后一次出现。"""
+        occ = [j for j in occ if not (same and j == k)]
+        if not occ:
+            return None
+        before = [j for j in occ if j < k] if same else []
+        return (kind, before[-1] if before else occ[-1])
+
+    def resolve(kind, k):
+        """设备分段首设备父节点所在的设备分段：先查主线，再查分支。"""
+        seg = (main_segs if kind == "m" else branch_segs)[k]
+        name = seg["head_parent"]
+        if name is None:
+            return None
+        return (nearest(main_dev_occ.get(name, []), "m", k, kind == "m")
+                or nearest(branch_dev_occ.get(name, []), "b", k, kind == "b"))
+
+    def node_of(ref):
+        kind, k = ref
+        return main_seg_node[k] if kind == "m" else branch_seg_node[k]
+
+    def parent_node(ref):
+        """沿设备分段上溯，直到遇到已建模节点（跳过小分支），防环。"""
+        seen = {ref}
+        cur = resolve(*ref)
+        while cur is not None and cur not in seen:
+            nd = node_of(cur)
+            if nd is not None:
+                return nd
+            seen.add(cur)
+            cur = resolve(*cur)
+        return None
+
+    # -2 表示尚未定位
+    parent = np.full(n, -2, dtype=np.int64)
+    for kind, seg_nodes in (("m", main_seg_node), ("b", branch_seg_node)):
+        for k, nd in enumerate(seg_nodes):
+            if nd is None:
+                continue
+            if nd == 0:
+                parent[nd] = -1
+                continue
+            p = parent_node((kind, k))
+            if p is not None:
+                parent[nd] = p
+    unresolved = int((parent == -2).sum())
+    for nd in range(n):
+        if parent[nd] == -2:
+            parent[nd] = -1 if nd == 0 else (nd - 1 if nd < n_main else 0)
+    parent[parent == np.arange(n)] = -1
+    return parent, unresolved
+
+
+def _levels(parent):
+    """按深度分层（根为第 0 层），无法到达根的环上节点并入根层。"""
+    n = len(parent)
+    children = [[] for _ in range(n)]
+    roots = []
+    for i, p in enumerate(parent):
+        if p < 0:
+            roots.append(i)
+        else:
+            children[p].append(i)
+    levels = []
+    seen = np.zeros(n, dtype=bool)
+    cur = roots
+    while cur:
+        arr = np.asarray(cur, dtype=np.int64)
+        seen[arr] = True
+        levels.append(arr)
+        cur = [c for i in cur for c in children[i] if not seen[c]]
+    if not seen.all():
+        orphan = np.flatnonzero(~seen)
+        parent[orphan] = -1
+        levels[0] = np.concatenate([levels[0], orphan]) if levels else orphan
+        return _levels(parent)
+    return levels
+
+
+def _prefix_down(levels, parent, values):
+    """祖先（含自身）前缀和。"""
+    acc = np.asarray(values, dtype=np.float64).copy()
+    for lv in levels[1:]:
+        acc[lv] += acc[parent[lv]]
+    return acc
+
+
+def _sum_up(levels, parent, values):
+    """子树（含自身）求和。"""
+    acc = np.asarray(values, dtype=np.float64).copy()
+    for lv in reversed(levels[1:]):
+        np.add.at(acc, parent[lv], acc[lv])
+    return acc
+
+
+def _best_up(levels, parent, margin, time):
+    """子树内最大裕度的联络开关（裕度相同取操作时间短者）。"""
+    m = np.asarray(margin, dtype=np.float64).copy()
+    t = np.asarray(time, dtype=np.float64).copy()
+    t[np.isneginf(m)] = np.inf
+    for lv in reversed(levels[1:]):
+        p = parent[lv]
+        old = m[p].copy()
+        np.maximum.at(m, p, m[lv])
+        raised = p[m[p] > old]
+        t[raised] = np.inf
+        cand = m[lv] == m[p]
+        np.minimum.at(t, p[cand], t[lv][cand])
+    return m, t
+
+
+def topology_fmea(df_main, df_branch, parent, constants, branch_protection=True, transfer=None):
+    """
+    线性复杂度 FMEA。
+    df_main / df_branch: 已含 故障率、隔离时间 列的分段表（compute_feeder 的分段结果）
+    transfer: 可选 reliability.tie.node_transfer 的节点转供参数
+    返回: (分段明细 DataFrame, 指标汇总 DataFrame)，汇总格式同 calculate_summary
+    """
+    frames = [df_main, df_branch]
+    length = np.concatenate([df["长度(km)"].to_numpy(dtype=np.float64) for df in frames])
+    users = np.concatenate([df["用户数(台)"].to_numpy(dtype=np.float64) for df in frames])
+    rate = np.concatenate([df["故障率"].to_numpy(dtype=np.float64) for df in frames])
+    iso = np.concatenate([df["隔离时间"].to_numpy(dtype=np.float64) for df in frames])
+    is_branch = np.repeat([False, True], [len(df_main), len(df_branch)])
+    n = len(length)
+    repair = constants["Cable_Repair_Time"]
+
+    parent = parent.copy()
+    levels = _levels(parent)
+    lam = length * rate
+    lam_s = length * constants["Scheduled_Outage_Rate"]
+
+    # 保护范围根：自身为根或（启用时）为分支首端，否则继承上级
+    zone_root = np.arange(n)
+    protective = (parent < 0) | (is_branch if branch_protection else np.zeros(n, dtype=bool))
+    for lv in levels[1:]:
+        inherit = lv[~protective[lv]]
+        zone_root[inherit] = zone_root[parent[inherit]]
+
+    users_sub = _sum_up(levels, parent, users)
+    users_zone = users_sub[zone_root]
+    child = np.flatnonzero(parent >= 0)
+
+    # 上级故障时本节点子树的恢复时间：可转供取转供操作时间，否则修复时间
+    restore = np.full(n, float(repair))
+    if transfer is not None:
+        load_sub = _sum_up(levels, parent, transfer["load"])
+        margin_sub, time_sub = _best_up(levels, parent, transfer["margin"], transfer["time"])
+        transferable = (parent >= 0) & (margin_sub >= load_sub)
+        restore[transferable] = np.minimum(time_sub[transferable], repair)
+    else:
+        transferable = np.zeros(n, dtype=bool)
+    # h_i = λi·R + Σ_{c∈祖先(i)∪{i}, c 非根} λ_{parent(c)}·restore_c + Σ_{j∈祖先(i)} Wj
+    step = np.zeros(n)
+    step[child] = lam[parent[child]] * restore[child]
+    w_iso = np.bincount(zone_root, weights=lam * iso, minlength=n)
+    w_cnt = np.bincount(zone_root, weights=lam, minlength=n)
+    hours_f = lam * repair + _prefix_down(levels, parent, step + w_iso)
+    count_f = _prefix_down(levels, parent, w_cnt)
+    count_s = _prefix_down(levels, parent, lam_s)
+    hours_s = count_s * constants["Scheduled_Total_Time"]
+
+    # 故障点影响：自身用户 修复+隔离，下游各子树 恢复+隔离，其余范围内用户仅隔离
+    saved = np.bincount(parent[child], weights=users_sub[child] * (restore[child] - repair), minlength=n)
+    fault_hours = lam * (users_sub * (iso + repair) + saved + (users_zone - users_sub) * iso)
+
+    ids = np.concatenate([df["分段编号"].astype(str).to_numpy() for df in frames])
+    line = np.where(is_branch, LINE_TYPES[1], LINE_TYPES[0])
+    detail = pd.DataFrame({
+        "分段编号": ids,
+        "线路类型": line,
+        "上级分段": [f"{line[p]}{ids[p]}" if p >= 0 else "" for p in parent],
+        "长度(km)": length,
+        "用户数(台)": users,
+        "故障率": rate,
+        "隔离时间": iso,
+        "故障次数(次/年)": lam,
+        "下游用户数(台)": users_sub,
+        "影响用户数(台)": users_zone,
+        "可转供": transferable,
+        "转供恢复时间(h)": np.where(parent >= 0, restore, np.nan),
+        "故障停电时户数(时户/年)": fault_hours,
+        "用户年故障停电时间(h)": hours_f,
+        "用户年故障停电次数": count_f,
+        "用户年预安排停电时间(h)": hours_s,
+        "用户年预安排停电次数": count_s,
+    })
+    if transfer is not None:
+        detail.insert(detail.columns.get_loc("可转供"), "联络开关", transfer["switch"])
+    records = []
+    for line_type, mask in ((LINE_TYPES[0], ~is_branch), (LINE_TYPES[1], is_branch)):
+        n_users = int(users[mask].sum())
+        denom = n_users if n_users > 0 else 1
+        sums = {
+            "总长度(km)": length[mask].sum(),
+            "总故障次数(次/年)": lam[mask].sum(),
+            "总预安排次数(次/年)": lam_s[mask].sum(),
+            "SAIDI-F": (users[mask] * hours_f[mask]).sum() / denom,
+            "SAIDI-S": (users[mask] * hours_s[mask]).sum() / denom,
+            "SAIFI-F": (users[mask] * count_f[mask]).sum() / denom,
+            "SAIFI-S": (users[mask] * count_s[mask]).sum() / denom,
+        }
+        records.append(summary_record(line_type, n_users, sums, constants, False))
+    records.append(combine_summaries(records[0], records[1], constants))
+    return detail, pd.DataFrame(records)
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+结果仓库：SQLite 持久保存每次运行的逐线路汇总与逐分段结果，跨运行查询。
+
+表结构：
+- run：每次运行一行（开始/结束时间、模式、输入、常量 JSON、成功/失败线路数）；
+- feeder：输入文件（绝对路径）→ 线路名称、区县（线路文件所在目录名）；不同区县目录下的同名线路为不同线路；
+- summary：运行 × 线路 × 线路类型（主线 / 分支 / 全线路）的指标汇总，含该次运行时线路所属区县；
+- segment：运行 × 线路的分段结果（列同输出的分段明细）。
+索引：run(开始时间)、feeder(线路名称)、feeder(区县)、summary(线路, 运行)、summary(运行, 区县)、segment(运行, 线路)。
+
+写入实现 reliability.output 写入器的 write(表名, DataFrame) 接口，批量模式各线路结果到达即写入：
+整个运行一个事务，分段行缓冲到 batch_rows 行后 executemany 一次，运行失败时回滚，不留下半个运行。
+汇总行为普通 INSERT：同一运行中同一输入文件写入两次时报 sqlite3.IntegrityError，不静默覆盖。
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from main import OUTPUT_COLS
+
+DEFAULT_WAREHOUSE = {
+    "path": "workspace/result/results.sqlite",
+    # 分段行缓冲行数，达到后批量写入一次
+    "batch_rows": 5000,
+    # 查询默认值
+    "metric": "SAIDI合计",
+    "top": 20,
+}
+
+SUMMARY_COLS = [
+    "总长度(km)", "总用户数(台)", "总故障次数(次/年)", "总预安排次数(次/年)",
+    "SAIDI-F", "SAIDI-S", "SAIDI合计", "SAIFI-F", "SAIFI-S", "SAIFI合计", "ASAI(%)",
+]
+
+# 越大越好的指标（供电可靠率）：最差为最小值、下降为恶化；其余指标越大越差
+HIGHER_IS_BETTER = {"ASAI(%)"}
+
+
+def worse_first(metric):
+    """按“最差 / 恶化在前”排序时的 SQL 方向。"""
+    return "ASC" if metric in HIGHER_IS_BETTER else "DESC"
+
+
+SEGMENT_COLS = OUTPUT_COLS
+
+# 自动化状态 不声明类型，保留输入中的布尔值或文字
+_TEXT_COLS = {"分段编号": "TEXT", "敷设方式描述": "TEXT", "自动化状态": ""}
+
+QUERIES = ("runs", "worst", "delta", "district")
+
+
+def warehouse_config(config):
+    return {**DEFAULT_WAREHOUSE, **config.get("warehouse", {})}
+
+
+def warehouse_path(wc, base_dir):
+    path = wc["path"]
+    return path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+def _q(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _columns(cols):
+    return ", ".join(f"{_q(c)} {_TEXT_COLS.get(c, 'REAL')}".rstrip() for c in cols)
+
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS run (
+    run_id INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    mode TEXT,
+    source TEXT,
+    label TEXT,
+    constants TEXT,
+    feeders INTEGER,
+    failures INTEGER
+);
+CREATE TABLE IF NOT EXISTS feeder (
+    feeder_id INTEGER PRIMARY KEY,
+    input_file TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    district TEXT
+);
+CREATE TABLE IF NOT EXISTS summary (
+    run_id INTEGER NOT NULL REFERENCES run(run_id) ON DELETE CASCADE,
+    feeder_id INTEGER NOT NULL REFERENCES feeder(feeder_id),
+    line_type TEXT NOT NULL,
+    district TEXT,
+    {_columns(SUMMARY_COLS)},
+    PRIMARY KEY (run_id, feeder_id, line_type)
+);
+CREATE TABLE IF NOT EXISTS segment (
+    run_id INTEGER NOT NULL REFERENCES run(run_id) ON DELETE CASCADE,
+    feeder_id INTEGER NOT NULL REFERENCES feeder(feeder_id),
+    line_type TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    {_columns(SEGMENT_COLS)}
+);
+CREATE INDEX IF NOT EXISTS idx_run_started ON run(started_at);
+CREATE INDEX IF NOT EXISTS idx_feeder_name ON feeder(name);
+CREATE INDEX IF NOT EXISTS idx_feeder_district ON feeder(district);
+CREATE INDEX IF NOT EXISTS idx_summary_feeder ON summary(feeder_id, run_id);
+CREATE INDEX IF NOT EXISTS idx_summary_district ON summary(run_id, district);
+CREATE INDEX IF NOT EXISTS idx_segment_run ON segment(run_id, feeder_id);
+"""
+
+
+def _now():
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _district(input_file):
+    return os.path.basename(os.path.dirname(input_file))
+
+
+class Warehouse:
+    """
+    SQLite 结果仓库。写入一次运行：
+        with Warehouse(path) as wh:
+            wh.begin_run("batch", spec, constants)
+            wh.write("分段明细", detail)   # 列含 线路名称 / 输入文件 / 线路类型 + 分段明细列
+            wh.write("指标汇总", summary)  # 列含 线路名称 / 输入文件 / 线路类型 + 汇总列
+            wh.finish_run(feeders, failures)
+    线路以输入文件的绝对路径标识，区县取其所在目录名。
+    其他表名（网架结构、失败线路等）忽略，便于与输出写入器共用同一调用。
+    """
+
+    def __init__(self, path, batch_rows=DEFAULT_WAREHOUSE["batch_rows"]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.batch_rows = batch_rows
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self.run_id = None
+        self._feeders = {}
+        self._segments = []
+        self._insert_segment = (
+            f"INSERT INTO segment (run_id, feeder_id, line_type, seq, {', '.join(_q(c) for c in SEGMENT_COLS)}) "
+            f"VALUES ({', '.join('?' * (len(SEGMENT_COLS) + 4))})"
+        )
+        self._insert_summary = (
+            f"INSERT INTO summary (run_id, feeder_id, line_type, district, {', '.join(_q(c) for c in SUMMARY_COLS)}) "
+            f"VALUES ({', '.join('?' * (len(SUMMARY_COLS) + 4))})"
+        )
+
+    # ---- 写入 ----
+
+    def begin_run(self, mode, source, constants, label=None):
+        self.conn.execute("BEGIN")
+        cur = self.conn.execute(
+            "INSERT INTO run (started_at, mode, source, label, constants) VALUES (?, ?, ?, ?, ?)",
+            (_now(), mode, source, label, json.dumps(constants, ensure_ascii=False, sort_keys=True)))
+        self.run_id = cur.lastrowid
+        return self.run_id
+
+    def _feeder_ids(self, names, files):
+        """输入文件（绝对路径）→ feeder_id；仓库中尚无的输入文件插入新线路。"""
+        new = {}
+        for name, path in zip(names, files):
+            if path not in self._feeders and path not in new:
+                new[path] = name
+        if new:
+            marks = ", ".join("?" * len(new))
+            self._feeders.update(self.conn.execute(
+                f"SELECT input_file, feeder_id FROM feeder WHERE input_file IN ({marks})", list(new)).fetchall())
+            missing = [(path, name, _district(path)) for path, name in new.items() if path not in self._feeders]
+            for row in missing:
+                self._feeders[row[0]] = self.conn.execute(
+                    "INSERT INTO feeder (input_file, name, district) VALUES (?, ?, ?)", row).lastrowid
+        return [self._feeders[path] for path in files]
+
+    def write(self, table, df):
+        if self.run_id is None:
+            raise RuntimeError("写入前需先调用 begin_run")
+        if not len(df) or table not in ("分段明细", "指标汇总"):
+            return
+        names = df["线路名称"].tolist()
+        files = [os.path.abspath(path) for path in df["输入文件"].tolist()]
+        ids = self._feeder_ids(names, files)
+        if table == "指标汇总":
+            values = [df[c].tolist() for c in SUMMARY_COLS]
+            districts = [_district(path) for path in files]
+            self.conn.executemany(self._insert_summary, [
+                (self.run_id, fid, lt, d, *row) for fid, lt, d, row in zip(ids, df["线路类型"].tolist(), districts, zip(*values))])
+            return
+        # 分段序号：同一线路、同一线路类型内的行顺序
+        types = df["线路类型"].tolist()
+        counters = {}
+        rows = df[SEGMENT_COLS].to_numpy(dtype=object).tolist()
+        for fid, name, lt, row in zip(ids, names, types, rows):
+            k = counters.get((name, lt), 0)
+            counters[(name, lt)] = k + 1
+            self._segments.append((self.run_id, fid, lt, k, *row))
+        if len(self._segments) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if self._segments:
+            self.conn.executemany(self._insert_segment, self._segments)
+            self._segments.clear()
+
+    def finish_run(self, feeders=None, failures=None):
+        """写入缓冲行、记录结束时间并提交事务。"""
+        self.flush()
+        self.conn.execute("UPDATE run SET finished_at = ?, feeders = ?, failures = ? WHERE run_id = ?",
+                          (_now(), feeders, failures, self.run_id))
+        self.conn.execute("COMMIT")
+        run_id, self.run_id = self.run_id, None
+        return run_id
+
+    def close(self):
+        if self.conn.in_transaction:
+            self.conn.execute("ROLLBACK")
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # ---- 查询 ----
+
+    def _read(self, sql, params=()):
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def runs(self):
+        return self._read("SELECT * FROM run ORDER BY started_at DESC, run_id DESC")
+
+    def latest_runs(self, n=1):
+        rows = self.conn.execute(
+            "SELECT run_id FROM run WHERE finished_at IS NOT NULL ORDER BY started_at DESC, run_id DESC LIMIT ?", (n,)).fetchall()
+        if len(rows) < n:
+            raise ValueError(f"结果仓库中已完成的运行不足 {n} 次: {self.path}")
+        return [r[0] for r in rows][::-1]
+
+    def _check_metric(self, metric):
+        if metric not in SUMMARY_COLS:
+            raise KeyError(f"未知指标: {metric}，可选 {SUMMARY_COLS}")
+
+    def worst(self, run_id=None, metric=DEFAULT_WAREHOUSE["metric"], top=DEFAULT_WAREHOUSE["top"]):
+        """指定运行（缺省为最近一次）全线路指标最差的前 top 条线路（ASAI 取最低，其余取最高）。"""
+        self._check_metric(metric)
+        run_id = self.latest_runs(1)[0] if run_id is None else run_id
+        cols = ", ".join(f"s.{_q(c)}" for c in SUMMARY_COLS)
+        return self._read(
+            f"SELECT f.name AS 线路名称, s.district AS 区县, {cols} FROM summary s JOIN feeder f USING (feeder_id) "
+            f"WHERE s.run_id = ? AND s.line_type = '全线路' ORDER BY s.{_q(metric)} {worse_first(metric)} LIMIT ?", (run_id, top))
+
+    def delta(self, run_a=None, run_b=None, metric=DEFAULT_WAREHOUSE["metric"], top=None):
+        """两次运行之间各线路全线路指标变化（B − A），恶化最多的在前（ASAI 按下降幅度，其余按上升幅度）；缺省为最近两次运行。"""
+        self._check_metric(metric)
+        if run_a is None or run_b is None:
+            run_a, run_b = self.latest_runs(2)
+        m = _q(metric)
+        sql = (
+            f"SELECT f.name AS 线路名称, b.district AS 区县, a.{m} AS 运行A, b.{m} AS 运行B, b.{m} - a.{m} AS 变化, "
+            f"CASE WHEN a.{m} != 0 THEN (b.{m} - a.{m}) / a.{m} END AS 变化率 "
+            f"FROM summary a JOIN summary b ON b.feeder_id = a.feeder_id AND b.line_type = a.line_type "
+            f"JOIN feeder f ON f.feeder_id = a.feeder_id "
+            f"WHERE a.run_id = ? AND b.run_id = ? AND a.line_type = '全线路' ORDER BY 变化 {worse_first(metric)}"
+        )
+        params = (run_a, run_b)
+        if top:
+            sql += " LIMIT ?"
+            params += (top,)
+        df = self._read(sql, params)
+        return df.rename(columns={"运行A": f"{metric}(运行{run_a})", "运行B": f"{metric}(运行{run_b})"})
+
+    def districts(self, run_id=None):
+        """指定运行的区县汇总：SAIDI、SAIFI 按用户数加权（同区县评分的供电可靠率口径）。"""
+        run_id = self.latest_runs(1)[0] if run_id is None else run_id
+        users = _q("总用户数(台)")
+        return self._read(
+            f"SELECT s.district AS 区县, COUNT(*) AS 线路数, SUM(s.{users}) AS 总用户数, "
+            f"SUM(s.{_q('SAIDI合计')} * s.{users}) AS 时户数, "
+            f"SUM(s.{_q('SAIDI合计')} * s.{users}) / NULLIF(SUM(s.{users}), 0) AS SAIDI合计, "
+            f"SUM(s.{_q('SAIFI合计')} * s.{users}) / NULLIF(SUM(s.{users}), 0) AS SAIFI合计, "
+            f"SUM(s.{_q('总长度(km)')}) AS 总长度 "
+            f"FROM summary s WHERE s.run_id = ? AND s.line_type = '全线路' "
+            f"GROUP BY s.district ORDER BY SAIDI合计 DESC", (run_id,))
+
+    def query(self, kind, runs=None, metric=DEFAULT_WAREHOUSE["metric"], top=DEFAULT_WAREHOUSE["top"]):
+        """命令行查询入口：kind 为 runs / worst / delta / district，runs 为运行编号列表。"""
+        runs = list(runs or [])
+        if kind == "runs":
+            return self.runs()
+        if kind == "worst":
+            return self.worst(runs[0] if runs else None, metric, top)
+        if kind == "delta":
+            if len(runs) not in (0, 2):
+                raise ValueError("delta 查询需指定两个运行编号，或缺省为最近两次运行")
+            return self.delta(*(runs or [None, None]), metric=metric, top=top)
+        if kind == "district":
+            return self.districts(runs[0] if runs else None)
+        raise ValueError(f"未知查询: {kind}，可选 {list(QUERIES)}")
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+监视模式：轮询输入工作簿（文件 / 目录 / 通配符 / 清单），保存后只重算变化的分段。
+
+- 以 (修改时间, 文件大小) 判断工作簿是否变化，未变化的工作簿不读取；
+- 变化的工作簿重新读取清洗后，按映射字段计算逐行指纹（哈希），与上次解析结果对比得到变化行；
+- 变化行重新解析敷设方式、隔离时间并由分段内核只计算这些行；分组用户数（分母）变化时该分组分段指标整体重算；
+- 汇总由 WhatIfSession 增量更新；行数变化（增删行）时整条线路重算。
+工作簿保存过程中读取失败时保留上次状态，文件再次变化后重试。
+"""
+
+import os
+import time
+
+import pandas as pd
+
+from main import compute_feeder, default_output_path, load_segments, prepare_segments, write_result
+from reliability.batch import collect_inputs, feeder_name
+from reliability.kernel import LINE_TYPES, RESULT_FIELDS, SegmentTable, segment_kernel
+from reliability.output import is_output_file
+from reliability.session import WhatIfSession
+
+DEFAULT_WATCH = {
+    "interval": 0.5,
+}
+
+_SESSION_FIELDS = ("自动化状态", "敷设方式_原始", "用户数(台)", "长度(km)")
+
+
+def watch_config(config):
+    return {**DEFAULT_WATCH, **config.get("watch", {})}
+
+
+def file_stamp(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def row_fingerprints(df, columns):
+    """逐行指纹：映射字段值的 64 位哈希，索引为原始行号。"""
+    return pd.util.hash_pandas_object(df[columns].astype(str), index=False)
+
+
+def single_workbook(specs):
+    """specs 是否只指定了一个工作簿文件（目录 / 通配符 / 清单可能匹配多条线路）。"""
+    if len(specs) != 1:
+        return False
+    spec = specs[0]
+    return spec.lower().endswith(".xlsx") and not os.path.isdir(spec) and not any(ch in spec for ch in "*?[")
+
+
+class FeederState:
+    """单条线路上次解析的状态：分段结果、逐行指纹与汇总会话。"""
+    __slots__ = ("path", "stamp", "frames", "prints", "session", "summary")
+
+    def __init__(self, path, stamp, frames, prints, session, summary):
+        self.path = path
+        self.stamp = stamp
+        self.frames = frames
+        self.prints = prints
+        self.session = session
+        self.summary = summary
+
+
+class Watcher:
+    """
+    specs: 输入说明列表（同 -b：目录 / 通配符 / 清单文件，或单个工作簿路径）
+    output: 输出目录（结果文件名同单线路模式），以 .xlsx / .parquet / .csv / .jsonl 结尾时为单个工作簿的输出文件
+            （specs 须为单个工作簿，否则报 ValueError）；为 None 时使用默认输出目录
+    """
+
+    def __init__(self, specs, config, output=None, cache=None):
+        if is_output_file(output) and not single_workbook(specs):
+            raise ValueError(f"输出文件 {output} 只能用于监视单个工作簿；监视多个工作簿时应指定输出目录")
+        self.specs = specs
+        self.config = dict(config, verbose=False)
+        self.constants = config["constants"]
+        self.columns = [list(config["field_mappings"][k].values()) for k in ("main", "branch")]
+        self.output = output
+        self.cache = cache
+        self.states = {}
+        # 读取失败的工作簿：文件未再变化前不重复尝试
+        self.failed = {}
+
+    def inputs(self):
+        paths = []
+        for spec in self.specs:
+            paths.extend(collect_inputs(spec))
+        return list(dict.fromkeys(paths))
+
+    def output_path(self, path):
+        if is_output_file(self.output):
+            return self.output
+        out = default_output_path(path)
+        return os.path.join(self.output, os.path.basename(out)) if self.output else out
+
+    def _full(self, path, stamp):
+        df_main, df_branch, summary = compute_feeder(path, self.config, self.cache)
+        frames = [df_main.copy(), df_branch.copy()]
+        prints = [row_fingerprints(df, cols) for df, cols in zip(frames, self.columns)]
+        session = WhatIfSession(frames[0], frames[1], self.constants, max_history=0)
+        self.states[path] = FeederState(path, stamp, frames, prints, session, summary)
+        return "全量"
+
+    def _incremental(self, state, stamp):
+        """
+        只重算变化行；行集合变化时返回 None（由调用方全量重算）。
+        变化行与分段指标先在分段表副本上计算，内核全部成功后才更新会话并替换 state，
+        中途失败时 state 保持上次一致的状态；会话更新本身失败时丢弃 state，下次全量重算。
+        """
+        cleaned = load_segments(state.path, self.config)
+        prints = [row_fingerprints(df, cols) for df, cols in zip(cleaned, self.columns)]
+        if any(not new.index.equals(old.index) for new, old in zip(prints, state.prints)):
+            return None
+        frames = [df.copy() for df in state.frames]
+        updates = []
+        counts = []
+        for g, (df_new, new, old) in enumerate(zip(cleaned, prints, state.prints)):
+            changed = new.index[new.to_numpy() != old.to_numpy()]
+            counts.append(len(changed))
+            if not len(changed):
+                continue
+            frame = frames[g]
+            rows = prepare_segments(df_new.loc[changed].copy(), self.constants)
+            old_total = int(state.session.users_total[g])
+            # 会话逐行减旧值、加新值；用户数为整数值，与此处差额求和结果相同
+            total = int(state.session.users_total[g] + (rows["用户数(台)"].to_numpy(dtype=float)
+                                                        - frame.loc[changed, "用户数(台)"].to_numpy(dtype=float)).sum())
+            for col in rows.columns.intersection(frame.columns):
+                if frame[col].dtype != rows[col].dtype:
+                    frame[col] = frame[col].astype(object)
+                frame.loc[changed, col] = rows[col]
+            # 分母不变时只算变化行，否则整个分组重算
+            target = frame.loc[changed] if total == old_total else frame
+            result = segment_kernel(SegmentTable.from_frames([target]), self.constants, [total])
+            frame.loc[target.index, "有效分段"] = target["用户数(台)"].to_numpy() > 0
+            for k, name in enumerate(RESULT_FIELDS):
+                frame.loc[target.index, name] = result[k]
+            positions = frame.index.get_indexer(changed)
+            updates.append((g, [(int(k), {name: rows.at[idx, name] for name in _SESSION_FIELDS})
+                                for k, idx in zip(positions, changed)]))
+        summary = state.summary
+        try:
+            for g, changes in updates:
+                summary = state.session.update_rows(LINE_TYPES[g], changes)
+        except Exception:
+            self.states.pop(state.path, None)
+            raise
+        state.frames = frames
+        state.summary = summary
+        state.prints = prints
+        state.stamp = stamp
+        return "增量（主线 {} 行、分支 {} 行变化）".format(*counts)
+
+    def poll(self):
+        """检查一轮；返回本轮更新的 [(路径, 方式, 耗时秒)]。"""
+        updates = []
+        paths = self.inputs()
+        for path in list(self.states):
+            if path not in paths:
+                del self.states[path]
+        for path in paths:
+            try:
+                stamp = file_stamp(path)
+            except OSError:
+                continue
+            state = self.states.get(path)
+            if (state is not None and state.stamp == stamp) or self.failed.get(path) == stamp:
+                continue
+            t0 = time.perf_counter()
+            try:
+                mode = self._incremental(state, stamp) if state is not None else None
+                if mode is None:
+                    mode = self._full(path, stamp)
+                state = self.states[path]
+                write_result(self.output_path(path), state.frames[0], state.frames[1], state.summary)
+            except Exception as e:
+                # 保存过程中文件不完整等：保留旧状态，文件再次变化后重试
+                self.failed[path] = stamp
+                updates.append((path, f"读取失败，文件再次保存后重试: {type(e).__name__}: {e}", time.perf_counter() - t0))
+                continue
+            self.failed.pop(path, None)
+            updates.append((path, mode, time.perf_counter() - t0))
+        return updates
+
+    def run(self, interval=None, iterations=None):
+        interval = watch_config(self.config)["interval"] if interval is None else interval
+        n = 0
+        while iterations is None or n < iterations:
+            for path, mode, seconds in self.poll():
+                state = self.states.get(path)
+                saidi = ""
+                if state is not None:
+                    whole = state.summary[state.summary["线路类型"] == "全线路"].iloc[0]
+                    saidi = f" 全线路 SAIDI={whole['SAIDI合计']:.6f} SAIFI={whole['SAIFI合计']:.6f}"
+                print(f"[{time.strftime('%H:%M:%S')}] {feeder_name(path)}: {mode}，{seconds * 1000:.0f} ms{saidi}", flush=True)
+            n += 1
+            if iterations is None or n < iterations:
+                time.sleep(interval)
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+流式列投影 xlsx 读取：直接 iterparse Sheet XML，只解码 field_mappings 需要的列。
+- 只打开指定的 Sheet（主线（2）/分支（2）等设备级大表不会被解压）；
+- 表头行按列名解析出列号，其余列的单元格直接跳过；
+- 共享字符串按需增量解析，只解析到被引用的最大下标；
+- 多个 Sheet 并发读取；
+- read_projected_columns 返回纯 Python 列表，不依赖 pandas（轻量单线路路径使用）。
+"""
+
+import posixpath
+import re
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+NS_PKG_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+TAG_ROW = NS_MAIN + "row"
+TAG_C = NS_MAIN + "c"
+TAG_V = NS_MAIN + "v"
+TAG_IS = NS_MAIN + "is"
+TAG_T = NS_MAIN + "t"
+TAG_SI = NS_MAIN + "si"
+TAG_RPH = NS_MAIN + "rPh"
+
+_CELL_REF = re.compile(r"([A-Z]+)(\d+)")
+
+
+class _SharedRef:
+    """尚未解析的共享字符串下标。"""
+    __slots__ = ("idx",)
+
+    def __init__(self, idx):
+        self.idx = idx
+
+
+class _LazySharedStrings:
+    """共享字符串表：按需向前解析，只解析到请求过的最大下标为止。"""
+
+    def __init__(self, zf, path):
+        self._zf = zf
+        self._path = path
+        self._items = []
+        self._it = None
+        self._lock = threading.Lock()
+
+    def _advance(self, idx):
+        if self._it is None:
+            if self._path is None:
+                raise KeyError(f"共享字符串下标越界: {idx}")
+            self._it = ET.iterparse(self._zf.open(self._path), events=("end",))
+        for _, elem in self._it:
+            if elem.tag != TAG_SI:
+                continue
+            # 富文本拼接各段 <t>，忽略拼音注音 <rPh>
+            parts = []
+            for child in elem:
+                if child.tag == TAG_T:
+                    parts.append(child.text or "")
+                elif child.tag != TAG_RPH:
+                    parts.extend(t.text or "" for t in child.iter(TAG_T))
+            self._items.append("".join(parts))
+            elem.clear()
+            if len(self._items) > idx:
+                return
+        raise KeyError(f"共享字符串下标越界: {idx}")
+
+    def get(self, idx):
+        with self._lock:
+            if idx >= len(self._items):
+                self._advance(idx)
+            return self._items[idx]
+
+
+def _col_index(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ord(ch) - 64)
+    return n - 1
+
+
+def _number(text):
+    # 与 pandas 的 openpyxl 读取一致：整数值的浮点数转为 int
+    if "." in text or "E" in text or "e" in text:
+        val = float(text)
+        return int(val) if val.is_integer() else val
+    return int(text)
+
+
+_BOOL_STRINGS = {"TRUE": True, "FALSE": False}
+
+# pandas.read_excel 默认识别为缺失值的文本（keep_default_na，含空字符串）
+_NA_STRINGS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+
+
+def _infer_column(values):
+    """
+    与 pandas.read_excel 的列类型推断保持一致：
+    默认缺失值文本（含空字符串）转为 None；
+    整列均为 TRUE/FALSE 文本时转为布尔，整列均为数字文本时转为数值，否则保持原样。
+    """
+    values = [None if isinstance(v, str) and v in _NA_STRINGS else v for v in values]
+    texts = [v for v in values if isinstance(v, str)]
+    if not texts:
+        return values
+    others = [v for v in values if v is not None and not isinstance(v, str)]
+    if not others or all(isinstance(v, bool) for v in others):
+        if all(v.upper() in _BOOL_STRINGS for v in texts):
+            return [_BOOL_STRINGS[v.upper()] if isinstance(v, str) else v for v in values]
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in others):
+        try:
+            return [_number(v.strip()) if isinstance(v, str) else v for v in values]
+        except ValueError:
+            pass
+    return values
+
+
+def _cell_value(c):
+    t = c.get("t", "n")
+    if t == "inlineStr":
+        node = c.find(TAG_IS)
+        return "".join(x.text or "" for x in node.iter(TAG_T)) if node is not None else None
+    v = c.find(TAG_V)
+    if v is None or v.text is None:
+        return None
+    text = v.text
+    if t == "s":
+        return _SharedRef(int(text))
+    if t == "n":
+        return _number(text)
+    if t == "b":
+        return text == "1"
+    # str（公式字符串）/ e（错误值）/ d（ISO 日期）原样返回文本
+    return text
+
+
+def _sheet_paths(zf):
+    """Sheet 名 → 包内 XML 路径，以及共享字符串表路径。"""
+    wb = ET.fromstring(zf.read("xl/workbook.xml"))
+    rels = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    targets = {}
+    sst_path = None
+    for rel in rels.iter(NS_PKG_REL + "Relationship"):
+        target = rel.get("Target")
+        path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        targets[rel.get("Id")] = path
+        if rel.get("Type", "").endswith("/sharedStrings"):
+            sst_path = path
+    sheets = {}
+    for sheet in wb.iter(NS_MAIN + "sheet"):
+        sheets[sheet.get("name")] = targets[sheet.get(NS_REL + "id")]
+    return sheets, sst_path
+
+
+def _scan_sheet(zf, path, columns, sst, optional=()):
+    """
+    流式扫描一个 Sheet：第一行为表头，只保留 columns 中列名对应的单元格。
+    optional 中的列缺失时整列为 None，其余列缺失报错。
+    与 pandas 一致，末尾的全空行（含只设置了格式的空行）不计入；是否全空按整行判断，不限于 columns。
+    返回按 columns 顺序排列的列数据（共享字符串暂以 _SharedRef 占位）。
+    """
+    wanted = None
+    data = [[] for _ in columns]
+    last_r = None
+    n_rows = 0
+    # filled: 最后一个非空行之后的行数；pending: 其后仅含共享字符串的行（行数, 下标列表），结束时再解析判断
+    filled = 0
+    pending = []
+    for _, elem in ET.iterparse(zf.open(path), events=("end",)):
+        if elem.tag != TAG_ROW:
+            continue
+        r = int(elem.get("r")) if elem.get("r") else (last_r or 0) + 1
+        if wanted is None:
+            header = {}
+            for pos, c in enumerate(elem.iter(TAG_C)):
+                ref = c.get("r")
+                col = _col_index(_CELL_REF.match(ref).group(1)) if ref else pos
+                val = _cell_value(c)
+                if isinstance(val, _SharedRef):
+                    val = sst.get(val.idx)
+                if val is not None:
+                    header.setdefault(str(val), col)
+            missing = [name for name in columns if name not in header and name not in optional]
+            if missing:
+                raise KeyError(f"Sheet 缺少列: {missing}")
+            wanted = {header[name]: k for k, name in enumerate(columns) if name in header}
+        else:
+            # 中间空行补齐，与 pandas 行数保持一致
+            for _ in range(r - last_r - 1):
+                for col_data in data:
+                    col_data.append(None)
+            row = [None] * len(columns)
+            refs = []
+            has_value = False
+            for pos, c in enumerate(elem.iter(TAG_C)):
+                ref = c.get("r")
+                col = _col_index(_CELL_REF.match(ref).group(1)) if ref else pos
+                k = wanted.get(col)
+                # 其余列只在本行尚未确定非空时解码
+                if k is None and has_value:
+                    continue
+                val = _cell_value(c)
+                if k is not None:
+                    row[k] = val
+                if has_value or val is None:
+                    continue
+                if isinstance(val, _SharedRef):
+                    refs.append(val.idx)
+                elif val != "":
+                    has_value = True
+            for k, val in enumerate(row):
+                data[k].append(val)
+            n_rows += r - last_r
+            if has_value:
+                filled, pending = n_rows, []
+            elif refs:
+                pending.append((n_rows, refs))
+        last_r = r
+        elem.clear()
+    if wanted is None:
+        raise KeyError(f"Sheet 无表头: {path}")
+    for end, refs in reversed(pending):
+        if any(sst.get(idx) != "" for idx in refs):
+            filled = end
+            break
+    if filled < n_rows:
+        data = [col_data[:filled] for col_data in data]
+    return data
+
+
+def read_projected_columns(excel_path, sheet_columns, max_workers=None, optional=None):
+    """
+    并发读取多个 Sheet 的指定列（纯 Python 列表，列类型推断同 read_projected_sheets）。
+    sheet_columns: {Sheet名: [原始列名, ...]}
+    optional: 可选 {Sheet名: [可缺失的列名, ...]}，缺失时该列全为空
+    返回: (工作簿全部 Sheet 名列表, {Sheet名: {列名: 值列表}})
+    """
+    with zipfile.ZipFile(excel_path) as zf:
+        sheets, sst_path = _sheet_paths(zf)
+        for name in sheet_columns:
+            if name not in sheets:
+                raise ValueError(f"Worksheet named '{name}' not found")
+        sst = _LazySharedStrings(zf, sst_path)
+        names = list(sheet_columns)
+        with ThreadPoolExecutor(max_workers=max_workers or len(names) or 1) as pool:
+            scanned = list(pool.map(lambda n: _scan_sheet(zf, sheets[n], sheet_columns[n], sst, set(optional.get(n, ())) if optional else ()), names))
+
+        # 延迟解析共享字符串：表头之后引用的字符串在此统一解析，整个表只前向扫描一遍
+        tables = {}
+        for name, data in zip(names, scanned):
+            cols = {}
+            for col_name, values in zip(sheet_columns[name], data):
+                cols[col_name] = _infer_column([sst.get(v.idx) if isinstance(v, _SharedRef) else v for v in values])
+            tables[name] = cols
+    return list(sheets), tables
+
+
+def read_projected_sheets(excel_path, sheet_columns, max_workers=None, optional=None):
+    """
+    同 read_projected_columns，各 Sheet 返回 DataFrame。
+    返回: (工作簿全部 Sheet 名列表, {Sheet名: DataFrame})
+    """
+    import pandas as pd
+
+    nan = float("nan")
+    sheet_names, tables = read_projected_columns(excel_path, sheet_columns, max_workers, optional)
+    frames = {}
+    for name, cols in tables.items():
+        # 空单元格与 pandas.read_excel 一致为 NaN（整列为空时为 float64 列）
+        cols = {k: [nan if x is None else x for x in v] for k, v in cols.items()}
+        frames[name] = pd.DataFrame(cols, columns=list(sheet_columns[name]))
+    return sheet_names, frames
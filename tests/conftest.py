@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""测试公共夹具：仓库根目录加入 sys.path，样例线路工作簿与默认参数文件。"""
+
+import copy
+import importlib.util
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from main import default_config_path, load_config  # noqa: E402
+
+FEEDERS = [
+    os.path.join(ROOT, "document", f"{name}.xlsx")
+    for name in ("10kV安54新窑线", "10kV景704景水线", "10kV景704景水线_all")
+]
+
+
+@pytest.fixture(scope="session")
+def base_config():
+    config = load_config(default_config_path())
+    config["verbose"] = 0
+    return config
+
+
+@pytest.fixture
+def config(base_config):
+    return copy.deepcopy(base_config)
+
+
+@pytest.fixture(scope="session")
+def framework():
+    """原始逐分段计算脚本 workspace/reliability_framework.py（作为参考实现）。"""
+    path = os.path.join(ROOT, "workspace", "reliability_framework.py")
+    spec = importlib.util.spec_from_file_location("reliability_framework", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""时户数指标分配：两种分配原则的总量守恒、档位次序与线路分解。"""
+
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS
+from main import default_config_path, run_allocate
+from reliability.allocation import (
+    allocate_proportional, allocate_tiered, allocation_config, push_down, target_total, tiered_what_if,
+)
+from reliability.batch import file_districts
+
+NAMES = list("甲乙丙丁戊己庚辛壬癸")
+SCORES = pd.Series([92.0, 88.5, 97.0, 80.0, 85.0, 90.0, 75.0, 95.5, 83.0, 78.0], index=NAMES)
+CURRENT = pd.Series([1200.0, 800.0, 1500.0, 600.0, 950.0, 1100.0, 400.0, 1300.0, 700.0, 500.0], index=NAMES)
+
+
+def _alloc(**overrides):
+    return allocation_config({"allocation": {"tier1_count": 3, "tier3_count": 3, **overrides}})
+
+
+def test_target_total():
+    assert target_total(1000.0, _alloc()) == pytest.approx(900.0)
+    assert target_total(1000.0, _alloc(target_total=850)) == 850.0
+
+
+def test_proportional_sums_to_total():
+    total = 8000.0
+    out = allocate_proportional(SCORES, CURRENT, total)
+    assert out["目标时户数"].sum() == pytest.approx(total)
+    assert out["分配比例"].sum() == pytest.approx(1.0)
+    assert out["目标时户数"].to_numpy() == pytest.approx(total * SCORES.to_numpy() / SCORES.sum())
+
+
+def test_tiered_drop_sums_to_total():
+    alloc = _alloc()
+    total = target_total(CURRENT.sum(), alloc)
+    out, unallocated = allocate_tiered(SCORES, CURRENT, total, alloc)
+    assert unallocated == 0.0
+    assert out["降幅"].sum() == pytest.approx(CURRENT.sum() - total)
+    assert out["目标时户数"].sum() == pytest.approx(total)
+    # 评分最高 3 个为一档，最低 3 个为三档
+    assert set(out.index[out["档位"] == 1]) == {"丙", "辛", "甲"}
+    assert set(out.index[out["档位"] == 3]) == {"庚", "癸", "丁"}
+    tier1 = out[out["档位"] == 1].sort_values("评分")
+    tier3 = out[out["档位"] == 3].sort_values("评分")
+    # 一档分高者降幅率低（区间端点），三档分高者降幅率高
+    assert tier1["降幅率"].tolist() == pytest.approx([0.06, 0.06 - 0.03 * (95.5 - 92) / 5, 0.03])
+    assert tier3["降幅率"].tolist() == pytest.approx([0.10, 0.10 + 0.05 * 3 / 5, 0.15])
+    assert out.loc[out["档位"] == 2, "降幅率"].nunique() == 1
+
+
+def test_what_if_matches_single_plan():
+    alloc = _alloc(what_if={"tier1_count": [2, 3, 4], "tier3_rate": [[0.08, 0.12], [0.10, 0.15]]})
+    total = target_total(CURRENT.sum(), alloc)
+    plans = tiered_what_if(SCORES, CURRENT, total, alloc)
+    assert len(plans) == 6
+    for plan in plans.to_dict("records"):
+        single = dict(alloc, tier1_count=plan["一档数"], tier3_count=plan["三档数"],
+                      tier3_rate=[plan["三档降幅率下限"], plan["三档降幅率上限"]])
+        out, unallocated = allocate_tiered(SCORES, CURRENT, total, single)
+        rate2 = out.loc[out["档位"] == 2, "降幅率"].iloc[0]
+        assert plan["二档降幅率"] == pytest.approx(rate2)
+        assert plan["最大降幅率"] == pytest.approx(out["降幅率"].max())
+        assert plan["未分配降幅"] == unallocated
+        ordered = out.loc[out["档位"] == 1, "降幅率"].max() <= rate2 <= out.loc[out["档位"] == 3, "降幅率"].min()
+        assert plan["档位有序"] == ordered
+
+
+def test_what_if_skips_oversized_tiers():
+    alloc = _alloc(what_if={"tier1_count": [6, 8]})
+    plans = tiered_what_if(SCORES, CURRENT, 8000.0, alloc)
+    assert plans["一档数"].tolist() == [6]
+
+
+def test_push_down_preserves_district_drop():
+    county = pd.DataFrame({"降幅": [30.0, 12.0]}, index=["甲", "乙"])
+    feeder_district = pd.Series({"a": "甲", "b": "甲", "c": "乙", "d": "乙", "e": "丙"})
+    hours = pd.Series({"a": 100.0, "b": 300.0, "c": 50.0, "d": 150.0, "e": 10.0})
+    potential = pd.Series({"a": 10.0, "b": 30.0, "c": 0.0, "d": 0.0})
+    out = push_down(county, feeder_district, hours, potential).set_index("线路名称")
+    sums = out.groupby("区县")["降幅"].sum()
+    assert sums["甲"] == pytest.approx(30.0) and sums["乙"] == pytest.approx(12.0)
+    # 有潜力按潜力比例，无潜力按当前时户数比例
+    assert out.loc["a", "降幅"] == pytest.approx(7.5)
+    assert out.loc["c", "降幅"] == pytest.approx(3.0)
+    assert np.isnan(out.loc["e", "降幅"])
+    assert out["目标时户数"].to_numpy()[:4] == pytest.approx((hours - out["降幅"]).to_numpy()[:4])
+
+
+def test_same_feeder_name_in_two_districts(tmp_path):
+    """不同区县目录下的同名线路按输入文件区分，分解结果各占一行。"""
+    paths = []
+    for district, src in (("甲", FEEDERS[0]), ("乙", FEEDERS[1])):
+        (tmp_path / district).mkdir()
+        paths.append(str(tmp_path / district / "同名线路.xlsx"))
+        shutil.copy(src, paths[-1])
+    districts = tmp_path / "区县.csv"
+    districts.write_text("区县,区域类别\n甲,B\n乙,C\n", encoding="utf-8")
+    tiered, _, feeders, _ = run_allocate(default_config_path(), str(tmp_path / "*" / "*.xlsx"), str(districts),
+                                         str(tmp_path / "分配.xlsx"), workers=1, use_cache=False)
+    assert sorted(feeders["输入文件"]) == sorted(paths)
+    assert feeders["线路名称"].tolist() == ["同名线路", "同名线路"]
+    assert feeders.set_index("输入文件")["区县"].to_dict() == {paths[0]: "甲", paths[1]: "乙"}
+    assert feeders.groupby("区县")["降幅"].sum().to_dict() == pytest.approx(tiered["降幅"].to_dict())
+
+    summary = pd.DataFrame({"线路名称": ["同名线路", "同名线路"], "输入文件": paths})
+    with pytest.raises(ValueError, match="同名线路"):
+        file_districts(summary, pd.Series({"同名线路": "甲"}))
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""自动化布点：候选降幅与重新计算一致，精确解与穷举一致，贪心不超预算。"""
+
+import itertools
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS
+from main import compute_feeder, default_config_path, run_optimize_automation
+from reliability.automation import (
+    automation_config, candidates_from_results, exact_cells, exact_select, greedy_select, optimize,
+)
+from reliability.kernel import SegmentTable, group_total_users, segment_kernel
+
+
+@pytest.fixture(scope="module")
+def feeder(base_config):
+    df_main, df_branch, summary_df = compute_feeder(FEEDERS[0], base_config)
+    cands = candidates_from_results("线路", FEEDERS[0], df_main, df_branch, summary_df, base_config["constants"], automation_config(base_config))
+    return df_main, df_branch, cands
+
+
+def _hours(table, constants):
+    """各分组年故障停电时户数（SAIDI-F × 分组总用户数）。"""
+    users = group_total_users(table)
+    saidi_f = segment_kernel(table, constants, users)[3]
+    return np.array([saidi_f[table.slice(g)].sum() for g in range(table.n_groups)]) * users
+
+
+def test_candidate_benefit_matches_recompute(feeder, base_config):
+    constants = base_config["constants"]
+    df_main, df_branch, cands = feeder
+    assert len(cands)
+    base = _hours(SegmentTable.from_frames([df_main, df_branch]), constants)
+    for row in cands.to_dict("records"):
+        g = 0 if row["线路类型"] == "主线" else 1
+        frames = [df_main.copy(), df_branch.copy()]
+        df = frames[g]
+        df.loc[df["分段编号"] == row["分段编号"], "隔离时间"] = constants["Auto_Isolation_Time"]
+        drop = base - _hours(SegmentTable.from_frames(frames), constants)
+        assert drop[g] == pytest.approx(row["时户数降幅(时户/年)"], rel=1e-9)
+        assert drop[1 - g] == pytest.approx(0.0, abs=1e-9)
+
+
+def _brute_best(benefit, cost, budget_count, budget_cost):
+    best = 0.0
+    for k in range(min(budget_count, len(benefit)) + 1):
+        for combo in itertools.combinations(range(len(benefit)), k):
+            idx = list(combo)
+            if cost[idx].sum() <= budget_cost + 1e-9:
+                best = max(best, benefit[idx].sum())
+    return best
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_exact_matches_enumeration(seed):
+    rng = np.random.default_rng(seed)
+    n = 10
+    benefit = rng.uniform(1.0, 50.0, n)
+    cost = rng.choice([0.5, 1.0, 1.5, 2.0, 3.0], n)
+    budget_count, budget_cost = int(rng.integers(2, 7)), float(rng.choice([2.5, 4.0, 6.0]))
+    selected, picked = exact_select(benefit, cost, budget_count, budget_cost, resolution=0.5)
+    assert selected.sum() <= budget_count and cost[selected].sum() <= budget_cost + 1e-9
+    assert benefit[selected].sum() == pytest.approx(_brute_best(benefit, cost, budget_count, budget_cost))
+    assert (np.diff(benefit[picked]) <= 0).all()
+
+    greedy, order = greedy_select(benefit, cost, budget_count, budget_cost)
+    assert greedy.sum() <= budget_count and cost[greedy].sum() <= budget_cost + 1e-9
+    assert benefit[greedy].sum() <= benefit[selected].sum() + 1e-9
+    assert sorted(order.tolist()) == np.flatnonzero(greedy).tolist()
+
+
+def test_count_budget_takes_top():
+    benefit = np.array([3.0, 9.0, 1.0, 7.0, 5.0])
+    selected, picked = greedy_select(benefit, np.ones(5), budget_count=3)
+    assert picked.tolist() == [1, 3, 4]
+    # 无投资预算时精确解退化为贪心
+    assert exact_select(benefit, np.ones(5), budget_count=3)[1].tolist() == [1, 3, 4]
+
+
+def test_optimize_summary(feeder, base_config):
+    _, _, cands = feeder
+    auto = automation_config(base_config)
+    detail, feeders, method = optimize(cands, auto, budget_count=3)
+    assert method == "贪心（数量预算下即最优）"
+    chosen = detail[detail["是否入选"]]
+    assert len(chosen) == 3 and chosen["入选顺序"].tolist() == [1, 2, 3]
+    assert chosen["时户数降幅(时户/年)"].min() >= detail.loc[~detail["是否入选"], "时户数降幅(时户/年)"].max()
+    row = feeders.iloc[0]
+    assert row["改造分段数"] == 3
+    assert row["时户数降幅"] == pytest.approx(chosen["时户数降幅(时户/年)"].sum())
+    assert row["改造后SAIDI合计"] == pytest.approx(row["原SAIDI合计"] - row["时户数降幅"] / row["线路总用户数"])
+
+
+def test_exact_table_bounded():
+    benefit = np.array([3.0, 9.0, 1.0, 7.0, 5.0])
+    cost = np.array([1.0, 2.0, 1.0, 1.5, 0.5])
+    # 预算远超全部成本时成本维截断到成本之和
+    assert exact_cells(cost, 3, 1e6, 0.01) == 5 * 4 * (600 + 1)
+    with pytest.raises(ValueError, match="exact_max_cells|超过上限"):
+        exact_select(benefit, cost, 3, 4.0, resolution=0.01, max_cells=1000)
+    cands = pd.DataFrame({"线路名称": "甲", "输入文件": "甲.xlsx", "分段编号": list("ABCDE"), "时户数降幅(时户/年)": benefit, "成本": cost,
+                          "线路总用户数(台)": 100.0, "线路原SAIDI合计": 1.0})
+    auto = automation_config({"automation": {"exact_max_cells": 1000}})
+    assert optimize(cands, auto, budget_count=3, budget_cost=4.0)[2] == "贪心"
+    auto = automation_config({})
+    assert optimize(cands, auto, budget_count=3, budget_cost=4.0)[2] == "精确（动态规划）"
+
+
+def test_same_feeder_name_in_two_directories(base_config, tmp_path):
+    """不同目录下的同名线路按输入文件分别汇总，改造后 SAIDI 各用本线路的用户数与原 SAIDI。"""
+    paths = []
+    for directory, src in (("A", FEEDERS[0]), ("B", FEEDERS[1])):
+        (tmp_path / directory).mkdir()
+        paths.append(str(tmp_path / directory / "10kV安54新窑线.xlsx"))
+        shutil.copy(src, paths[-1])
+    detail, feeders, _ = run_optimize_automation(default_config_path(), batch_spec=str(tmp_path / "*" / "*.xlsx"),
+                                                 output_path=str(tmp_path / "布点.xlsx"), budget_count=5,
+                                                 workers=1, use_cache=False)
+    assert sorted(feeders["输入文件"]) == sorted(paths)
+    assert feeders["线路名称"].tolist() == ["10kV安54新窑线"] * 2
+    feeders = feeders.set_index("输入文件")
+    for path, src in zip(paths, FEEDERS[:2]):
+        whole = compute_feeder(src, base_config)[2].set_index("线路类型").loc["全线路"]
+        row = feeders.loc[path]
+        chosen = detail[detail["是否入选"] & (detail["输入文件"] == path)]
+        assert row["线路总用户数"] == whole["总用户数(台)"]
+        assert row["原SAIDI合计"] == pytest.approx(whole["SAIDI合计"])
+        assert row["改造分段数"] == len(chosen)
+        assert row["改造后SAIDI合计"] == pytest.approx(row["原SAIDI合计"] - chosen["时户数降幅(时户/年)"].sum() / row["线路总用户数"])
+    assert feeders["改造分段数"].sum() == 5
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""批量模式：输入收集规则；并行结果与单线路计算一致，单条失败不影响其余线路。"""
+
+import pandas as pd
+
+from conftest import FEEDERS
+from main import compute_feeder, default_config_path
+from reliability.batch import collect_inputs, feeder_name, run_batch
+
+
+def test_collect_inputs(tmp_path):
+    for name in ("b.xlsx", "a.xlsx", "~$a.xlsx", "c.xls"):
+        (tmp_path / name).write_bytes(b"")
+    a, b = str(tmp_path / "a.xlsx"), str(tmp_path / "b.xlsx")
+    assert collect_inputs(str(tmp_path)) == [a, b]
+    assert collect_inputs(str(tmp_path / "*.xlsx")) == [a, b]
+    manifest = tmp_path / "list.txt"
+    manifest.write_text(f"# 清单\nb.xlsx\n\n{a}\nb.xlsx\n", encoding="utf-8")
+    assert collect_inputs(str(manifest)) == [a, b]
+
+
+def test_parallel_matches_single(base_config, tmp_path):
+    broken = str(tmp_path / "损坏.xlsx")
+    with open(broken, "wb") as f:
+        f.write(b"not a workbook")
+    summary_df, failure_df, _ = run_batch(FEEDERS + [broken], default_config_path(), workers=2, use_cache=False)
+    assert failure_df["输入文件"].tolist() == [broken]
+    assert failure_df["线路名称"].tolist() == ["损坏"]
+    assert summary_df["输入文件"].unique().tolist() == FEEDERS
+    for path in FEEDERS:
+        expected = compute_feeder(path, base_config)[2]
+        got = summary_df[summary_df["输入文件"] == path]
+        assert got["线路名称"].unique().tolist() == [feeder_name(path)]
+        pd.testing.assert_frame_equal(got.drop(columns=["线路名称", "输入文件"]).reset_index(drop=True), expected)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""内容寻址缓存：命中结果与直接计算一致，键随输入 / 常量变化，按大小淘汰，读取不反序列化 pickle。"""
+
+import copy
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS
+import main
+from main import compute_feeder
+from reliability.cache import ResultCache
+
+
+def _assert_result_equal(got, expected):
+    for a, b in zip(got, expected):
+        pd.testing.assert_frame_equal(a, b)
+
+
+def _no_read(*args, **kwargs):
+    raise AssertionError("缓存命中时不应读取工作簿")
+
+
+@pytest.mark.parametrize("path", FEEDERS, ids=lambda p: p.rsplit("/", 1)[-1])
+def test_result_hit_matches_direct(path, config, tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path))
+    expected = compute_feeder(path, config)
+    _assert_result_equal(compute_feeder(path, config, cache), expected)
+    monkeypatch.setattr(main, "load_segments", _no_read)
+    _assert_result_equal(compute_feeder(path, config, cache), expected)
+
+
+def test_input_layer_reused_across_constants(config, tmp_path, monkeypatch):
+    path = FEEDERS[0]
+    cache = ResultCache(str(tmp_path))
+    compute_feeder(path, config, cache)
+    changed = copy.deepcopy(config)
+    changed["constants"]["Cable_Repair_Time"] += 1.0
+    expected = compute_feeder(path, changed)
+    # 常量变化：结果层未命中，输入层命中（不再读取工作簿）
+    monkeypatch.setattr(main, "load_segments", _no_read)
+    _assert_result_equal(compute_feeder(path, changed, cache), expected)
+
+
+def test_key_follows_content(config, tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    copy_path = str(tmp_path / "copy.xlsx")
+    shutil.copyfile(FEEDERS[0], copy_path)
+    key = cache.input_key(FEEDERS[0], config["input"], config["field_mappings"])
+    assert cache.input_key(copy_path, config["input"], config["field_mappings"]) == key
+    assert cache.input_key(FEEDERS[1], config["input"], config["field_mappings"]) != key
+    mappings = copy.deepcopy(config["field_mappings"])
+    mappings["main"]["线路型号"] = "其他列"
+    assert cache.input_key(FEEDERS[0], config["input"], mappings) != key
+
+
+def test_evicts_oldest_entries(config, tmp_path):
+    cache = ResultCache(str(tmp_path), max_size_mb=0)
+    for path in FEEDERS:
+        compute_feeder(path, config, cache)
+    cache.evict()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".npz")]
+
+
+def test_entries_load_without_pickle(config, tmp_path):
+    cache = ResultCache(str(tmp_path))
+    expected = compute_feeder(FEEDERS[0], config, cache)
+    entries = [str(tmp_path / name) for name in os.listdir(tmp_path) if name.endswith(".npz")]
+    assert entries
+    for entry in entries:
+        with np.load(entry, allow_pickle=False) as z:
+            for key in z.files:
+                z[key]
+    # 损坏的条目视为未命中，重新计算
+    for entry in entries:
+        with open(entry, "wb") as f:
+            f.write(b"not an npz")
+    _assert_result_equal(compute_feeder(FEEDERS[0], config, cache), expected)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""网架诊断：多主干拆分、分段过多阈值；冗余分段的 SAIDI/SAIFI 变化与合并后整条线路重算一致。"""
+
+import copy
+import shutil
+import warnings
+
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS
+from main import compute_feeder, default_config_path, run_diagnose
+from reliability.diagnosis import (
+    classify_segments, compile_rules, diagnose, diagnosis_config, feeder_diagnosis_input, feeder_keywords,
+    rule_too_many, split_trunks,
+)
+from reliability.tie import TieIndex
+
+OPPOSITES = ["10kV乙12甲线", "10kV丙34丁线"]
+
+
+def test_feeder_keywords():
+    assert feeder_keywords("10kV安54新窑线") == ("安54", "新窑")
+    assert feeder_keywords("新054开关") == (None, None)
+
+
+def test_split_trunks():
+    # 分段1 终点为对侧线路「乙12」的开关 → 在分段1 后拆分；分段2 起点 X1 为分段0 终点 → 主干2 从前面补充分段0
+    starts = ["变电站A断路器", "X1", "X1", "Y"]
+    ends = ["X1", "乙12开关", "Y", "丙34开关"]
+    assert split_trunks(starts, ends, [False, True, False, True], OPPOSITES) == [([0, 1], 0), ([0, 2, 3], 1)]
+    # 不含联络开关的主干并入前一主干
+    assert split_trunks(starts, ends, [False, True, False, False], OPPOSITES) == [([0, 1, 2, 3], 0)]
+    # 对侧线路不足 2 条时不拆分
+    assert split_trunks(starts, ends, [False, True, False, True], OPPOSITES[:1]) == [([0, 1, 2, 3], 0)]
+
+
+@pytest.fixture(scope="module")
+def inputs(base_config):
+    return [feeder_diagnosis_input(path, base_config) for path in FEEDERS]
+
+
+def test_split_known_feeder(inputs, base_config):
+    # 景水线_all 联络开关指向 鲁65磨山线、景59华工线两条对侧线路，在 分段11 终点（鲁65…环网柜）处拆为两个主干
+    findings, trunks, _ = diagnose([inputs[2]], base_config, TieIndex())
+    split = findings[findings["规则"] == "多主干拆分"]
+    assert split["数值"].tolist() == [2] and split["限值"].tolist() == [2]
+    segs = trunks.groupby("主干编号")["分段编号"].apply(list)
+    assert segs[1] == [f"分段{i}" for i in range(12)]
+    assert segs[2] == [f"分段{i}" for i in range(12, 22)]
+    assert not trunks["补充分段"].any()
+    # 景水线只有一条对侧线路，不拆分
+    findings, trunks, _ = diagnose([inputs[1]], base_config, TieIndex())
+    assert "多主干拆分" not in findings["规则"].tolist()
+    assert trunks["主干编号"].unique().tolist() == [1]
+
+
+def test_classify_segments(inputs, base_config):
+    kinds = classify_segments(inputs[1]["segments"], diagnosis_config(base_config))
+    # 起终点均为环网柜/开闭所且为电缆型号的 分段1～6 为电缆分段；分段0 起点为变电站，分段7 以后为架空或混合
+    assert kinds.tolist() == ["架空"] + ["电缆"] * 6 + ["架空"] * 4
+
+
+def test_too_many_threshold(inputs, base_config):
+    trunks = pd.DataFrame({"线路名称": "甲", "输入文件": "甲.xlsx", "主干编号": 1, "分段类型": ["架空"] * 5 + ["电缆"] * 3})
+    params = {"max_overhead_segments": 5, "max_cable_segments": 2}
+    found, _ = rule_too_many(trunks, params, None)
+    # 架空 5 段恰为上限不报，电缆 3 段超过 2 段
+    assert found[["线路名称", "输入文件", "对象", "数值", "限值"]].values.tolist() == [["甲", "甲.xlsx", "主干1", 3, 2]]
+    assert found["描述"].tolist() == ["电缆分段 3 段，不宜超过 2 段"]
+
+    # 新窑线主干 17 段架空分段
+    config = copy.deepcopy(base_config)
+    config["diagnosis"] = {"rules": ["分段过多"], "max_overhead_segments": 17}
+    assert not len(diagnose([inputs[0]], config, TieIndex())[0])
+    config["diagnosis"]["max_overhead_segments"] = 16
+    found = diagnose([inputs[0]], config, TieIndex())[0]
+    assert found[["规则", "数值", "限值"]].values.tolist() == [["分段过多", 17, 16]]
+
+
+def test_compile_rules(base_config):
+    dcfg = diagnosis_config(base_config)
+    assert [name for name, _ in compile_rules(dcfg, base_config["constants"])] == ["分段过多", "冗余分段"]
+    with pytest.raises(KeyError, match="未知诊断规则"):
+        compile_rules({**dcfg, "rules": ["分段太少"]}, base_config["constants"])
+
+
+def _merge_rows(src, dst, upstream, downstream):
+    """主线 Sheet 中把 downstream 分段并入 upstream 分段（长度、用户数、装机容量相加，终点取下游）。"""
+    import openpyxl
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        wb = openpyxl.load_workbook(src)
+    ws = wb["主线"]
+    col = {cell.value: cell.column for cell in ws[1]}
+    rows = {ws.cell(r, col["线路分段"]).value: r for r in range(2, ws.max_row + 1)}
+    a, b = rows[upstream], rows[downstream]
+    ws.cell(a, col["终点"]).value = ws.cell(b, col["终点"]).value
+    for name in ("长度(km)", "用户数量(台)", "装机容量(kVA)"):
+        ws.cell(a, col[name]).value = f"{float(ws.cell(a, col[name]).value) + float(ws.cell(b, col[name]).value):.3f}"
+    ws.delete_rows(b)
+    wb.save(dst)
+
+
+def test_redundant_matches_recompute(inputs, base_config, tmp_path):
+    findings, _, cand = diagnose([inputs[1]], base_config, TieIndex())
+    # 景水线电缆分段 6 段超过 2 段：分段2（0 户）并入 分段1
+    row = cand[(cand["冗余分段"] == "分段2") & (cand["合并分段"] == "分段1")].iloc[0]
+    assert row["推荐合并"]
+    assert "分段2" in findings.loc[findings["规则"] == "冗余分段", "对象"].tolist()
+
+    merged = str(tmp_path / "合并.xlsx")
+    _merge_rows(FEEDERS[1], merged, "分段1", "分段2")
+    before = compute_feeder(FEEDERS[1], base_config)[2].set_index("线路类型").loc["全线路"]
+    after = compute_feeder(merged, base_config)[2].set_index("线路类型").loc["全线路"]
+    assert after["总用户数(台)"] == before["总用户数(台)"]
+    # 汇总表指标保留 6 位小数
+    assert row["SAIDI变化(h/户·年)"] == pytest.approx(after["SAIDI合计"] - before["SAIDI合计"], abs=2e-6)
+    assert row["SAIFI变化(次/户·年)"] == pytest.approx(after["SAIFI合计"] - before["SAIFI合计"], abs=2e-6)
+    assert row["合并后SAIDI合计"] == pytest.approx(after["SAIDI合计"], abs=2e-6)
+
+
+def test_same_feeder_name_in_two_directories(inputs, base_config, tmp_path):
+    """不同目录下的同名线路按输入文件分别拆分主干、计数与合并，结果与单独诊断一致。"""
+    paths = []
+    for directory, src in (("A", FEEDERS[0]), ("B", FEEDERS[1])):
+        (tmp_path / directory).mkdir()
+        paths.append(str(tmp_path / directory / "10kV安54新窑线.xlsx"))
+        shutil.copy(src, paths[-1])
+    findings, candidates, _ = run_diagnose(default_config_path(), batch_spec=str(tmp_path / "*" / "*.xlsx"),
+                                           output_path=str(tmp_path / "诊断.xlsx"), workers=1, use_cache=False)
+    assert findings["线路名称"].unique().tolist() == ["10kV安54新窑线"]
+    too_many = findings[findings["规则"] == "分段过多"].set_index("输入文件")
+    # A：新窑线 17 段架空；B：景水线 6 段电缆（不与 A 合并计数）
+    assert too_many.loc[paths[0], "数值"] == 17 and too_many.loc[paths[0], "描述"].startswith("架空")
+    assert too_many.loc[paths[1], "数值"] == 6 and too_many.loc[paths[1], "描述"].startswith("电缆")
+    for path, single in zip(paths, inputs[:2]):
+        alone = diagnose([single], base_config, TieIndex())[0]
+        got = findings[findings["输入文件"] == path]
+        assert got[["规则", "主干编号", "对象", "数值"]].values.tolist() == alone[["规则", "主干编号", "对象", "数值"]].values.tolist()
+    # 合并候选按输入文件区分
+    assert set(candidates["输入文件"]) == set(paths)
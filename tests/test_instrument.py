@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""分阶段计量：run() 的 JSON 报告覆盖全部阶段、同名阶段合并计数，Prometheus 文本逐行可解析；未开启时不记录。"""
+
+import json
+import re
+
+import pytest
+
+from conftest import FEEDERS
+from main import compute_feeder, default_config_path, load_config, run
+from reliability.instrument import NULL_PROBE, STAGES, Probe, StageReport
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)\{((?:[a-zA-Z_][a-zA-Z0-9_]*="[^"]*",?)*)\} (-?[0-9.eE+-]+)$')
+
+
+def _config_file(tmp_path, cache_dir):
+    config = load_config(default_config_path())
+    config["cache"] = {**config.get("cache", {}), "enabled": True, "dir": str(cache_dir)}
+    path = tmp_path / "params.json"
+    path.write_text(json.dumps(config, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def _parse_prometheus(text):
+    """逐行解析：# HELP / # TYPE 注释与 name{labels} value 样本；返回 {(指标, 阶段): 值}。"""
+    samples, typed = {}, set()
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            assert len(line.split(" ", 3)) == 4
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert kind == "gauge"
+            typed.add(name)
+        else:
+            m = _SAMPLE.match(line)
+            assert m, line
+            assert m.group(1) in typed
+            labels = dict(re.findall(r'([a-zA-Z_][a-zA-Z0-9_]*)="([^"]*)"', m.group(2)))
+            samples[(m.group(1), labels.get("stage"))] = float(m.group(3))
+    return samples
+
+
+def test_run_profile(tmp_path):
+    path = FEEDERS[1]
+    profile, prom = tmp_path / "profile.json", tmp_path / "metrics.prom"
+    config_path = _config_file(tmp_path, tmp_path / "cache")
+    run(config_path, path, str(tmp_path / "out.xlsx"), profile_path=str(profile), prometheus_path=str(prom), verbose=0)
+    report = json.loads(profile.read_text(encoding="utf-8"))
+    stages = report["stages"]
+    # 首次运行缓存未命中：缓存查找不处理行，其余阶段均有行数
+    assert list(stages) == list(STAGES)
+    assert stages["cache"]["rows"] == 0
+    for name in STAGES:
+        if name != "cache":
+            assert stages[name]["rows"] > 0, name
+    # 分段内核两条记录（建表 + 内核）合并为一项，行数为主线 + 分支分段数
+    df_main, df_branch, _ = compute_feeder(path, load_config(config_path))
+    assert stages["kernel"]["count"] == 2
+    assert stages["kernel"]["rows"] == len(df_main) + len(df_branch)
+    assert [r["stage"] for r in report["feeders"][0]["stages"]].count("kernel") == 2
+    assert 0.0 <= report["io_share"] <= 1.0
+    assert report["feeder_count"] == 1
+
+    samples = _parse_prometheus(prom.read_text(encoding="utf-8"))
+    for name in STAGES:
+        assert samples[("reliability_stage_wall_seconds", name)] >= 0
+    assert samples[("reliability_stage_rows", "kernel")] == len(df_main) + len(df_branch)
+    assert samples[("reliability_feeders", None)] == 1
+
+    # 再次运行命中结果缓存：只有缓存查找与写出，缓存查找行数为命中的结果行数
+    run(config_path, path, str(tmp_path / "out.xlsx"), profile_path=str(profile), verbose=0)
+    stages = json.loads(profile.read_text(encoding="utf-8"))["stages"]
+    assert list(stages) == ["cache", "write"]
+    assert stages["cache"]["rows"] == len(df_main) + len(df_branch) + 3
+
+
+def test_disabled_records_nothing(base_config):
+    compute_feeder(FEEDERS[1], base_config, None, NULL_PROBE)
+    assert NULL_PROBE.records == ()
+    with NULL_PROBE.stage("read") as s:
+        s.rows = 10
+    assert s.rows is None and NULL_PROBE.records == ()
+    assert not NULL_PROBE.enabled
+
+
+def test_stage_totals_and_prometheus():
+    report = StageReport("batch", "清单")
+    for path, rows in (("a.xlsx", 10), ("b.xlsx", 20)):
+        probe = Probe()
+        with probe.stage("read") as s:
+            s.rows = rows
+        with probe.stage("kernel", rows):
+            pass
+        report.add(path, probe.records)
+    with report.main.stage("write", 30):
+        pass
+    totals = report.stage_totals()
+    assert list(totals) == ["read", "kernel", "write"]
+    assert totals["read"]["count"] == 2 and totals["read"]["rows"] == 30
+    assert totals["write"]["count"] == 1
+    data = report.to_dict()
+    busy = sum(t["wall_s"] for t in totals.values())
+    assert data["io_share"] == pytest.approx((totals["read"]["wall_s"] + totals["write"]["wall_s"]) / busy)
+    samples = _parse_prometheus(report.prometheus_text())
+    assert samples[("reliability_stage_rows", "read")] == 30
+    assert samples[("reliability_feeders", None)] == 2
+    assert [r["stage"] for r in data["main_stages"]] == ["write"]
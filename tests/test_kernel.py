@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""分段内核 segment_kernel 与原始逐分段公式（workspace/reliability_framework.py）的一致性。"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS
+from main import calculate_segment_indicators, compute_feeder
+from reliability.kernel import LINE_TYPES, RESULT_FIELDS, SegmentTable, group_total_users, segment_kernel
+
+
+def _prepared(path, config):
+    """已解析故障率、隔离时间的主线 / 分支分段表（只取原公式的输入列）。"""
+    df_main, df_branch, _ = compute_feeder(path, config)
+    cols = ["分段编号", "长度(km)", "用户数(台)", "故障率", "隔离时间"]
+    return [df_main[cols].copy(), df_branch[cols].copy()]
+
+
+def _reference(framework, df, line_type, constants):
+    total = int(df["用户数(台)"].sum())
+    return framework.calculate_segment_indicators(df, total, line_type, constants, False)
+
+
+def _edge_frame():
+    """含用户数为 0、长度为 0 的分段的小表。"""
+    return pd.DataFrame({
+        "分段编号": ["A1", "A2", "A3", "A4"],
+        "长度(km)": [1.25, 0.0, 3.5, 2.0],
+        "用户数(台)": [10.0, 4.0, 0.0, 7.0],
+        "故障率": [0.04, 0.2, 0.04, 0.1146],
+        "隔离时间": [1.5, 0.5, 1.5, 0.25],
+    })
+
+
+@pytest.mark.parametrize("path", FEEDERS, ids=lambda p: p.rsplit("/", 1)[-1])
+def test_kernel_matches_per_row_formula(path, config, framework):
+    constants = config["constants"]
+    frames = _prepared(path, config)
+    table = SegmentTable.from_frames(frames)
+    result = segment_kernel(table, constants)
+    for g, df in enumerate(frames):
+        expected = _reference(framework, df, LINE_TYPES[g], constants)
+        for k, field in enumerate(RESULT_FIELDS):
+            np.testing.assert_array_equal(result[k, table.slice(g)], expected[field].to_numpy(dtype=np.float64), err_msg=field)
+
+
+def test_kernel_edge_cases(config, framework):
+    constants = config["constants"]
+    df = _edge_frame()
+    idle = df.assign(**{"用户数(台)": 0.0})
+    table = SegmentTable.from_frames([df, idle])
+    np.testing.assert_array_equal(group_total_users(table), [21, 0])
+    result = segment_kernel(table, constants)
+    for g, frame in enumerate((df, idle)):
+        expected = _reference(framework, frame, LINE_TYPES[g], constants)
+        for k, field in enumerate(RESULT_FIELDS):
+            np.testing.assert_array_equal(result[k, table.slice(g)], expected[field].to_numpy(dtype=np.float64), err_msg=field)
+
+
+def test_calculate_segment_indicators_matches_original(config, framework):
+    constants = config["constants"]
+    df = _edge_frame()
+    got = calculate_segment_indicators(df, 30, "主线", constants, False)
+    expected = framework.calculate_segment_indicators(df, 30, "主线", constants, False)
+    for field in RESULT_FIELDS:
+        np.testing.assert_array_equal(got[field].to_numpy(dtype=np.float64), expected[field].to_numpy(dtype=np.float64), err_msg=field)
+
+
+@pytest.mark.parametrize("path", FEEDERS, ids=lambda p: p.rsplit("/", 1)[-1])
+def test_feeder_summary_matches_original(path, config, framework):
+    constants = config["constants"]
+    _, _, summary_df = compute_feeder(path, config)
+    for g, df in enumerate(_prepared(path, config)):
+        expected = framework.calculate_summary(_reference(framework, df, LINE_TYPES[g], constants),
+                                               int(df["用户数(台)"].sum()), LINE_TYPES[g], constants, False)
+        row = summary_df.iloc[g]
+        assert row["线路类型"] == expected["线路类型"]
+        for name, value in expected.items():
+            if name != "线路类型":
+                assert row[name] == pytest.approx(value, abs=1e-6), name
+
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""整列敷设方式解析：去重 + 缓存后的结果与逐行解析一致。"""
+
+import numpy as np
+
+from main import parse_laying_column, parse_laying_weights_and_fault_rate
+
+VALUES = [
+    "JKLYJ-240:60%\nYJV22-300:40%",
+    "YJV22-300:100%",
+    "JKLYJ-240:60%\nYJV22-300:40%",
+    "None:100%",
+    None,
+    float("nan"),
+    "JKLYJ-240:30%\r\nNone:20%\nYJV22-300:50%",
+    "无法解析",
+    "YJV22-300:100%",
+]
+
+
+def test_column_matches_rowwise(base_config):
+    constants = base_config["constants"]
+    cable_w, overhead_w, rate, desc = parse_laying_column(VALUES, constants)
+    for k, value in enumerate(VALUES):
+        expected = parse_laying_weights_and_fault_rate(value, constants)
+        assert (cable_w[k], overhead_w[k], rate[k], desc[k]) == expected, value
+
+
+def test_rates_follow_constants(base_config):
+    constants = dict(base_config["constants"], Cable_Fault_Rate=0.5, Overhead_Fault_Rate=2.0)
+    _, overhead_w, rate, _ = parse_laying_column(["JKLYJ-240:60%\nYJV22-300:40%", "None:100%"], constants)
+    # 缓存按故障率区分；无有效分量时按全架空计
+    np.testing.assert_allclose(rate, [0.6 * 2.0 + 0.4 * 0.5, 2.0])
+    np.testing.assert_allclose(overhead_w, [0.6, 1.0])
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""轻量单线路路径：不导入 pandas，分段指标与完整路径逐位一致，输出表与完整路径相同。"""
+
+import copy
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS, ROOT
+from main import compute_feeder, write_result
+from reliability.kernel import RESULT_FIELDS
+from reliability.lite import compute_feeder_lite, lite_fallback, write_feeder_result_lite
+
+IDS = [p.rsplit("/", 1)[-1] for p in FEEDERS]
+
+
+@pytest.mark.parametrize("path", FEEDERS, ids=IDS)
+def test_matches_full_path(path, config):
+    main_rows, branch_rows, summaries = compute_feeder_lite(path, config)
+    df_main, df_branch, summary_df = compute_feeder(path, config)
+    for rows, df in ((main_rows, df_main), (branch_rows, df_branch)):
+        assert len(rows) == len(df)
+        for name in ("长度(km)", "用户数(台)", "故障率", "隔离时间") + RESULT_FIELDS:
+            assert [float(r[name]) for r in rows] == df[name].astype(float).tolist(), name
+    got = pd.DataFrame(summaries)
+    assert got.columns.tolist() == summary_df.columns.tolist()
+    assert got["总用户数(台)"].tolist() == summary_df["总用户数(台)"].tolist()
+    for name in summary_df.columns.drop(["线路类型", "总用户数(台)"]):
+        assert got[name].tolist() == pytest.approx(summary_df[name].tolist(), abs=2e-6), name
+
+
+@pytest.mark.parametrize("path", FEEDERS, ids=IDS)
+def test_xlsx_matches_full_path(path, config, tmp_path):
+    lite_path, full_path = str(tmp_path / "lite.xlsx"), str(tmp_path / "full.xlsx")
+    write_feeder_result_lite(lite_path, *compute_feeder_lite(path, config))
+    write_result(full_path, *compute_feeder(path, config))
+    lite, full = pd.read_excel(lite_path, sheet_name=None), pd.read_excel(full_path, sheet_name=None)
+    assert list(lite) == list(full)
+    for name in ("主线分段明细", "分支分段明细"):
+        pd.testing.assert_frame_equal(lite[name], full[name], obj=name)
+    pd.testing.assert_frame_equal(lite["指标汇总"], full["指标汇总"], check_exact=False, atol=2e-6)
+
+
+@pytest.mark.parametrize("path", FEEDERS, ids=IDS)
+def test_csv_matches_full_path(path, config, tmp_path):
+    """分段明细逐字节一致；汇总求和顺序不同，末位可能不同。"""
+    lite_path, full_path = str(tmp_path / "lite.csv"), str(tmp_path / "full.csv")
+    write_feeder_result_lite(lite_path, *compute_feeder_lite(path, config))
+    write_result(full_path, *compute_feeder(path, config))
+    with open(lite_path, "rb") as a, open(full_path, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_fallback(config, tmp_path):
+    path = FEEDERS[0]
+    out = str(tmp_path / "out.xlsx")
+    assert lite_fallback(path, out, config) is None
+    assert lite_fallback(path, str(tmp_path / "out.csv"), config) is None
+    assert lite_fallback(path, str(tmp_path / "out.parquet"), config)
+    assert lite_fallback(path, str(tmp_path / "out.jsonl"), config) == "jsonl 输出"
+    assert lite_fallback(path, out, config, fmt="jsonl") == "jsonl 输出"
+    assert lite_fallback(path, out, config, store="results.sqlite")
+    assert lite_fallback(path, out, config, trace_path="trace.csv")
+    small = copy.deepcopy(config)
+    small["lite"] = {"max_file_mb": 0}
+    assert lite_fallback(path, out, small)
+    other = copy.deepcopy(config)
+    other["input"]["reader"] = "pandas"
+    assert lite_fallback(path, out, other)
+
+
+def test_does_not_import_pandas(tmp_path):
+    script = (
+        "import sys\n"
+        f"sys.path.insert(0, {ROOT!r})\n"
+        "from main import default_config_path, load_config\n"
+        "from reliability.lite import compute_feeder_lite, write_feeder_result_lite\n"
+        "config = load_config(default_config_path())\n"
+        "config['verbose'] = 0\n"
+        f"write_feeder_result_lite({str(tmp_path / 'out.csv')!r}, *compute_feeder_lite({FEEDERS[0]!r}, config))\n"
+        "print('pandas' in sys.modules, 'numpy' in sys.modules)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True, cwd=ROOT)
+    assert out.stdout.split() == ["False", "False"]
+    assert os.path.exists(tmp_path / "out.csv")
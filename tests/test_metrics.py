@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""网架结构指标：累加器合并满足结合律、可序列化往返；样例线路的区县指标与手算一致。"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS
+from main import compute_feeder
+from reliability.metrics import GRID_INDICATORS, GridAccumulator, district_grid_metrics, feeder_grid_metrics, metrics_config
+
+
+def _rows(seed, n):
+    rng = np.random.default_rng(seed)
+    return [{
+        "主线分段数": int(rng.integers(1, 30)),
+        "主线用户数": float(rng.integers(0, 300)),
+        "总用户数": float(rng.integers(300, 600)),
+        "是否联络": bool(rng.integers(0, 2)),
+        "大分支数": int(rng.integers(0, 10)),
+        "供电半径(km)": float(rng.uniform(0.5, 20.0)),
+    } for _ in range(n)]
+
+
+def _acc(rows):
+    acc = GridAccumulator()
+    for row in rows:
+        acc.add(row)
+    return acc
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_merge_associative(seed):
+    rows = _rows(seed, 12)
+    a, b, c = rows[:3], rows[3:8], rows[8:]
+    left = _acc(a).merge(_acc(b)).merge(_acc(c))
+    right = _acc(a).merge(_acc(b).merge(_acc(c)))
+    whole = _acc(rows)
+    assert left.to_dict() == pytest.approx(whole.to_dict())
+    assert right.to_dict() == pytest.approx(whole.to_dict())
+    assert left.indicators() == pytest.approx(whole.indicators())
+    # 空累加器为单位元
+    assert GridAccumulator().merge(whole).to_dict() == whole.to_dict()
+
+
+def test_dict_round_trip():
+    acc = _acc(_rows(7, 5))
+    data = acc.to_dict()
+    restored = GridAccumulator.from_dict(data)
+    assert restored.to_dict() == data
+    assert restored.indicators() == acc.indicators()
+    assert GridAccumulator.from_dict(GridAccumulator().to_dict()).indicators()["线路数"] == 0
+
+
+@pytest.fixture(scope="module")
+def metrics_df(base_config):
+    rows = []
+    for path in FEEDERS:
+        df_main, df_branch, _ = compute_feeder(path, base_config)
+        rows.append({"输入文件": path, **feeder_grid_metrics(df_main, df_branch, metrics_config(base_config))})
+    return pd.DataFrame(rows)
+
+
+def test_feeder_counts(metrics_df):
+    # 景水线：主线 11 段（分段9、分段10 各 1 个段内联络开关），3 条大分支，主线长度合计 3.4 km
+    row = metrics_df.iloc[1]
+    assert row["主线分段数"] == 11 and row["主线用户数"] == 66 and row["总用户数"] == 91
+    assert row["联络开关数"] == 2 and row["是否联络"]
+    assert row["大分支数"] == 3
+    assert row["供电半径(km)"] == pytest.approx(3.4)
+
+
+def test_district_metrics(metrics_df):
+    feeder_district = pd.Series({FEEDERS[0]: "甲", FEEDERS[1]: "甲", FEEDERS[2]: "乙"})
+    out = district_grid_metrics(metrics_df, feeder_district)
+    assert out.index.tolist() == ["甲", "乙"]
+    assert set(GRID_INDICATORS) <= set(out.columns)
+    # 甲：新窑线（主线 17 段 256 户，共 382 户，8 条大分支，主线 36.894 km）+ 景水线（11 段 66 户，共 91 户，3 条，3.4 km）
+    assert out.loc["甲"].to_dict() == pytest.approx({
+        "线路数": 2,
+        "线路联络率": 100.0,
+        "分段平均挂接数量": (256 + 66) / (17 + 11),
+        "线均中压用户数量": (382 + 91) / 2,
+        "线均大分支数量": (8 + 3) / 2,
+        "平均供电半径": (36.894 + 3.4) / 2,
+    })
+    # 乙：景水线_all（主线 22 段 100 户，共 148 户，6 条大分支，主线 10.475 km）
+    assert out.loc["乙"].to_dict() == pytest.approx({
+        "线路数": 1,
+        "线路联络率": 100.0,
+        "分段平均挂接数量": 100 / 22,
+        "线均中压用户数量": 148.0,
+        "线均大分支数量": 6.0,
+        "平均供电半径": 10.475,
+    })
+
+
+def test_district_metrics_untied_and_unmapped(metrics_df):
+    df = metrics_df.copy()
+    df.loc[1, "是否联络"] = False
+    # 未归属区县的线路不计入
+    out = district_grid_metrics(df, pd.Series({FEEDERS[0]: "甲", FEEDERS[1]: "甲"}))
+    assert out.index.tolist() == ["甲"]
+    assert out.loc["甲", "线路联络率"] == pytest.approx(50.0)
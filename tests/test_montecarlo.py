@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""蒙特卡洛模拟：样本均值与解析值一致，结果与进程数无关。"""
+
+import copy
+
+import numpy as np
+import pytest
+
+from conftest import FEEDERS
+from main import compute_feeder
+from reliability.kernel import SegmentTable, group_total_users
+from reliability.montecarlo import monte_carlo_config, simulate, summarize_samples
+
+
+@pytest.fixture(scope="module")
+def feeder(base_config):
+    df_main, df_branch, summary_df = compute_feeder(FEEDERS[0], base_config)
+    return SegmentTable.from_frames([df_main, df_branch]), summary_df
+
+
+def _mc(config, **overrides):
+    mc = monte_carlo_config(copy.deepcopy(config))
+    mc.update({"trials": 20000, "seed": 7, "max_block_elements": 100000, **overrides})
+    return mc
+
+
+@pytest.mark.parametrize("durations", [
+    {},
+    {"isolation": {"type": "gamma", "shape": 3.0}, "repair": {"type": "lognormal", "sigma": 0.6}, "scheduled": {"type": "exponential"}},
+], ids=["default", "distributions"])
+def test_mean_matches_analytical(feeder, base_config, durations):
+    table, summary_df = feeder
+    constants = base_config["constants"]
+    mc = _mc(base_config)
+    mc["durations"] = {**mc["durations"], **durations}
+    stats = summarize_samples(simulate(table, constants, mc), group_total_users(table), constants, mc, summary_df)
+    for row in stats.to_dict("records"):
+        # 均值在 5 个标准误内（固定种子，结果确定）
+        tolerance = 5 * row["标准差"] / np.sqrt(mc["trials"]) + 1e-9
+        assert abs(row["均值"] - row["解析值"]) <= tolerance, (row["线路类型"], row["指标"])
+
+
+def test_independent_of_workers(feeder, base_config):
+    table, _ = feeder
+    mc = _mc(base_config, trials=2000, max_block_elements=20000)
+    one = simulate(table, base_config["constants"], mc)
+    two = simulate(table, base_config["constants"], mc, workers=2)
+    np.testing.assert_array_equal(one, two)
+    assert one.shape == (2000, 2, 4)
+
+
+def test_percentiles_and_targets(feeder, base_config):
+    table, summary_df = feeder
+    constants = base_config["constants"]
+    mc = _mc(base_config, trials=2000, percentiles=[50, 90], saidi_targets=[1.0])
+    stats = summarize_samples(simulate(table, constants, mc), group_total_users(table), constants, mc, summary_df)
+    saidi = stats[stats["指标"] == "SAIDI合计"]
+    assert (saidi["P50"] <= saidi["P90"]).all()
+    assert saidi["P(SAIDI>1)"].between(0, 1).all()
+    assert len(stats) == 3 * 7
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""输出后端：各格式写出的表内容与计算结果一致。"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS
+from main import OUTPUT_COLS, compute_feeder
+from reliability.output import (DETAIL_TABLE, open_writer, output_format, segment_detail, table_path, with_format,
+                                write_feeder_result)
+
+
+@pytest.fixture(scope="module")
+def result(base_config):
+    return compute_feeder(FEEDERS[0], base_config)
+
+
+def test_output_format():
+    assert output_format("a/b.CSV") == "csv"
+    assert output_format("a/b.unknown") == "xlsx"
+    assert output_format("a/b.xlsx", "jsonl") == "jsonl"
+    with pytest.raises(ValueError):
+        output_format("a/b.xlsx", "xml")
+    assert with_format("a/b.xlsx", "csv") == "a/b.csv"
+    assert with_format("a/b.csv", None) == "a/b.csv"
+    assert table_path("a/b.csv", "指标汇总", DETAIL_TABLE) == "a/b_指标汇总.csv"
+    assert table_path("a/b.csv", DETAIL_TABLE, DETAIL_TABLE) == "a/b.csv"
+
+
+def _roundtrip_xlsx(df, tmp_path):
+    path = str(tmp_path / "ref.xlsx")
+    df.to_excel(path, index=False)
+    return path
+
+
+def test_xlsx(result, tmp_path):
+    df_main, df_branch, summary_df = result
+    path = str(tmp_path / "out.xlsx")
+    write_feeder_result(path, df_main, df_branch, summary_df, OUTPUT_COLS)
+    sheets = pd.read_excel(path, sheet_name=None)
+    assert list(sheets) == ["主线分段明细", "分支分段明细", "指标汇总"]
+    expected = pd.read_excel(_roundtrip_xlsx(df_main[OUTPUT_COLS], tmp_path))
+    pd.testing.assert_frame_equal(sheets["主线分段明细"], expected)
+    pd.testing.assert_frame_equal(sheets["指标汇总"], summary_df, check_dtype=False)
+
+
+def test_csv_and_jsonl(result, tmp_path):
+    df_main, df_branch, summary_df = result
+    detail = segment_detail(df_main, df_branch, OUTPUT_COLS)
+    assert detail["线路类型"].tolist() == ["主线"] * len(df_main) + ["分支"] * len(df_branch)
+
+    csv_path = str(tmp_path / "out.csv")
+    write_feeder_result(csv_path, df_main, df_branch, summary_df, OUTPUT_COLS)
+    got = pd.read_csv(csv_path, encoding="utf-8-sig")
+    assert got.columns.tolist() == detail.columns.tolist()
+    assert got["长度(km)"].tolist() == pytest.approx(detail["长度(km)"].tolist())
+    pd.testing.assert_frame_equal(pd.read_csv(table_path(csv_path, "指标汇总", DETAIL_TABLE), encoding="utf-8-sig"),
+                                  summary_df, check_dtype=False)
+
+    jsonl_path = str(tmp_path / "out.jsonl")
+    write_feeder_result(jsonl_path, df_main, df_branch, summary_df, OUTPUT_COLS)
+    with open(jsonl_path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == len(detail)
+    assert [r["SAIDI合计"] for r in rows] == pytest.approx(detail["SAIDI合计"].tolist(), abs=1e-12)
+
+
+def test_appends_across_writes(result, tmp_path):
+    _, _, summary_df = result
+    for ext in ("csv", "jsonl", "xlsx"):
+        path = str(tmp_path / f"append.{ext}")
+        with open_writer(path) as out:
+            out.write("指标汇总", summary_df)
+            out.write("指标汇总", summary_df)
+        if ext == "csv":
+            got = pd.read_csv(path, encoding="utf-8-sig")
+        elif ext == "jsonl":
+            got = pd.read_json(path, lines=True)
+        else:
+            got = pd.read_excel(path, sheet_name="指标汇总")
+        assert len(got) == 2 * len(summary_df), ext
+
+
+def test_parquet(result, tmp_path):
+    pytest.importorskip("pyarrow")
+    df_main, df_branch, summary_df = result
+    path = str(tmp_path / "out.parquet")
+    write_feeder_result(path, df_main, df_branch, summary_df, OUTPUT_COLS)
+    got = pd.read_parquet(path)
+    assert len(got) == len(df_main) + len(df_branch)
+    assert got["SAIDI合计"].tolist() == segment_detail(df_main, df_branch, OUTPUT_COLS)["SAIDI合计"].tolist()
+    pd.testing.assert_frame_equal(pd.read_parquet(table_path(path, "指标汇总", DETAIL_TABLE)), summary_df, check_dtype=False)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""分片部分汇总合并与单机一次计算的一致性，分片清单校验。"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS
+from main import run_stream
+from reliability.batch import feeder_name
+from reliability.partial import input_digest, load_partial, merge_partials, parse_shard, save_partial, shard_inputs
+from reliability.stream import PartialSummary, ReliabilityAccumulator, feeder_stream_result
+
+DISTRICTS = {FEEDERS[0]: "区县甲", FEEDERS[1]: "区县乙", FEEDERS[2]: "区县乙"}
+
+
+@pytest.fixture(scope="module")
+def results(base_config):
+    return {path: feeder_stream_result(path, base_config) for path in FEEDERS}
+
+
+def _partial(paths, results, constants):
+    partial = PartialSummary(constants, keep_feeders=True)
+    for path in paths:
+        partial.add(feeder_name(path), DISTRICTS[path], path, ReliabilityAccumulator().merge(results[path][2]))
+    return partial
+
+
+def _assert_same(merged, single):
+    keys = (("feeder_summary", ["输入文件", "线路类型"]), ("district_summary", ["区县", "线路类型"]), ("province_summary", ["线路类型"]))
+    for method, key in keys:
+        got = getattr(merged, method)().sort_values(key).reset_index(drop=True)
+        expected = getattr(single, method)().sort_values(key).reset_index(drop=True)
+        pd.testing.assert_frame_equal(got, expected, check_exact=True, obj=method)
+
+
+def _run_shard(listing, config_path, out_dir, shard):
+    """独立进程中运行一个分片（同 python main.py -b 清单 --stream --shard K/N --partial），返回部分汇总路径。"""
+    name = shard.replace("/", "of") if shard else "all"
+    partial_path = os.path.join(out_dir, f"{name}.json")
+    run_stream(config_path=config_path, batch_spec=listing, output_path=os.path.join(out_dir, f"{name}.csv"),
+               workers=1, use_cache=False, shard=shard, partial_path=partial_path)
+    return partial_path
+
+
+@pytest.fixture(scope="module")
+def listing(base_config, tmp_path_factory):
+    """样例线路清单与 verbose=0 的参数文件。"""
+    folder = tmp_path_factory.mktemp("shards")
+    listing_path = folder / "feeders.txt"
+    listing_path.write_text("\n".join(FEEDERS), encoding="utf-8")
+    config_path = folder / "params.json"
+    config_path.write_text(json.dumps(base_config, ensure_ascii=False), encoding="utf-8")
+    return str(listing_path), str(config_path)
+
+
+@pytest.mark.parametrize("n", [2, 3])
+def test_process_shards_match_single_pass(n, listing, tmp_path):
+    listing_path, config_path = listing
+    with ProcessPoolExecutor(max_workers=n) as pool:
+        futures = [pool.submit(_run_shard, listing_path, config_path, str(tmp_path), f"{k}/{n}") for k in range(1, n + 1)]
+        paths = [f.result() for f in futures]
+    single, _ = merge_partials([_run_shard(listing_path, config_path, str(tmp_path), None)])
+    # 合并顺序不影响结果
+    merged, shards = merge_partials(paths[::-1])
+    assert [s["分片"] for s in shards] == [f"{k}/{n}" for k in range(n, 0, -1)]
+    assert sum(s["线路数"] for s in shards) == len(FEEDERS)
+    assert merged.province.feeders == single.province.feeders == len(FEEDERS)
+    _assert_same(merged, single)
+
+
+def test_manifest_rejects_mixed_and_missing_shards(results, base_config, tmp_path):
+    constants = base_config["constants"]
+
+    def save(name, shard, inputs=FEEDERS):
+        path = str(tmp_path / f"{name}.json")
+        save_partial(path, _partial(shard_inputs(inputs, shard), results, constants), shard, inputs)
+        return path
+
+    first, second = save("a", "1/2"), save("b", "2/2")
+    assert merge_partials([second, first])[0].province.feeders == len(FEEDERS)
+    with pytest.raises(ValueError, match="缺少分片: 2/2"):
+        merge_partials([first])
+    with pytest.raises(ValueError, match="重复"):
+        merge_partials([first, second, first])
+    with pytest.raises(ValueError, match="同一清单"):
+        merge_partials([first, save("other", "2/2", FEEDERS[:2])])
+    with pytest.raises(ValueError, match="同一清单"):
+        merge_partials([first, save("thirds", "2/3")])
+
+
+def test_feeder_records_match_summary(results, base_config):
+    """单条线路的累加器还原 compute_feeder 的主线、分支汇总；全线路由未舍入的主线、分支合成，差异不超过舍入位。"""
+    for path, (_, summary_df, acc) in results.items():
+        records = pd.DataFrame(acc.records(base_config["constants"]))
+        pd.testing.assert_frame_equal(records.iloc[:2], summary_df.iloc[:2], check_exact=True, check_dtype=False)
+        pd.testing.assert_frame_equal(records.iloc[2:], summary_df.iloc[2:], check_exact=False, atol=2e-6, check_dtype=False)
+
+
+def test_province_matches_feeder_summaries(results, base_config):
+    """全省汇总 = 各线路汇总按用户数加权。"""
+    province = _partial(FEEDERS, results, base_config["constants"]).province_summary().set_index("线路类型")
+    frames = pd.concat(r[1] for r in results.values())
+    for line_type, rows in frames.groupby("线路类型"):
+        users = rows["总用户数(台)"]
+        assert province.loc[line_type, "总用户数(台)"] == users.sum()
+        assert province.loc[line_type, "总长度(km)"] == pytest.approx(rows["总长度(km)"].sum(), abs=1e-4)
+        for name in ("SAIDI合计", "SAIFI合计"):
+            assert province.loc[line_type, name] == pytest.approx((rows[name] * users).sum() / users.sum(), abs=2e-6)
+
+
+def test_shards_partition_inputs():
+    inputs = [f"f{i:02d}.xlsx" for i in range(10)]
+    shards = [shard_inputs(inputs[::-1], f"{k}/3") for k in range(1, 4)]
+    assert sorted(sum(shards, [])) == inputs
+    assert [len(s) for s in shards] == [4, 3, 3]
+    assert shard_inputs(inputs, None) == inputs
+    # 清单摘要与数据目录挂载位置无关
+    assert input_digest(["/data/甲/a.xlsx", "/data/乙/b.xlsx"]) == input_digest(["/mnt/x/乙/b.xlsx", "/mnt/x/甲/a.xlsx"])
+    assert input_digest(["/data/甲/a.xlsx", "/data/乙/b.xlsx"]) != input_digest(["/data/甲/a.xlsx"])
+    for bad in ("0/3", "4/3", "x", "1-3"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+
+def test_duplicate_feeder_and_constants_rejected(results, base_config, tmp_path):
+    constants = base_config["constants"]
+    a, b = tmp_path / "a.json", tmp_path / "b.json"
+    save_partial(str(a), _partial(FEEDERS[:2], results, constants), "1/2", FEEDERS)
+    save_partial(str(b), _partial(FEEDERS[1:], results, constants), "2/2", FEEDERS)
+    with pytest.raises(ValueError):
+        merge_partials([str(a), str(b)])
+    save_partial(str(b), _partial(FEEDERS[2:], results, dict(constants, Cable_Repair_Time=1.0)), "2/2", FEEDERS)
+    with pytest.raises(ValueError):
+        merge_partials([str(a), str(b)])
+
+
+def test_load_partial_rejects_other_files(tmp_path):
+    path = tmp_path / "other.json"
+    path.write_text(json.dumps({"format": "x"}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_partial(str(path))
+    with pytest.raises(ValueError):
+        merge_partials([])
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""区县评分规则：各规则类型的得分与一级分类加权总分。"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reliability.scoring import (
+    CATEGORY_WEIGHTS, district_indicators_from_feeders, score_districts, score_indicator,
+    scoring_config, scoring_rules,
+)
+
+
+def _score(rule, values, area=None):
+    area = ["B"] * len(values) if area is None else area
+    return score_indicator(rule, values, area).tolist()
+
+
+def test_rank_ties_take_best_place():
+    rule = {"rule": "rank_desc", "step": 5}
+    assert _score(rule, [99.9, 99.8, 99.9, 99.7]) == [100.0, 90.0, 100.0, 85.0]
+    assert _score({"rule": "rank_asc", "step": 5}, [3.0, 1.0, 2.0]) == [90.0, 100.0, 95.0]
+    # 缺失值不参与排名
+    score = _score(rule, [99.9, np.nan, 99.8])
+    assert score[0] == 100.0 and np.isnan(score[1]) and score[2] == 95.0
+
+
+def test_threshold_knee():
+    rule = {"rule": "threshold", "target": 100, "knee": 90}
+    # 95：扣 5；85：knee 以上扣 10，以下每点 2 分扣 10
+    assert _score(rule, [100.0, 95.0, 85.0, 120.0, 0.0]) == [100.0, 95.0, 80.0, 100.0, 0.0]
+
+
+def test_over_target_and_per_unit():
+    assert _score({"rule": "over_target", "target": 5}, [4.0, 5.5, 20.0]) == pytest.approx([100.0, 90.0, 0.0])
+    assert _score({"rule": "per_unit", "penalty": 10}, [0.0, 2.5, 12.0]) == [100.0, 75.0, 0.0]
+
+
+def test_reliability_class():
+    rule = {"rule": "reliability_class"}
+    score = _score(rule, [99.99, 99.95, 99.95], ["A", "B", "A"])
+    assert score[:2] == [100.0, pytest.approx(60 * (1 - 0.015 * 50 / 99.965))]
+    assert score[2] == pytest.approx(60 * (1 - 0.04 * 50 / 99.99))
+
+
+def test_rule_overrides():
+    sc = scoring_config({"scoring": {"rule_overrides": [
+        {"indicator": "FA覆盖率", "target": 98},
+        {"category": "自动化水平", "indicator": "新指标", "rule": "per_unit", "penalty": 1},
+    ]}})
+    rules = {r["indicator"]: r for r in scoring_rules(sc)}
+    assert rules["FA覆盖率"]["target"] == 98 and rules["FA覆盖率"]["knee"] == 90
+    assert rules["新指标"]["penalty"] == 1
+    with pytest.raises(KeyError):
+        scoring_rules(scoring_config({"scoring": {"version": "无此版本"}}))
+
+
+def test_weighted_total():
+    districts = pd.DataFrame({
+        "区域类别": ["B", "B", "C"],
+        "供电可靠率": [99.95, 99.90, 99.80],
+        "线均大分支数量": [1.0, 2.0, 3.0],
+        "线均终端数量": [10.0, 30.0, 20.0],
+    }, index=["甲", "乙", "丙"])
+    scores, missing = score_districts(districts, scoring_rules(scoring_config({})), CATEGORY_WEIGHTS)
+    assert "供电可靠率" not in missing and "FA覆盖率" in missing
+    assert scores["供电可靠率得分"].tolist() == [100.0, 95.0, 90.0]
+    assert scores["网架结构得分"].tolist() == [90.0, 80.0, 70.0]
+    assert scores["自动化水平得分"].tolist() == [90.0, 100.0, 95.0]
+    # 无指标的一级分类（设备水平）不计分
+    assert "设备水平得分" not in scores
+    expected = [0.6 * 100 + 0.2 * 90 + 0.1 * 90, 0.6 * 95 + 0.2 * 80 + 0.1 * 100, 0.6 * 90 + 0.2 * 70 + 0.1 * 95]
+    assert scores["总分"].tolist() == pytest.approx(expected)
+    assert scores["排名"].tolist() == [1, 2, 3]
+
+
+def test_district_indicators_from_feeders():
+    summary = pd.DataFrame({
+        "线路名称": ["a", "a", "b", "c"],
+        "输入文件": ["甲/a.xlsx", "甲/a.xlsx", "甲/b.xlsx", "c.xlsx"],
+        "线路类型": ["主线", "全线路", "全线路", "全线路"],
+        "总用户数(台)": [100, 100, 300, 50],
+        "SAIDI合计": [9.0, 2.0, 4.0, 1.0],
+    })
+    feeder_district = pd.Series({"甲/a.xlsx": "甲", "甲/b.xlsx": "甲"})
+    agg = district_indicators_from_feeders(summary, feeder_district, {"Annual_Power_Hours": 8760})
+    # 线路 c 无区县归属，不计入
+    assert agg.index.tolist() == ["甲"]
+    saidi = (2.0 * 100 + 4.0 * 300) / 400
+    assert agg.loc["甲", "线路数"] == 2 and agg.loc["甲", "线均中压用户数量"] == 200
+    assert agg.loc["甲", "平均停电时间(h)"] == pytest.approx(saidi)
+    assert agg.loc["甲", "供电可靠率"] == pytest.approx((1 - saidi / 8760) * 100)
+
+
+def test_radius_stepwise():
+    rule = {"rule": "radius"}
+    # B 类上限 3 km，每超过 0.5 km（不足 0.5 km 按一档）扣 25 分；C 类上限 5 km，每 1 km 扣 10 分
+    assert _score(rule, [2.9, 3.0, 3.1, 3.5, 3.6, 4.0, 6.0]) == [100.0, 100.0, 75.0, 75.0, 50.0, 50.0, 0.0]
+    assert _score(rule, [5.0, 5.2, 6.0, 7.5], ["C"] * 4) == [100.0, 90.0, 90.0, 70.0]
+    # 未知区域类别按 D 类
+    assert _score(rule, [15.5], ["未知"]) == [90.0]
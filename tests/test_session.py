@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""what-if 会话增量更新 / 撤销 / 重做与全量重算的一致性。"""
+
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS
+from main import combine_summaries, compute_feeder
+from reliability.kernel import LINE_TYPES
+from reliability.session import WhatIfSession
+
+OVERHEAD_MODEL = "JKLYJ-10-240: 100.00%"
+MIXED_MODEL = "PD_YJV22-3*400: 50.00%\nJKLYJ-10-240: 50.00%"
+
+
+def _full_summary(frames, constants, framework):
+    """修改后的分段表重新解析故障率 / 隔离时间，按原始逐分段公式全量重算指标汇总。"""
+    records = []
+    for g, df in enumerate(frames):
+        df = df.copy()
+        df["故障率"] = [framework.parse_laying_weights_and_fault_rate(v, constants)[2] for v in df["敷设方式_原始"]]
+        df["隔离时间"] = [framework.get_isolation_time(v, constants) for v in df["自动化状态"]]
+        total = int(df["用户数(台)"].sum())
+        df = framework.calculate_segment_indicators(df, total, LINE_TYPES[g], constants, False)
+        records.append(framework.calculate_summary(df, total, LINE_TYPES[g], constants, False))
+    records.append(combine_summaries(records[0], records[1], constants))
+    return pd.DataFrame(records)
+
+
+def _assert_summary(got, expected):
+    assert got["线路类型"].tolist() == expected["线路类型"].tolist()
+    assert got["总用户数(台)"].tolist() == expected["总用户数(台)"].tolist()
+    for name in expected.columns.drop(["线路类型", "总用户数(台)"]):
+        assert got[name].to_numpy() == pytest.approx(expected[name].to_numpy(), abs=2e-6), name
+
+
+def _edit(frames, line_type, seg_id, **fields):
+    df = frames[LINE_TYPES.index(line_type)]
+    row = df.index[df["分段编号"].astype(str).str.strip() == seg_id][0]
+    for name, value in fields.items():
+        df.loc[row, name] = value
+
+
+@pytest.fixture(params=FEEDERS, ids=lambda p: p.rsplit("/", 1)[-1])
+def feeder(request, config):
+    df_main, df_branch, summary_df = compute_feeder(request.param, config)
+    return df_main, df_branch, summary_df, config["constants"]
+
+
+def test_initial_summary_matches_compute_feeder(feeder):
+    df_main, df_branch, summary_df, constants = feeder
+    _assert_summary(WhatIfSession(df_main, df_branch, constants).summary(), summary_df)
+
+
+def test_updates_match_full_recompute(feeder, framework):
+    df_main, df_branch, summary_df, constants = feeder
+    session = WhatIfSession(df_main, df_branch, constants)
+    frames = [df_main.copy(), df_branch.copy()]
+    main_ids = df_main["分段编号"].astype(str).str.strip().tolist()
+    branch_ids = df_branch["分段编号"].astype(str).str.strip().tolist()
+
+    steps = []
+    status = not bool(df_main["自动化状态"].iloc[0])
+    session.set_automation("主线", main_ids[0], status)
+    _edit(frames, "主线", main_ids[0], 自动化状态=status)
+    steps.append(_full_summary(frames, constants, framework))
+
+    session.set_line_model("主线", main_ids[-1], OVERHEAD_MODEL)
+    _edit(frames, "主线", main_ids[-1], 敷设方式_原始=OVERHEAD_MODEL)
+    steps.append(_full_summary(frames, constants, framework))
+
+    session.update("分支", branch_ids[0], **{"敷设方式_原始": MIXED_MODEL, "长度(km)": 2.75, "用户数(台)": 0.0})
+    _edit(frames, "分支", branch_ids[0], 敷设方式_原始=MIXED_MODEL, **{"长度(km)": 2.75, "用户数(台)": 0.0})
+    steps.append(_full_summary(frames, constants, framework))
+
+    users = float(df_main["用户数(台)"].iloc[1])
+    session.move_users(("主线", main_ids[1]), ("分支", branch_ids[-1]), users)
+    _edit(frames, "主线", main_ids[1], **{"用户数(台)": 0.0})
+    _edit(frames, "分支", branch_ids[-1], **{"用户数(台)": float(df_branch["用户数(台)"].iloc[-1]) + users})
+    steps.append(_full_summary(frames, constants, framework))
+
+    last = session.update_rows("主线", [(0, {"长度(km)": 0.5}), (1, {"用户数(台)": 12.0})])
+    _edit(frames, "主线", main_ids[0], **{"长度(km)": 0.5})
+    _edit(frames, "主线", main_ids[1], **{"用户数(台)": 12.0})
+    steps.append(_full_summary(frames, constants, framework))
+    _assert_summary(last, steps[-1])
+
+    # 逐步撤销回到初始状态，再逐步重做
+    for expected in reversed(steps[:-1]):
+        _assert_summary(session.undo(), expected)
+    _assert_summary(session.undo(), summary_df)
+    assert session.undo() is None
+    for expected in steps:
+        _assert_summary(session.redo(), expected)
+    assert session.redo() is None
+
+    session.recompute()
+    _assert_summary(session.summary(), steps[-1])
+
+
+def test_rejects_invalid_users_and_length(feeder):
+    df_main, df_branch, summary_df, constants = feeder
+    session = WhatIfSession(df_main, df_branch, constants)
+    ids = df_main["分段编号"].astype(str).str.strip().tolist()
+    src, dst = ("主线", ids[0]), ("主线", ids[1])
+    have = float(df_main["用户数(台)"].iloc[0])
+    with pytest.raises(ValueError, match="转移用户数"):
+        session.move_users(src, dst, have + 1000)
+    with pytest.raises(ValueError, match="转移用户数"):
+        session.move_users(src, dst, -1)
+    with pytest.raises(ValueError, match="不能为负"):
+        session.set_users("主线", ids[0], -1)
+    with pytest.raises(ValueError, match="不能为负"):
+        session.set_length("主线", ids[0], -0.5)
+    # 同一步中任一修改无效时整步不生效
+    with pytest.raises(ValueError):
+        session.update_rows("主线", [(0, {"长度(km)": 0.5}), (1, {"用户数(台)": -3.0})])
+    assert session.undo() is None
+    _assert_summary(session.summary(), summary_df)
+    # 转移全部用户为合法边界
+    session.move_users(src, dst, have)
+    assert session.table.users[0] == 0.0
+
+def test_new_update_clears_redo(feeder):
+    df_main, df_branch, summary_df, constants = feeder
+    session = WhatIfSession(df_main, df_branch, constants)
+    seg_id = str(df_main["分段编号"].iloc[0]).strip()
+    session.set_length("主线", seg_id, 9.0)
+    session.undo()
+    session.set_users("主线", seg_id, 3)
+    assert session.redo() is None
+    session.undo()
+    _assert_summary(session.summary(), summary_df)
+
+
+def test_unknown_segment_and_field(feeder):
+    df_main, df_branch, _, constants = feeder
+    session = WhatIfSession(df_main, df_branch, constants)
+    with pytest.raises(KeyError):
+        session.set_users("主线", "不存在的分段", 1)
+    with pytest.raises(KeyError):
+        session.update("主线", str(df_main["分段编号"].iloc[0]).strip(), 故障率=1.0)
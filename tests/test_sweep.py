@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""参数扫描闭式解与逐场景完整计算（compute_feeder）的一致性。"""
+
+import copy
+
+import pytest
+
+from conftest import FEEDERS
+from main import compute_feeder, load_segments
+from reliability.sweep import SWEEP_INDICATORS, SWEEP_LINES, build_scenarios, run_sweep
+
+SPEC = {
+    "grid": {"Cable_Fault_Rate": [0.05, 0.2], "Manual_Isolation_Time": {"start": 1.0, "stop": 3.0, "num": 3}},
+    "scenarios": [
+        {"Overhead_Fault_Rate": 0.3, "Auto_Isolation_Time": 0.2, "Cable_Repair_Time": 6.0},
+        {"Scheduled_Outage_Rate": 0.05, "Scheduled_Total_Time": 2.5, "Annual_Power_Hours": 8784},
+    ],
+}
+
+
+@pytest.mark.parametrize("path", FEEDERS, ids=lambda p: p.rsplit("/", 1)[-1])
+def test_sweep_matches_full_run(path, config):
+    base = config["constants"]
+    result = run_sweep(load_segments(path, config), base, SPEC)
+    assert len(result) == 2 * 3 + 2
+    for _, scenario in result.iterrows():
+        cfg = copy.deepcopy(config)
+        cfg["constants"].update({k: float(scenario[k]) for k in base})
+        _, _, summary_df = compute_feeder(path, cfg)
+        for line, row in zip(SWEEP_LINES, summary_df.to_dict("records")):
+            for ind in SWEEP_INDICATORS:
+                assert scenario[f"{line}_{ind}"] == pytest.approx(row[ind], abs=1e-6), f"{line}_{ind}"
+
+
+def test_build_scenarios(config):
+    base = config["constants"]
+    table = build_scenarios(base, SPEC)
+    assert table["Manual_Isolation_Time"].tolist()[:3] == [1.0, 2.0, 3.0]
+    assert table["Cable_Fault_Rate"].tolist()[:6] == [0.05] * 3 + [0.2] * 3
+    assert (table.loc[:5, "Cable_Repair_Time"] == base["Cable_Repair_Time"]).all()
+    assert table.iloc[-1]["Annual_Power_Hours"] == 8784
+    assert len(build_scenarios(base, {})) == 1
+    with pytest.raises(KeyError):
+        build_scenarios(base, {"grid": {"未知常量": [1]}})
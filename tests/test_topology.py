@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""拓扑 FMEA：线性复杂度的前缀和结果与逐故障枚举（O(n²)）一致；建树与联络开关索引。"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS
+from reliability.batch import feeder_name
+from reliability.tie import TieIndex, build_tie_index, feeder_margin, split_switches, tie_config
+from reliability.topology import _device_segments, build_tree, topology_fmea
+
+
+def _tree(seed, n_main=6, n_branch=9):
+    """随机树：节点 0 为根，每个节点的上级编号小于自身。"""
+    rng = np.random.default_rng(seed)
+    n = n_main + n_branch
+    parent = np.array([-1] + [int(rng.integers(0, i)) for i in range(1, n)], dtype=np.int64)
+
+    def frame(k, prefix):
+        return pd.DataFrame({
+            "分段编号": [f"{prefix}{i}" for i in range(k)],
+            "长度(km)": rng.uniform(0.1, 3.0, k),
+            "用户数(台)": rng.integers(0, 20, k).astype(np.float64),
+            "故障率": rng.uniform(0.01, 0.2, k),
+            "隔离时间": rng.choice([0.1, 0.5, 1.5], k),
+        })
+    return frame(n_main, "M"), frame(n_branch, "B"), parent
+
+
+def _subtree(parent, j):
+    n = len(parent)
+    inside = np.zeros(n, dtype=bool)
+    inside[j] = True
+    for i in range(n):  # 上级编号小于自身，一次正序扫描即可
+        if parent[i] >= 0 and inside[parent[i]]:
+            inside[i] = True
+    return inside
+
+
+def _child_toward(parent, j, i):
+    """j 的子节点中 i 所在的那个；i == j 时为 None。"""
+    while i != j:
+        if parent[i] == j:
+            return i
+        i = parent[i]
+    return None
+
+
+def _brute(df_main, df_branch, parent, constants, branch_protection, transfer):
+    """逐个分段故障枚举所有用户的停电时间。"""
+    df = pd.concat([df_main, df_branch], ignore_index=True)
+    n = len(df)
+    is_branch = np.arange(n) >= len(df_main)
+    lam = df["长度(km)"].to_numpy() * df["故障率"].to_numpy()
+    lam_s = df["长度(km)"].to_numpy() * constants["Scheduled_Outage_Rate"]
+    iso = df["隔离时间"].to_numpy()
+    users = df["用户数(台)"].to_numpy()
+    repair = constants["Cable_Repair_Time"]
+    subtrees = [_subtree(parent, j) for j in range(n)]
+
+    zone = np.arange(n)
+    for i in range(n):
+        if parent[i] >= 0 and not (branch_protection and is_branch[i]):
+            zone[i] = zone[parent[i]]
+
+    restore = np.full(n, float(repair))
+    if transfer is not None:
+        for c in range(n):
+            sub = subtrees[c]
+            best = transfer["margin"][sub].max()
+            if parent[c] >= 0 and best >= transfer["load"][sub].sum():
+                time = transfer["time"][sub & (transfer["margin"] == best)].min()
+                restore[c] = min(time, repair)
+
+    hours_f, count_f, count_s, fault_hours = (np.zeros(n) for _ in range(4))
+    for j in range(n):
+        for i in np.flatnonzero(subtrees[zone[j]]):
+            if subtrees[j][i]:
+                c = _child_toward(parent, j, i)
+                outage = iso[j] + (repair if c is None else restore[c])
+            else:
+                outage = iso[j]
+            hours_f[i] += lam[j] * outage
+            count_f[i] += lam[j]
+            fault_hours[j] += lam[j] * users[i] * outage
+        count_s[subtrees[j]] += lam_s[j]
+    return hours_f, count_f, count_s, fault_hours
+
+
+def _transfer(seed, n):
+    rng = np.random.default_rng(seed + 100)
+    margin = np.where(rng.random(n) < 0.3, rng.choice([50.0, 200.0, 200.0], n), -np.inf)
+    return {
+        "load": rng.uniform(0.0, 30.0, n),
+        "margin": margin,
+        "time": rng.choice([0.1, 1.0], n),
+        "switch": [""] * n,
+    }
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("branch_protection", [True, False])
+@pytest.mark.parametrize("with_transfer", [False, True], ids=["no-tie", "tie"])
+def test_matches_brute_force(base_config, seed, branch_protection, with_transfer):
+    constants = base_config["constants"]
+    df_main, df_branch, parent = _tree(seed)
+    transfer = _transfer(seed, len(parent)) if with_transfer else None
+    detail, summary = topology_fmea(df_main, df_branch, parent, constants, branch_protection, transfer)
+    hours_f, count_f, count_s, fault_hours = _brute(df_main, df_branch, parent, constants, branch_protection, transfer)
+    np.testing.assert_allclose(detail["用户年故障停电时间(h)"], hours_f, rtol=1e-12)
+    np.testing.assert_allclose(detail["用户年故障停电次数"], count_f, rtol=1e-12)
+    np.testing.assert_allclose(detail["用户年预安排停电次数"], count_s, rtol=1e-12)
+    np.testing.assert_allclose(detail["用户年预安排停电时间(h)"], count_s * constants["Scheduled_Total_Time"], rtol=1e-12)
+    np.testing.assert_allclose(detail["故障停电时户数(时户/年)"], fault_hours, rtol=1e-12)
+
+    users = detail["用户数(台)"].to_numpy()
+    whole = summary.set_index("线路类型").loc["全线路"]
+    assert whole["总用户数(台)"] == users.sum()
+    assert whole["SAIDI-F"] == pytest.approx((users * hours_f).sum() / users.sum(), abs=1e-6)
+
+
+def test_transfer_never_slower(base_config):
+    constants = base_config["constants"]
+    df_main, df_branch, parent = _tree(3)
+    plain, _ = topology_fmea(df_main, df_branch, parent, constants)
+    tied, _ = topology_fmea(df_main, df_branch, parent, constants, transfer=_transfer(3, len(parent)))
+    assert (tied["用户年故障停电时间(h)"] <= plain["用户年故障停电时间(h)"] + 1e-12).all()
+    assert tied["可转供"].any() and not plain["可转供"].any()
+
+
+def test_build_tree_from_devices():
+    main_dev = pd.DataFrame({
+        "线路分段": ["分段1", None, None, "分段2", None, "分段3", None],
+        "设备名称": [None, "开关1", "环网柜1", None, "开关2", None, "开关3"],
+        "设备父节点": [None, "变电站", "开关1", None, "环网柜1", None, "开关2"],
+    })
+    branch_dev = pd.DataFrame({
+        "线路分段": ["支线甲", None, "小支线", None, "支线乙", None],
+        "分支类型": ["大分支", None, "小分支", None, "大分支", None],
+        "设备名称": [None, "分支开关甲", None, "小支开关", None, "分支开关乙"],
+        "设备父节点": [None, "环网柜1", None, "开关3", None, "小支开关"],
+    })
+    df_main = pd.DataFrame({"分段编号": ["分段1", "分段2", "分段3"]})
+    df_branch = pd.DataFrame({"分段编号": ["1", "2"]}, index=[0, 1])
+    parent, unresolved = build_tree(df_main, df_branch, _device_segments(main_dev, False), _device_segments(branch_dev, True))
+    # 支线甲挂在 分段1（环网柜1）；支线乙经小分支上溯到 分段3
+    assert parent.tolist() == [-1, 0, 1, 0, 2]
+    assert unresolved == 0
+
+
+def test_tie_index(tmp_path):
+    assert split_switches("联络1\n联络2、联络3；联络4") == ["联络1", "联络2", "联络3", "联络4"]
+    assert split_switches(float("nan")) == []
+    index = TieIndex()
+    index.add_feeder("线路甲", ["联络1", "联络2"], 1000.0)
+    index.add_feeder("线路乙", ["联络1"], 2000.0)
+    assert index.opposite("联络1", "线路甲") == "线路乙"
+    assert index.opposite("联络2", "线路甲") is None
+    path = str(tmp_path / "tie_index.json")
+    index.save(path)
+    loaded = TieIndex.load(path)
+    assert loaded.switch_feeders == index.switch_feeders and loaded.feeder_kva == index.feeder_kva
+
+    tie = tie_config({"tie": {"feeder_capacity_overrides": {"线路乙": 10000}}})
+    assert feeder_margin(loaded, "线路乙", tie) == pytest.approx(10000 * 0.8 - 2000 * 0.1)
+    assert feeder_margin(loaded, "线路甲", tie) == pytest.approx(8660 * 0.8 - 1000 * 0.1)
+    assert feeder_margin(loaded, None, tie) == tie["default_margin_kva"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_build_tie_index_skips_broken(base_config, tmp_path, workers):
+    broken = str(tmp_path / "损坏.xlsx")
+    with open(broken, "wb") as f:
+        f.write(b"not a workbook")
+    index, failures = build_tie_index(FEEDERS[:2] + [broken], base_config, workers)
+    assert [res["path"] for res in failures] == [broken]
+    assert failures[0]["error"].startswith("BadZipFile")
+    assert sorted(index.feeder_kva) == sorted(feeder_name(p) for p in FEEDERS[:2])
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""分段追踪：由追踪文件的分子 / 分母复核各分段与汇总 SAIDI / SAIFI；输出级别。"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import FEEDERS
+from main import compute_feeder, default_config_path, run, verbosity
+from reliability.kernel import LINE_TYPES
+from reliability.trace import segment_trace
+
+IDS = [p.rsplit("/", 1)[-1] for p in FEEDERS]
+METRICS = ("SAIDI-F", "SAIFI-F", "SAIDI-S", "SAIFI-S")
+
+
+def _check_audit(trace, summary):
+    """每行 指标 = 分子 / 分母用户数；按线路类型 Σ分子 / 分母 = 汇总指标，全线路为两组分子之和 / 全线路用户数。"""
+    denom = trace["分母用户数"].to_numpy(dtype=np.float64)
+    for name in METRICS:
+        num = trace[f"{name}分子"].to_numpy(dtype=np.float64)
+        expected = np.divide(num, denom, out=np.zeros_like(num), where=denom > 0)
+        np.testing.assert_allclose(trace[name].to_numpy(dtype=np.float64), expected, rtol=1e-12, atol=1e-15, err_msg=name)
+    summary = summary.set_index("线路类型")
+    groups = trace.groupby("线路类型", sort=False)
+    for line_type in LINE_TYPES:
+        g = groups.get_group(line_type)
+        assert g["分母用户数"].nunique() == 1
+        assert g["分母用户数"].iloc[0] == summary.loc[line_type, "总用户数(台)"]
+        for name in METRICS:
+            assert g[f"{name}分子"].sum() / g["分母用户数"].iloc[0] == pytest.approx(summary.loc[line_type, name], abs=1e-6), (line_type, name)
+    total_users = groups["分母用户数"].first().sum()
+    assert total_users == summary.loc["全线路", "总用户数(台)"]
+    for name in METRICS:
+        assert trace[f"{name}分子"].sum() / total_users == pytest.approx(summary.loc["全线路", name], abs=1e-6), name
+
+
+@pytest.mark.parametrize("path", FEEDERS, ids=IDS)
+def test_trace_reconstructs_summary(path, config):
+    df_main, df_branch, summary = compute_feeder(path, config)
+    trace = segment_trace(df_main, df_branch, config["constants"])
+    assert len(trace) == len(df_main) + len(df_branch)
+    assert trace["线路类型"].tolist() == ["主线"] * len(df_main) + ["分支"] * len(df_branch)
+    _check_audit(trace, summary)
+
+
+def test_run_writes_trace(config, tmp_path):
+    trace_path = tmp_path / "追踪.csv"
+    summary, _ = run(default_config_path(), FEEDERS[1], str(tmp_path / "out.xlsx"), use_cache=False, verbose=0,
+                     trace_path=str(trace_path))
+    trace = pd.read_csv(trace_path, encoding="utf-8-sig")
+    df_main, df_branch, _ = compute_feeder(FEEDERS[1], config)
+    assert trace["分段编号"].tolist() == df_main["分段编号"].tolist() + df_branch["分段编号"].tolist()
+    _check_audit(trace, summary)
+
+
+@pytest.mark.parametrize("verbose, level", [(True, 2), (False, 0), (None, 2), (0, 0), (1, 1), (2, 2)])
+def test_verbosity_levels(verbose, level, config, capsys):
+    """参数文件 verbose: true（及缺省）保持原有的逐分段输出，1 / 0 为显式指定的较安静级别。"""
+    if verbose is None:
+        config.pop("verbose")
+    else:
+        config["verbose"] = verbose
+    assert verbosity(config) == level
+    compute_feeder(FEEDERS[0], config)
+    out = capsys.readouterr().out
+    assert ("分段级计算" in out) == (level >= 2)
+    assert ("【第一步】" in out) == (level >= 1)
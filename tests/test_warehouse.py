@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""结果仓库 worst / delta 的排序方向：SAIDI、SAIFI 越大越差，ASAI 越小越差；线路以输入文件区分。"""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from reliability.warehouse import SUMMARY_COLS, Warehouse, worse_first
+
+# 各线路全线路 SAIDI合计：运行 A → 运行 B
+SAIDI = {"线路甲": (1.0, 1.5), "线路乙": (3.0, 2.0), "线路丙": (2.0, 2.9), "线路丁": (0.5, 0.5)}
+
+
+def _summary(saidi, folder="/data/区县"):
+    rows = []
+    for name, value in saidi.items():
+        for line_type, scale in (("主线", 10.0), ("分支", 0.1), ("全线路", 1.0)):
+            row = dict.fromkeys(SUMMARY_COLS, 0.0)
+            row.update({"总用户数(台)": 100, "SAIDI合计": value * scale, "SAIFI合计": value * scale / 4,
+                        "ASAI(%)": (8760 - value * scale) / 8760 * 100})
+            rows.append({"线路名称": name, "输入文件": f"{folder}/{name}.xlsx", "线路类型": line_type, **row})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def store(tmp_path):
+    with Warehouse(str(tmp_path / "results.sqlite")) as wh:
+        runs = []
+        for k in range(2):
+            runs.append(wh.begin_run("batch", "test", {"k": k}))
+            wh.write("指标汇总", _summary({name: values[k] for name, values in SAIDI.items()}))
+            wh.finish_run(len(SAIDI), 0)
+        yield wh, runs
+
+
+def test_worse_first():
+    assert worse_first("ASAI(%)") == "ASC"
+    assert worse_first("SAIDI合计") == "DESC"
+    assert worse_first("SAIFI合计") == "DESC"
+
+
+def test_worst_ordering(store):
+    wh, (run_a, run_b) = store
+    by_saidi = wh.worst(run_a, "SAIDI合计", top=3)
+    assert by_saidi["线路名称"].tolist() == ["线路乙", "线路丙", "线路甲"]
+    assert by_saidi["区县"].unique().tolist() == ["区县"]
+    assert wh.worst(run_a, "SAIFI合计", top=2)["线路名称"].tolist() == ["线路乙", "线路丙"]
+    # ASAI 最差为最小值，与 SAIDI 最差同序
+    assert wh.worst(run_a, "ASAI(%)", top=3)["线路名称"].tolist() == ["线路乙", "线路丙", "线路甲"]
+    # 缺省为最近一次运行
+    assert wh.worst(metric="ASAI(%)", top=1)["线路名称"].tolist() == ["线路丙"]
+    assert wh.worst(run_b, "SAIDI合计", top=10)["线路名称"].tolist()[-1] == "线路丁"
+
+
+def test_delta_ordering(store):
+    wh, (run_a, run_b) = store
+    saidi = wh.delta(run_a, run_b, "SAIDI合计")
+    assert saidi["线路名称"].tolist() == ["线路丙", "线路甲", "线路丁", "线路乙"]
+    assert saidi["变化"].tolist() == pytest.approx([0.9, 0.5, 0.0, -1.0])
+    assert saidi.columns[2:4].tolist() == [f"SAIDI合计(运行{run_a})", f"SAIDI合计(运行{run_b})"]
+    assert saidi["变化率"].iloc[0] == pytest.approx(0.45)
+    # ASAI 下降最多（恶化最多）的在前
+    asai = wh.delta(run_a, run_b, "ASAI(%)", top=2)
+    assert asai["线路名称"].tolist() == ["线路丙", "线路甲"]
+    assert (asai["变化"] < 0).all()
+    # 缺省为最近两次运行
+    pd.testing.assert_frame_equal(wh.delta(metric="SAIDI合计"), saidi)
+
+
+def test_unknown_metric(store):
+    wh, _ = store
+    with pytest.raises(KeyError):
+        wh.worst(metric="不存在的指标")
+    with pytest.raises(KeyError):
+        wh.delta(metric="不存在的指标")
+
+
+def test_same_name_in_different_districts(tmp_path):
+    with Warehouse(str(tmp_path / "results.sqlite")) as wh:
+        run = wh.begin_run("batch", "test", {})
+        wh.write("指标汇总", _summary({"线路甲": 1.0}, "/data/东区"))
+        wh.write("指标汇总", _summary({"线路甲": 2.0}, "/data/西区"))
+        wh.finish_run(2, 0)
+        worst = wh.worst(run, "SAIDI合计")
+        assert worst["线路名称"].tolist() == ["线路甲", "线路甲"]
+        assert worst["区县"].tolist() == ["西区", "东区"]
+        assert worst["SAIDI合计"].tolist() == [2.0, 1.0]
+        assert wh.districts(run).set_index("区县")["线路数"].to_dict() == {"西区": 1, "东区": 1}
+
+        # 同一运行中同一输入文件重复写入时报错，不覆盖已有汇总
+        wh.begin_run("batch", "test", {})
+        wh.write("指标汇总", _summary({"线路甲": 1.0}, "/data/东区"))
+        with pytest.raises(sqlite3.IntegrityError):
+            wh.write("指标汇总", _summary({"线路甲": 3.0}, "/data/东区"))
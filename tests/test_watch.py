@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""监视模式：工作簿修改后增量重算的结果与全量计算一致。"""
+
+import os
+import shutil
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import reliability.watch as watch
+from conftest import FEEDERS
+from main import compute_feeder
+from reliability.watch import Watcher
+
+
+def _edit(path, sheet, edits, append=None):
+    """按表头列名修改单元格：edits 为 [(数据行号（从 0 起）, 列名, 值)]；append 为追加的整行值。"""
+    wb = load_workbook(path)
+    ws = wb[sheet]
+    header = [c.value for c in ws[1]]
+    for row, col, value in edits:
+        ws.cell(row=row + 2, column=header.index(col) + 1, value=value)
+    if append is not None:
+        ws.append(append)
+    wb.save(path)
+    # 保证 (修改时间, 大小) 变化
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+
+def _assert_state(watcher, path, config):
+    df_main, df_branch, summary_df = compute_feeder(path, config)
+    state = watcher.states[path]
+    got = state.summary
+    assert got["总用户数(台)"].tolist() == summary_df["总用户数(台)"].tolist()
+    for name in summary_df.columns.drop(["线路类型", "总用户数(台)"]):
+        assert got[name].tolist() == pytest.approx(summary_df[name].tolist(), abs=2e-6), name
+    for frame, df in zip(state.frames, (df_main, df_branch)):
+        for name in ("故障率", "隔离时间", "SAIDI合计", "SAIFI合计"):
+            assert frame[name].astype(float).tolist() == pytest.approx(df[name].astype(float).tolist(), rel=1e-12), name
+
+
+@pytest.fixture
+def feeder(tmp_path):
+    path = str(tmp_path / "in" / os.path.basename(FEEDERS[0]))
+    os.makedirs(os.path.dirname(path))
+    shutil.copyfile(FEEDERS[0], path)
+    return path
+
+
+def test_incremental_matches_full(feeder, config, tmp_path):
+    out_dir = str(tmp_path / "out")
+    os.makedirs(out_dir)
+    watcher = Watcher([feeder], config, out_dir)
+    (path, mode, _), = watcher.poll()
+    assert (path, mode) == (feeder, "全量")
+    assert os.path.exists(watcher.output_path(feeder))
+    assert watcher.poll() == []
+
+    # 只改线路型号：分母不变，只算变化行
+    _edit(feeder, "主线", [(2, "线路型号", "JKLYJ-10-240: 100.00%")])
+    (_, mode, _), = watcher.poll()
+    assert mode.startswith("增量") and "主线 1 行" in mode
+    _assert_state(watcher, feeder, config)
+
+    # 改用户数：分母变化，整个分组重算
+    _edit(feeder, "分支", [(0, "用户数量(台)", 50), (1, "是否自动化", "TRUE")])
+    (_, mode, _), = watcher.poll()
+    assert "分支 2 行" in mode
+    _assert_state(watcher, feeder, config)
+    written = pd.read_excel(watcher.output_path(feeder), sheet_name="指标汇总")
+    assert written["SAIDI合计"].tolist() == pytest.approx(watcher.states[feeder].summary["SAIDI合计"].tolist(), abs=1e-9)
+
+
+def test_row_count_change_recomputes(feeder, config, tmp_path):
+    watcher = Watcher([feeder], config, str(tmp_path))
+    watcher.poll()
+    wb = load_workbook(feeder, read_only=True)
+    last = [c.value for c in list(wb["主线"].iter_rows())[-1]]
+    wb.close()
+    _edit(feeder, "主线", [], append=["分段99"] + last[1:])
+    (_, mode, _), = watcher.poll()
+    assert mode == "全量"
+    _assert_state(watcher, feeder, config)
+
+
+def test_output_file(feeder, config, tmp_path):
+    out = str(tmp_path / "out" / "result.csv")
+    os.makedirs(os.path.dirname(out))
+    watcher = Watcher([feeder], config, out)
+    watcher.poll()
+    assert watcher.output_path(feeder) == out
+    assert os.path.exists(out)
+
+
+def test_failed_update_keeps_state(feeder, config, tmp_path, monkeypatch):
+    watcher = Watcher([feeder], config, str(tmp_path))
+    watcher.poll()
+    state = watcher.states[feeder]
+    before = state.summary.copy()
+    frames = [df.copy() for df in state.frames]
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("内核失败")
+
+    monkeypatch.setattr(watch, "segment_kernel", broken)
+    _edit(feeder, "主线", [(0, "用户数量(台)", 99)])
+    (_, mode, _), = watcher.poll()
+    assert "读取失败" in mode
+    pd.testing.assert_frame_equal(watcher.states[feeder].summary, before)
+    for got, expected in zip(watcher.states[feeder].frames, frames):
+        pd.testing.assert_frame_equal(got, expected)
+
+    monkeypatch.undo()
+    _edit(feeder, "主线", [(1, "长度(km)", 0.5)])
+    (_, mode, _), = watcher.poll()
+    assert mode.startswith("增量")
+    _assert_state(watcher, feeder, config)
+
+
+def test_output_file_needs_single_workbook(feeder, config, tmp_path):
+    folder = os.path.dirname(feeder)
+    out = str(tmp_path / "result.csv")
+    for specs in ([folder], [os.path.join(folder, "*.xlsx")], [feeder, feeder]):
+        with pytest.raises(ValueError):
+            Watcher(specs, config, out)
+    # 输出目录可用于多个工作簿，各线路写到各自的结果文件
+    shutil.copyfile(feeder, os.path.join(folder, "线路乙.xlsx"))
+    watcher = Watcher([folder], config, str(tmp_path / "out"))
+    assert len({watcher.output_path(p) for p in watcher.inputs()}) == 2
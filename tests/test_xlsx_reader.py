@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""流式列投影读取与 pandas.read_excel 的一致性（含末尾空行）。"""
+
+import warnings
+import zipfile
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from openpyxl.styles import Border, PatternFill, Side
+
+from conftest import FEEDERS
+from reliability.xlsx_reader import read_projected_columns, read_projected_sheets
+
+
+def _read_excel(path):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        xls = pd.ExcelFile(path)
+        return xls.sheet_names, {name: pd.read_excel(xls, name) for name in xls.sheet_names}
+
+
+@pytest.mark.parametrize("path", FEEDERS, ids=lambda p: p.rsplit("/", 1)[-1])
+def test_all_sheets_match_read_excel(path):
+    names, expected = _read_excel(path)
+    sheet_names, frames = read_projected_sheets(path, {name: list(df.columns) for name, df in expected.items()})
+    assert sheet_names == names
+    for name, df in expected.items():
+        pd.testing.assert_frame_equal(frames[name], df, obj=name)
+
+
+@pytest.mark.parametrize("path", FEEDERS[:1], ids=lambda p: p.rsplit("/", 1)[-1])
+def test_projection_subset_and_order(path):
+    _, expected = _read_excel(path)
+    df = expected["主线"]
+    cols = list(df.columns[::-2])
+    _, frames = read_projected_sheets(path, {"主线": cols})
+    pd.testing.assert_frame_equal(frames["主线"], df[cols])
+
+
+def test_optional_and_missing_columns():
+    path = FEEDERS[0]
+    _, tables = read_projected_columns(path, {"主线": ["线路分段", "不存在的列"]}, optional={"主线": ["不存在的列"]})
+    cols = tables["主线"]
+    assert len(cols["不存在的列"]) == len(cols["线路分段"])
+    assert all(v is None for v in cols["不存在的列"])
+    with pytest.raises(KeyError):
+        read_projected_columns(path, {"主线": ["不存在的列"]})
+    with pytest.raises(ValueError):
+        read_projected_columns(path, {"不存在的Sheet": ["线路分段"]})
+
+
+def _trailing_rows_workbook(path):
+    """数据行后：中间空行、只在未投影列有值的行，以及只设置了格式的空行。"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "主线"
+    ws.append(["线路分段", "长度(km)", "备注"])
+    ws.append(["分段1", 1.5, None])
+    ws.append([None, None, None])
+    ws.append(["分段2", 2.0, None])
+    ws.append([None, None, "只有备注"])
+    ws.append([None, None, ""])
+    fill = PatternFill("solid", fgColor="FFFF00")
+    for r in range(7, 12):
+        for col in "ABC":
+            ws[f"{col}{r}"].fill = fill
+            ws[f"{col}{r}"].border = Border(bottom=Side(style="thin"))
+    wb.save(path)
+
+
+def test_trailing_blank_rows_trimmed(tmp_path):
+    path = str(tmp_path / "trailing.xlsx")
+    _trailing_rows_workbook(path)
+    expected = pd.read_excel(path, sheet_name="主线")
+    assert len(expected) == 4
+    _, frames = read_projected_sheets(path, {"主线": ["线路分段", "长度(km)"]})
+    pd.testing.assert_frame_equal(frames["主线"], expected[["线路分段", "长度(km)"]])
+    _, tables = read_projected_columns(path, {"主线": ["线路分段"]})
+    assert len(tables["主线"]["线路分段"]) == 4
+
+
+_PACKAGE = {
+    "[Content_Types].xml": (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/sharedStrings.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+        '</Types>'),
+    "_rels/.rels": (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    "xl/workbook.xml": (
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="主线" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+    "xl/_rels/workbook.xml.rels": (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" Target="sharedStrings.xml"/>'
+        '</Relationships>'),
+}
+
+
+@pytest.mark.parametrize("last", ["", "备注"], ids=["blank", "text"])
+def test_trailing_shared_strings(tmp_path, last):
+    """末尾行只含共享字符串：空字符串视为空行，非空文本（即使在未投影列）保留该行。"""
+    strings = ["线路分段", "备注", "分段1", last]
+    sst = "".join(f"<si><t>{t}</t></si>" for t in strings)
+    sheet = ('<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c></row>'
+             '<row r="2"><c r="A2" t="s"><v>2</v></c></row>'
+             '<row r="3"><c r="B3" t="s"><v>3</v></c></row>'
+             '<row r="4"><c r="A4" s="1"/></row>')
+    path = str(tmp_path / "shared.xlsx")
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, xml in _PACKAGE.items():
+            zf.writestr(name, xml)
+        ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+        zf.writestr("xl/sharedStrings.xml", f'<sst {ns}>{sst}</sst>')
+        zf.writestr("xl/worksheets/sheet1.xml", f'<worksheet {ns}><sheetData>{sheet}</sheetData></worksheet>')
+    expected = _read_excel(path)[1]["主线"]
+    assert len(expected) == (2 if last else 1)
+    _, frames = read_projected_sheets(path, {"主线": ["线路分段"]})
+    pd.testing.assert_frame_equal(frames["主线"], expected[["线路分段"]])